@@ -0,0 +1,883 @@
+# Модуль замеров производительности
+
+import argparse
+import base64
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from cryptography.fernet import Fernet
+from src import compression, database, sync
+from src.compression import train_dictionary
+from src.cache import ContentCache
+from src.database import DatabaseManager
+from src.security import calibrate_kdf, derive_key
+from src.transfer import export_entries, import_entries
+from src.listing import QuickFilter, EntryRows
+from src.records import Entry
+from src.widgets import VirtualTreeview
+from src.config import APP_VERSION, FILTER_FRAME_BUDGET_MS
+
+PASSWORD = "benchmark_password"
+
+# Заполнение базы заданным числом записей
+def fill_diary(db, count, session):
+    for i in range(count):
+        db.add_entry(f"2025-01-{i % 28 + 1:02d}", f"Запись {i}",
+                     f"Текст записи номер {i}. " * 10, session)
+
+SYLLABLES = ["ма", "ло", "ре", "ки", "на", "ст", "во", "пр", "да", "ли", "ше", "ту",
+             "бе", "го", "жи", "зо", "ку", "ме", "ни", "по", "ра", "са", "те", "фу"]
+
+# Словарь синтетических слов (частоты убывают по закону Ципфа)
+def synthetic_vocabulary(rng, size=5000):
+    words = sorted({"".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 4)))
+                    for _ in range(size)})
+    rng.shuffle(words)
+    weights = [1 / rank for rank in range(1, len(words) + 1)]
+    return words, weights
+
+# Синтетический текст записи из случайных слов словаря
+def synthetic_text(rng, vocabulary, words):
+    return " ".join(rng.choices(vocabulary[0], vocabulary[1], k=words))
+
+# Замер времени разблокировки дневника (вход + чтение всех записей)
+def bench_unlock(count, legacy_sample):
+    print(f"Разблокировка дневника из {count} записей")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        db = DatabaseManager(path)
+        with db.open_session(PASSWORD) as session:
+            fill_diary(db, count, session)
+        # Записи старой схемы ключа (фиксированная соль, ключ из пароля)
+        with db.security.open_legacy_session(PASSWORD) as legacy:
+            tokens = [legacy.encrypt(f"Текст записи номер {i}. " * 10) for i in range(legacy_sample)]
+
+        # Старый путь: вывод ключа PBKDF2 для каждой записи
+        start = time.perf_counter()
+        for token in tokens:
+            with db.security.open_legacy_session(PASSWORD) as legacy:
+                legacy.decrypt(token)
+        per_entry = (time.perf_counter() - start) / max(len(tokens), 1)
+        print(f"  до:    {per_entry * count:8.2f} с "
+              f"(оценка по {len(tokens)} записям, {per_entry * 1000:.1f} мс на запись)")
+
+        # Новый путь: один вывод ключа на сессию
+        start = time.perf_counter()
+        with db.open_session(PASSWORD) as session:
+            entries = db.get_all_entries(session)
+        elapsed = time.perf_counter() - start
+        print(f"  после: {elapsed:8.2f} с ({len(entries)} записей)")
+        db.close()
+
+# Замер записи: вставки и обновления через базу данных
+def bench_writes(count):
+    print(f"Вставка и обновление {count} записей")
+    with tempfile.TemporaryDirectory() as tmp:
+        # Старый путь: новое соединение на каждую операцию
+        path = os.path.join(tmp, "legacy.db")
+        with DatabaseManager(path) as db, db.open_session(PASSWORD) as session:
+            token = session.encrypt("Текст записи. " * 10)
+        start = time.perf_counter()
+        for i in range(count):
+            conn = sqlite3.connect(path)
+            conn.execute('INSERT INTO entries (date, title, encrypted_content) VALUES (?, ?, ?)',
+                         ("2025-01-01", f"Запись {i}", token))
+            conn.commit()
+            conn.close()
+        for i in range(count):
+            conn = sqlite3.connect(path)
+            conn.execute('UPDATE entries SET date = ?, title = ?, encrypted_content = ? WHERE id = ?',
+                         ("2025-01-02", f"Запись {i}", token, i + 1))
+            conn.commit()
+            conn.close()
+        print(f"  до:    {time.perf_counter() - start:8.2f} с")
+
+        # Новый путь: одно долгоживущее соединение
+        path = os.path.join(tmp, "pooled.db")
+        with DatabaseManager(path) as db, db.open_session(PASSWORD) as session:
+            start = time.perf_counter()
+            for i in range(count):
+                db.add_entry("2025-01-01", f"Запись {i}", "Текст записи. " * 10, session)
+            for i in range(count):
+                db.update_entry(i + 1, "2025-01-02", f"Запись {i}", "Текст записи. " * 10, session)
+            print(f"  после: {time.perf_counter() - start:8.2f} с")
+
+# Замер пакетной записи: по одной транзакции на запись и одна транзакция на пакет
+def bench_batch(count, synchronous):
+    print(f"Добавление, изменение и удаление {count} записей (synchronous = {synchronous})")
+    records = [{'date': "2025-01-01", 'title': f"Запись {i}", 'content': "Текст записи. " * 10}
+               for i in range(count)]
+    with tempfile.TemporaryDirectory() as tmp:
+        for number, name in enumerate(("по одной", "пакетом")):
+            with DatabaseManager(os.path.join(tmp, f"batch{number}.db")) as db, \
+                    db.open_session(PASSWORD) as session:
+                db._conn.execute(f'PRAGMA synchronous = {synchronous}')
+                start = time.perf_counter()
+                timings = []
+                if name == "по одной":
+                    ids = [db.add_entry(r['date'], r['title'], r['content'], session).id
+                           for r in records]
+                else:
+                    ids = [entry.id for entry in db.add_entries(records, session)]
+                timings.append(time.perf_counter() - start)
+                changes = [dict(r, id=entry_id, date="2025-01-02") for r, entry_id in zip(records, ids)]
+                start = time.perf_counter()
+                if name == "по одной":
+                    for change in changes:
+                        db.update_entry(change['id'], change['date'], change['title'],
+                                        change['content'], session)
+                else:
+                    db.update_entries(changes, session)
+                timings.append(time.perf_counter() - start)
+                start = time.perf_counter()
+                if name == "по одной":
+                    for entry_id in ids:
+                        db.delete_entry(entry_id)
+                else:
+                    db.delete_entries(ids)
+                timings.append(time.perf_counter() - start)
+                print(f"  {name:>8}: добавление {count / timings[0]:9.0f}/с, "
+                      f"изменение {count / timings[1]:9.0f}/с, удаление {count / timings[2]:9.0f}/с")
+
+# Замер задержки поиска по зашифрованному индексу
+def bench_search(sizes, queries):
+    rng = random.Random(1)
+    vocabulary = synthetic_vocabulary(rng)
+    words = vocabulary[0]
+    queries = queries or [words[0], words[500], f"{words[3]} {words[40]}",
+                          words[100][:3] + "*", words[100][:5] + "*"]
+    for count in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.db")
+            with DatabaseManager(path) as db, db.open_session(PASSWORD) as session:
+                db.ensure_search_index(session)
+                for i in range(count):
+                    db.add_entry(f"2025-01-{i % 28 + 1:02d}", synthetic_text(rng, vocabulary, 5),
+                                 synthetic_text(rng, vocabulary, 60), session)
+                print(f"Поиск по дневнику из {count} записей")
+                # Прежний способ: расшифровка и просмотр всех записей
+                start = time.perf_counter()
+                keyword = queries[0].lower()
+                found = sum(1 for entry in db.iter_entries(session)
+                            if keyword in entry.title.lower() or keyword in entry.content.lower())
+                elapsed = time.perf_counter() - start
+                print(f"  {'перебор ' + repr(queries[0]):>20}: {elapsed * 1000:8.2f} мс ({found} найдено)")
+                for query in queries:
+                    start = time.perf_counter()
+                    results = db.search(query, session)
+                    elapsed = time.perf_counter() - start
+                    print(f"  {query!r:>20}: {elapsed * 1000:8.2f} мс ({len(results)} найдено)")
+
+# Замер быстрого фильтра при посимвольном вводе запроса
+def bench_filter(count, query):
+    rng = random.Random(1)
+    vocabulary = synthetic_vocabulary(rng)
+    entries = [Entry(i, f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}", synthetic_text(rng, vocabulary, 4))
+               for i in range(count)]
+    query = query or vocabulary[0][0][:6]
+    print(f"Быстрый фильтр по {count} записям, ввод {query!r}")
+    quick_filter = QuickFilter()
+    for length in range(1, len(query) + 1):
+        start = time.perf_counter()
+        job = quick_filter.start(query[:length], entries)
+        longest = 0
+        while True:
+            step_start = time.perf_counter()
+            done = job.step(FILTER_FRAME_BUDGET_MS / 1000)
+            longest = max(longest, time.perf_counter() - step_start)
+            if done:
+                break
+        total = time.perf_counter() - start
+        print(f"  {query[:length]!r:>10}: всего {total * 1000:7.2f} мс, "
+              f"самый долгий шаг {longest * 1000:5.2f} мс ({len(job.result)} найдено)")
+
+# Замер пакетного дешифрования при разном числе исполнителей
+def bench_decrypt(count, workers_list, processes):
+    rng = random.Random(1)
+    vocabulary = synthetic_vocabulary(rng)
+    kind = "процессов" if processes else "потоков"
+    print(f"Пакетное дешифрование {count} записей, пул {kind}")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        with DatabaseManager(path) as db, db.open_session(PASSWORD) as session:
+            # Быстрое заполнение напрямую, минуя поисковый индекс
+            conn = sqlite3.connect(path)
+            with conn:
+                conn.executemany(
+                    'INSERT INTO entries (date, title, encrypted_content) VALUES (?, ?, ?)',
+                    ((f"2025-01-{i % 28 + 1:02d}", f"Запись {i}",
+                      session.encrypt(synthetic_text(rng, vocabulary, 60))) for i in range(count))
+                )
+            conn.close()
+            for workers in workers_list:
+                # Время включает запуск пула исполнителей
+                start = time.perf_counter()
+                entries = db.get_all_entries(session, workers=workers, processes=processes)
+                elapsed = time.perf_counter() - start
+                print(f"  {workers:3d} исполн.: {elapsed:8.2f} с ({len(entries)} записей, "
+                      f"{count / elapsed:,.0f} записей/с)")
+
+# Замер размера базы и скорости чтения: старый формат (base64 над Fernet) и BLOB
+def bench_storage(count):
+    rng = random.Random(1)
+    vocabulary = synthetic_vocabulary(rng)
+    texts = [synthetic_text(rng, vocabulary, 60) for _ in range(count)]
+    print(f"Хранение {count} записей")
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+        for kind in ("до", "после"):
+            path = os.path.join(tmp, f"{kind}.db")
+            with DatabaseManager(path) as db, db.open_session(PASSWORD) as session:
+                if kind == "до":
+                    cipher = Fernet(bytes(session._key))
+                    encrypt = lambda text: base64.urlsafe_b64encode(cipher.encrypt(text.encode())).decode()
+                else:
+                    encrypt = session.encrypt
+                # Заполнение напрямую, минуя поисковый индекс
+                start = time.perf_counter()
+                with db._conn:
+                    db._conn.executemany(
+                        'INSERT INTO entries (date, title, encrypted_content) VALUES (?, ?, ?)',
+                        ((f"2025-01-{i % 28 + 1:02d}", f"Запись {i}", encrypt(text))
+                         for i, text in enumerate(texts))
+                    )
+                written = time.perf_counter() - start
+                content_size = db._conn.execute(
+                    'SELECT SUM(LENGTH(CAST(encrypted_content AS BLOB))) FROM entries'
+                ).fetchone()[0]
+                db._conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+                start = time.perf_counter()
+                entries = db.get_all_entries(session, workers=1)
+                read = time.perf_counter() - start
+                results[kind] = content_size
+                print(f"  {kind:>5}: содержимое {content_size / 1024 / 1024:7.2f} МБ, "
+                      f"файл {os.path.getsize(path) / 1024 / 1024:7.2f} МБ, "
+                      f"запись {count / written:9,.0f} записей/с, "
+                      f"чтение {len(entries) / read:9,.0f} записей/с")
+                if kind == "до":
+                    # Фоновое обновление формата старых записей
+                    start = time.perf_counter()
+                    last_id = 0
+                    while last_id is not None:
+                        last_id = db.upgrade_content(session, last_id)
+                    db.compact()
+                    print(f"  обновление формата: {time.perf_counter() - start:7.2f} с, "
+                          f"файл после сжатия {os.path.getsize(path) / 1024 / 1024:7.2f} МБ")
+        print(f"  содержимое меньше в {results['до'] / results['после']:.2f} раза")
+
+# Замер сжатия содержимого перед шифрованием на синтетическом корпусе
+def bench_compression(count):
+    rng = random.Random(1)
+    vocabulary = synthetic_vocabulary(rng)
+    # Корпус: в основном короткие и средние записи, изредка очень длинные
+    lengths = rng.choices([20, 80, 300, 8000], weights=[50, 35, 14, 1], k=count)
+    texts = [synthetic_text(rng, vocabulary, words) for words in lengths]
+    raw_size = sum(len(text.encode()) for text in texts)
+    print(f"Сжатие {count} записей, открытый текст {raw_size / 1024 / 1024:.2f} МБ")
+    with DatabaseManager(":memory:") as db, db.open_session(PASSWORD) as session:
+        dictionary = train_dictionary(texts[:2000])
+        modes = [("без сжатия", False, None), ("zlib/lzma", True, None),
+                 ("со словарём", True, dictionary)]
+        for name, enabled, mode_dictionary in modes:
+            compression.COMPRESSION = enabled
+            session.set_dictionary(mode_dictionary)
+            start = time.perf_counter()
+            tokens = [session.encrypt(text) for text in texts]
+            encrypt_time = time.perf_counter() - start
+            start = time.perf_counter()
+            decrypted = session.decrypt_many(tokens, workers=1)
+            decrypt_time = time.perf_counter() - start
+            assert decrypted == texts
+            size = sum(len(token) for token in tokens)
+            print(f"  {name:>12}: {size / 1024 / 1024:7.2f} МБ ({size / raw_size:5.1%}), "
+                  f"шифрование {raw_size / encrypt_time / 1024 / 1024:6.1f} МБ/с, "
+                  f"дешифрование {raw_size / decrypt_time / 1024 / 1024:6.1f} МБ/с")
+        compression.COMPRESSION = True
+
+# Пиковый объём памяти Python при выполнении функции, байт
+def measure_peak(func, *args, **kwargs):
+    tracemalloc.start()
+    try:
+        func(*args, **kwargs)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+# Замер потокового экспорта и импорта (время и пиковая память Python)
+def bench_transfer(count):
+    rng = random.Random(1)
+    vocabulary = synthetic_vocabulary(rng)
+    print(f"Экспорт и импорт {count} записей")
+    # Разделители строк Unicode, которые JSON не экранирует (проверка после импорта)
+    special = {'date': "2025-01-01", 'title': "Строка\u2028за\u0085разделителем",
+               'content': "Абзац\u2029абзац\u2028строка\u0085конец\r\n"}
+    with tempfile.TemporaryDirectory() as tmp:
+        with DatabaseManager(os.path.join(tmp, "source.db")) as db, \
+                db.open_session(PASSWORD) as session:
+            records = ({'date': f"2025-01-{i % 28 + 1:02d}",
+                        'title': synthetic_text(rng, vocabulary, 4),
+                        'content': synthetic_text(rng, vocabulary, 60)} for i in range(count - 1))
+            db.import_entries([special], session)
+            db.import_entries(records, session)
+            for extension in ("jsonl", "md", "diary"):
+                path = os.path.join(tmp, f"export.{extension}")
+                start = time.perf_counter()
+                exported = export_entries(db, session, path, password=PASSWORD)
+                elapsed = time.perf_counter() - start
+                # Память замеряется отдельным проходом: tracemalloc замедляет работу
+                peak = measure_peak(export_entries, db, session, path, password=PASSWORD)
+                print(f"  экспорт {extension:>5}: {elapsed:7.2f} с, {exported / elapsed:9,.0f} записей/с, "
+                      f"файл {os.path.getsize(path) / 1024 / 1024:7.2f} МБ, "
+                      f"пик памяти {peak / 1024 / 1024:6.2f} МБ")
+
+        for extension in ("jsonl", "diary"):
+            path = os.path.join(tmp, f"export.{extension}")
+            with DatabaseManager(os.path.join(tmp, f"target-{extension}.db")) as db, \
+                    db.open_session(PASSWORD) as session:
+                start = time.perf_counter()
+                imported = import_entries(db, session, path, password=PASSWORD)
+                elapsed = time.perf_counter() - start
+                found = any((entry.title, entry.content) == (special['title'], special['content'])
+                            for entry in db.iter_entries(session))
+                if imported != count or not found:
+                    raise SystemExit(f"Импорт {extension} не совпадает с экспортом")
+            with DatabaseManager(os.path.join(tmp, f"memory-{extension}.db")) as db, \
+                    db.open_session(PASSWORD) as session:
+                peak = measure_peak(import_entries, db, session, path, password=PASSWORD)
+                print(f"  импорт  {extension:>5}: {elapsed:7.2f} с, {imported / elapsed:9,.0f} записей/с, "
+                      f"пик памяти {peak / 1024 / 1024:6.2f} МБ")
+
+# Замер калибровки вывода ключа: подобранные параметры и фактическое время входа
+def bench_kdf(targets, repeats):
+    for algorithm in ("pbkdf2-sha256", "scrypt"):
+        print(f"Калибровка {algorithm}")
+        for target in targets:
+            start = time.perf_counter()
+            params = calibrate_kdf(algorithm, target)
+            calibration = time.perf_counter() - start
+            salt = os.urandom(16)
+            timings = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                derive_key(PASSWORD, salt, params)
+                timings.append(time.perf_counter() - start)
+            shown = {key: value for key, value in params.items() if key != "kdf"}
+            print(f"  цель {target:4d} мс: {shown}, вход {min(timings) * 1000:6.1f}–"
+                  f"{max(timings) * 1000:6.1f} мс, калибровка {calibration * 1000:6.1f} мс")
+
+# Замер кэша открытых записей: повторные открытия с неравномерной частотой
+def bench_cache(count, opens, budgets):
+    rng = random.Random(1)
+    vocabulary = synthetic_vocabulary(rng)
+    print(f"Открытие записей: {opens} открытий из {count} записей")
+    with tempfile.TemporaryDirectory() as tmp:
+        with DatabaseManager(os.path.join(tmp, "bench.db")) as db, \
+                db.open_session(PASSWORD) as session:
+            db.import_entries(({'date': f"2025-01-{i % 28 + 1:02d}", 'title': f"Запись {i}",
+                                'content': synthetic_text(rng, vocabulary, 300)}
+                               for i in range(count)), session)
+            # Недавние записи открываются чаще (закон Ципфа)
+            weights = [1 / rank for rank in range(1, count + 1)]
+            ids = rng.choices(range(count, 0, -1), weights, k=opens)
+            for budget in budgets:
+                db.content_cache = ContentCache(budget)
+                start = time.perf_counter()
+                for entry_id in ids:
+                    db.get_entry(entry_id, session)
+                elapsed = time.perf_counter() - start
+                stats = db.content_cache.stats()
+                print(f"  бюджет {budget / 1024 / 1024:6.1f} МБ: {elapsed / opens * 1e6:7.1f} мкс на открытие, "
+                      f"попаданий {stats['hits']}, промахов {stats['misses']}, "
+                      f"вытеснений {stats['evictions']}, занято {stats['bytes'] / 1024 / 1024:5.2f} МБ")
+
+# Замер памяти списка записей: словари на строку и записи со слотами
+def bench_records(count):
+    rng = random.Random(1)
+    vocabulary = synthetic_vocabulary(rng)
+    print(f"Память списка из {count} записей (tracemalloc)")
+    with tempfile.TemporaryDirectory() as tmp:
+        with DatabaseManager(os.path.join(tmp, "bench.db")) as db:
+            # Только метаданные: содержимое для списка не расшифровывается
+            with db._conn:
+                db._conn.executemany(
+                    'INSERT INTO entries (date, title, encrypted_content, created_at) VALUES (?, ?, ?, ?)',
+                    ((f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}", synthetic_text(rng, vocabulary, 4),
+                      b"", f"2025-01-01 {i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}")
+                     for i in range(count))
+                )
+            variants = [
+                ("словари", lambda *row: {'id': row[0], 'date': row[1], 'title': row[2],
+                                           'created_at': row[3]}),
+                ("Entry", Entry),
+            ]
+            for name, make in variants:
+                tracemalloc.start()
+                cursor = db._conn.execute('SELECT id, date, title, created_at FROM entries')
+                entries = [make(*row) for row in cursor]
+                size = tracemalloc.get_traced_memory()[0]
+                tracemalloc.stop()
+                print(f"  {name:>8}: {size / 1024 / 1024:7.2f} МБ, {size / len(entries):6.1f} байт на запись")
+                del entries
+
+# Разбор вывода -X importtime: модуль -> (собственное, суммарное время), мкс
+def import_times(statement):
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement],
+                            cwd=os.path.dirname(os.path.abspath(__file__)),
+                            capture_output=True, text=True, check=True)
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(own), int(cumulative))
+    return modules
+
+# Замер холодного запуска: импорт до окна пароля и фоновая загрузка приложения
+def bench_startup(runs, top):
+    print(f"Холодный запуск, медиана {runs} прогонов")
+    walls = {}
+    for name, statement in (("интерпретатор", "pass"), ("до окна пароля", "import src.main"),
+                            ("всё приложение", "import src.main, src.gui")):
+        samples = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, "-c", statement], check=True,
+                           cwd=os.path.dirname(os.path.abspath(__file__)))
+            samples.append(time.perf_counter() - start)
+        walls[name] = sorted(samples)[runs // 2]
+        print(f"  {name:>16}: {walls[name] * 1000:7.1f} мс (процесс целиком)")
+
+    before, background = [], []
+    for _ in range(runs):
+        modules = import_times("import src.main, src.gui")
+        before.append(modules["src.main"][1])
+        background.append(modules["src.gui"][1])
+    print(f"  {'импорт до окна':>16}: {sorted(before)[runs // 2] / 1000:7.1f} мс")
+    print(f"  {'импорт в фоне':>16}: {sorted(background)[runs // 2] / 1000:7.1f} мс "
+          "(главное окно, база, криптография)")
+    print("  самые долгие модули (собственное время):")
+    for name, (own, cumulative) in sorted(modules.items(), key=lambda item: -item[1][0])[:top]:
+        print(f"    {name:<40} {own / 1000:7.1f} мс")
+
+# Замер больших записей: целиком и фрагментами (первый фрагмент, чтение, правка)
+def bench_chunks(sizes_mb):
+    rng = random.Random(1)
+    vocabulary = synthetic_vocabulary(rng)
+    for size in sizes_mb:
+        lines = []
+        length = 0
+        while length < size * 1024 * 1024:
+            lines.append(synthetic_text(rng, vocabulary, rng.randint(5, 25)) + "\n")
+            length += len(lines[-1])
+        text = "".join(lines)
+        edited = "".join(lines[:len(lines) // 2] + ["Вставленная строка\n"] + lines[len(lines) // 2:])
+        print(f"Запись {len(text) / 1024 / 1024:.1f} млн символов")
+        threshold = database.CONTENT_CHUNK_THRESHOLD
+        for name, limit in (("целиком", 2 * len(edited)), ("фрагментами", threshold)):
+            database.CONTENT_CHUNK_THRESHOLD = limit
+            with tempfile.TemporaryDirectory() as tmp, \
+                    DatabaseManager(os.path.join(tmp, "chunks.db")) as db, \
+                    db.open_session(PASSWORD) as session:
+                start = time.perf_counter()
+                entry = db.add_entry("2025-01-01", "Большая запись", text, session)
+                saved = time.perf_counter() - start
+                db.content_cache.clear()
+                start = time.perf_counter()
+                pieces = db.iter_content(entry.id, session)
+                next(pieces)
+                first = time.perf_counter() - start
+                for _ in pieces:
+                    pass
+                read = time.perf_counter() - start
+                db.content_cache.clear()
+                chunks_before = db._conn.execute('SELECT COUNT(*) FROM entry_chunks').fetchone()[0]
+                start = time.perf_counter()
+                db.update_entry(entry.id, "2025-01-01", "Большая запись", edited, session)
+                updated = time.perf_counter() - start
+                rewritten = db._conn.execute('SELECT MAX(chunk_id) + 1 FROM entry_chunks').fetchone()[0]
+                print(f"  {name:>12}: сохранение {saved * 1000:7.0f} мс, первый фрагмент "
+                      f"{first * 1000:6.1f} мс, чтение {read * 1000:6.0f} мс, правка "
+                      f"{updated * 1000:6.0f} мс (фрагментов {chunks_before}, "
+                      f"новых при правке {(rewritten or 0) - chunks_before})")
+        database.CONTENT_CHUNK_THRESHOLD = threshold
+
+# Замер обнаружения правок другой копией приложения: полная перезагрузка
+# списка против чтения журнала изменений
+def bench_changes(count, edits, polls):
+    records = [{'date': f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}", 'title': f"Запись {i}",
+                'content': "Текст записи. " * 10} for i in range(count)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "changes.db")
+        with DatabaseManager(path) as writer, writer.open_session(PASSWORD) as session, \
+                DatabaseManager(path) as reader:
+            start = time.perf_counter()
+            ids = [entry.id for entry in writer.add_entries(records, session)]
+            print(f"Дневник из {count} записей (добавление с журналом изменений "
+                  f"{(time.perf_counter() - start) * 1000:.0f} мс), правок другой копией: {edits}")
+            state = reader.poll_changes()
+            start = time.perf_counter()
+            for _ in range(polls):
+                reader.poll_changes(*state[:2])
+            idle = (time.perf_counter() - start) / polls
+            writer.update_entries([dict(records[i], id=ids[i], title=f"Правка {i}")
+                                   for i in range(0, count, max(count // edits, 1))][:edits],
+                                  session)
+            start = time.perf_counter()
+            total = sum(len(page) for page in reader.iter_entry_pages())
+            reload = time.perf_counter() - start
+            start = time.perf_counter()
+            state = reader.poll_changes(*state[:2])
+            poll = time.perf_counter() - start
+            print(f"  {'без изменений':>22}: {idle * 1000:8.3f} мс")
+            print(f"  {'перезагрузка списка':>22}: {reload * 1000:8.2f} мс ({total} записей)")
+            print(f"  {'журнал изменений':>22}: {poll * 1000:8.2f} мс ({len(state[2])} записей)")
+
+# Замер синхронизации двух копий дневника, различающихся несколькими правками
+def bench_sync(count, edits):
+    records = [{'date': f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}", 'title': f"Запись {i}",
+                'content': "Текст записи. " * 10} for i in range(count)]
+    with tempfile.TemporaryDirectory() as tmp:
+        first = os.path.join(tmp, "first.db")
+        second = os.path.join(tmp, "second.db")
+        with DatabaseManager(first) as db, db.open_session(PASSWORD) as session:
+            db.add_entries(records, session)
+        start = time.perf_counter()
+        shutil.copy(first, second)
+        copied = time.perf_counter() - start
+        print(f"Две копии дневника из {count} записей "
+              f"(копирование файла {os.path.getsize(first) / 1024 / 1024:.1f} МБ: {copied * 1000:.0f} мс)")
+        with DatabaseManager(first) as local, local.open_session(PASSWORD) as session, \
+                DatabaseManager(second) as remote, remote.open_session(PASSWORD) as other:
+            start = time.perf_counter()
+            result = sync.sync_databases(local, remote, session)
+            print(f"  {'первая синхронизация':>24}: {(time.perf_counter() - start) * 1000:8.1f} мс "
+                  f"(сравнение всех записей, {result})")
+            rng = random.Random(1)
+            ids = [entry_id for entry_id, in local._conn.execute('SELECT id FROM entries')]
+            for db, ses, name in ((local, session, "первой"), (remote, other, "второй")):
+                picked = rng.sample(ids, edits)
+                db.update_entries([dict(records[entry_id - 1], id=entry_id, title=f"Правка {name}")
+                                   for entry_id in picked[:-1]], ses)
+                db.delete_entry(picked[-1])
+                db.add_entry("2026-01-01", f"Новая запись {name} копии", "Текст", ses)
+            # Одна и та же запись изменена в обеих копиях
+            for db, ses in ((local, session), (remote, other)):
+                db.update_entry(ids[0], "2025-01-01", f"Конфликт {db.db_path}", "Текст", ses)
+            start = time.perf_counter()
+            result = sync.sync_databases(local, remote, session)
+            print(f"  {'после правок':>24}: {(time.perf_counter() - start) * 1000:8.1f} мс ({result})")
+            start = time.perf_counter()
+            result = sync.sync_databases(local, remote, session)
+            print(f"  {'без изменений':>24}: {(time.perf_counter() - start) * 1000:8.1f} мс ({result})")
+            same = (sorted((e.date, e.title, e.content) for e in local.iter_entries(session))
+                    == sorted((e.date, e.title, e.content) for e in remote.iter_entries(other)))
+            print(f"  копии совпадают: {'да' if same else 'НЕТ'}")
+
+# Синтетический дневник: даты за десять лет, длина текста по логнормальному закону
+# (медиана около 100 слов, изредка длинные записи)
+def synthetic_diary(rng, vocabulary, count, first_day=datetime.date(2015, 1, 1)):
+    for _ in range(count):
+        date = first_day + datetime.timedelta(days=rng.randrange(3650))
+        words = min(5000, max(3, int(rng.lognormvariate(4.6, 0.8))))
+        yield {'date': date.isoformat(),
+               'title': synthetic_text(rng, vocabulary, rng.randint(2, 6)),
+               'content': synthetic_text(rng, vocabulary, words)}
+
+# Заменитель ttk.Treeview для замеров списка без дисплея
+class HeadlessTree:
+    def __init__(self, height=30):
+        self.values = {}
+        self.height = height
+        self.counter = 0
+
+    def config(self, **options):
+        pass
+
+    def bind(self, *args):
+        pass
+
+    def insert(self, parent, index, values=()):
+        self.counter += 1
+        item = f"I{self.counter}"
+        self.values[item] = values
+        return item
+
+    def delete(self, item):
+        del self.values[item]
+
+    def item(self, item, values=()):
+        self.values[item] = values
+
+    def selection_set(self, items):
+        pass
+
+    def selection(self):
+        return ()
+
+    def winfo_height(self):
+        return 1
+
+    def cget(self, option):
+        return self.height
+
+# Заменитель полосы прокрутки для замеров без дисплея
+class HeadlessScrollbar:
+    def config(self, **options):
+        pass
+
+    def set(self, first, last):
+        pass
+
+# Выполнение функции с добавлением длительности в список замеров
+def timed(samples, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    samples.append(time.perf_counter() - start)
+    return result
+
+# Сводка замеров одной операции, мс
+def summarize(samples):
+    ordered = sorted(samples)
+    return {'count': len(ordered),
+            'total_ms': sum(ordered) * 1000,
+            'median_ms': ordered[len(ordered) // 2] * 1000,
+            'p95_ms': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+            'max_ms': ordered[-1] * 1000}
+
+# Замеры всех основных операций на дневнике заданного размера
+def run_suite(count, ops, rng):
+    vocabulary = synthetic_vocabulary(rng)
+    words = vocabulary[0]
+    samples = {}
+
+    def sample(name):
+        return samples.setdefault(name, [])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, "suite.db"))
+        session = db.open_session(PASSWORD)
+        timed(sample('generate'), db.import_entries,
+              synthetic_diary(rng, vocabulary, count), session)
+        session.close()
+
+        # Вход: проверка пароля и открытие сессии
+        for _ in range(3):
+            session = timed(sample('unlock'), db.open_session, PASSWORD)
+            session.close()
+        session = db.open_session(PASSWORD)
+
+        # Список: первая страница и полная постраничная загрузка (как при обновлении)
+        for _ in range(ops):
+            timed(sample('list_first_page'), db.list_entries)
+
+        def load_rows():
+            rows = EntryRows(total=db.count_entries())
+            for page in db.iter_entry_pages():
+                rows.extend(page)
+            rows.extend([], complete=True)
+            return rows
+
+        rows = timed(sample('list_all'), load_rows)
+
+        # Отрисовка виртуального списка при прокрутке (без дисплея)
+        view = VirtualTreeview(HeadlessTree(), HeadlessScrollbar(), lambda entry: (entry.id, entry.date, entry.title),
+                               row_height=20)
+        view.set_rows(rows)
+        for _ in range(ops):
+            timed(sample('render_scroll'), view.yview, 'moveto', rng.random())
+
+        # Быстрый фильтр: посимвольный ввод частого слова
+        quick_filter = QuickFilter()
+        query = max(words[:20], key=len)
+        for length in range(1, len(query) + 1):
+            start = time.perf_counter()
+            job = quick_filter.start(query[:length], rows.entries)
+            while not job.step(FILTER_FRAME_BUDGET_MS / 1000):
+                pass
+            sample('filter_keystroke').append(time.perf_counter() - start)
+
+        # Расширенный поиск: слова, префиксы, диапазон дат
+        searches = {
+            'search_frequent_word': (words[0], None, None),
+            'search_rare_word': (words[2000], None, None),
+            'search_two_words': (f"{words[1]} {words[5]}", None, None),
+            'search_prefix': (words[3][:3] + "*", None, None),
+            'search_long_prefix': (max(words[:50], key=len)[:5] + "*", None, None),
+            'search_date_range': ("", "2020-01-01", "2020-12-31"),
+            'search_word_in_range': (words[0], "2020-01-01", "2020-12-31"),
+        }
+        for name, (keyword, date_from, date_to) in searches.items():
+            for _ in range(5):
+                timed(sample(name), db.search, keyword, session, date_from, date_to)
+
+        # Открытие записей (без кэша) и изменения
+        db.content_cache.clear()
+        ids = [entry.id for entry in rng.sample(rows.entries, min(ops, len(rows.entries)))]
+        for entry_id in ids:
+            timed(sample('open_entry'), db.get_entry, entry_id, session)
+        added = []
+        for i in range(ops):
+            added.append(timed(sample('add_entry'), db.add_entry, "2025-06-01", f"Новая запись {i}",
+                               synthetic_text(rng, vocabulary, 100), session))
+        for i, entry in enumerate(added):
+            timed(sample('update_entry'), db.update_entry, entry.id, "2025-06-02",
+                  f"Изменённая запись {i}", synthetic_text(rng, vocabulary, 100), session)
+        for entry in added:
+            timed(sample('delete_entry'), db.delete_entry, entry.id)
+
+        session.close()
+        db.close()
+    return {name: summarize(values) for name, values in samples.items()}
+
+# Набор замеров на дневниках разного размера с выводом в JSON и сравнением с прошлым прогоном
+def bench_suite(sizes, ops, seed, output, compare):
+    results = {
+        'meta': {'app_version': APP_VERSION, 'python': platform.python_version(),
+                 'platform': platform.platform(), 'cpu_count': os.cpu_count(),
+                 'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+                 'ops': ops, 'seed': seed},
+        'sizes': {},
+    }
+    previous = None
+    if compare:
+        with open(compare, encoding='utf-8') as stream:
+            previous = json.load(stream)['sizes']
+    for count in sizes:
+        print(f"Дневник из {count} записей")
+        results['sizes'][str(count)] = operations = run_suite(count, ops, random.Random(seed))
+        for name, stats in operations.items():
+            line = (f"  {name:>22}: медиана {stats['median_ms']:9.2f} мс, "
+                    f"p95 {stats['p95_ms']:9.2f} мс, всего {stats['total_ms']:10.1f} мс")
+            old = (previous or {}).get(str(count), {}).get(name)
+            if old and old['median_ms']:
+                line += f"  ({stats['median_ms'] / old['median_ms']:5.2f}× к прошлому)"
+            print(line)
+    if output:
+        with open(output, 'w', encoding='utf-8') as stream:
+            json.dump(results, stream, ensure_ascii=False, indent=2)
+        print(f"Результаты сохранены в {output}")
+
+# Главная функция замеров
+def main():
+    parser = argparse.ArgumentParser(description="Замеры производительности дневника")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    unlock = subparsers.add_parser("unlock", help="разблокировка дневника")
+    unlock.add_argument("--entries", type=int, default=10000)
+    unlock.add_argument("--legacy-sample", type=int, default=20)
+
+    writes = subparsers.add_parser("writes", help="вставка и обновление записей")
+    writes.add_argument("--entries", type=int, default=10000)
+
+    chunks = subparsers.add_parser("chunks", help="большие записи целиком и фрагментами")
+    chunks.add_argument("--sizes", type=float, nargs="+", default=[1, 8],
+                        help="размеры записей, млн символов")
+
+    startup = subparsers.add_parser("startup", help="холодный запуск (-X importtime)")
+    startup.add_argument("--runs", type=int, default=5)
+    startup.add_argument("--top", type=int, default=15, help="число самых долгих модулей в отчёте")
+
+    changes = subparsers.add_parser("changes", help="обнаружение правок другой копией приложения")
+    changes.add_argument("--entries", type=int, default=100000)
+    changes.add_argument("--edits", type=int, default=10)
+    changes.add_argument("--polls", type=int, default=1000)
+
+    replicas = subparsers.add_parser("sync", help="синхронизация двух копий дневника")
+    replicas.add_argument("--entries", type=int, default=100000)
+    replicas.add_argument("--edits", type=int, default=5, help="число правок в каждой копии")
+
+    batch = subparsers.add_parser("batch", help="пакетная запись в одной транзакции")
+    batch.add_argument("--entries", type=int, default=10000)
+    batch.add_argument("--synchronous", default="FULL", choices=["OFF", "NORMAL", "FULL"],
+                       help="режим синхронизации SQLite на время замера")
+
+    search = subparsers.add_parser("search", help="поиск по зашифрованному индексу")
+    search.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    search.add_argument("--queries", nargs="+")
+
+    quick = subparsers.add_parser("filter", help="быстрый фильтр списка записей")
+    quick.add_argument("--entries", type=int, default=50000)
+    quick.add_argument("--query")
+
+    decrypt = subparsers.add_parser("decrypt", help="пакетное дешифрование")
+    decrypt.add_argument("--entries", type=int, default=100000)
+    decrypt.add_argument("--workers", type=int, nargs="+",
+                         default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    decrypt.add_argument("--processes", action="store_true", help="пул процессов вместо потоков")
+
+    storage = subparsers.add_parser("storage", help="размер базы и скорость чтения")
+    storage.add_argument("--entries", type=int, default=100000)
+
+    compress = subparsers.add_parser("compression", help="сжатие содержимого")
+    compress.add_argument("--entries", type=int, default=100000)
+
+    transfer = subparsers.add_parser("transfer", help="экспорт и импорт записей")
+    transfer.add_argument("--entries", type=int, default=100000)
+
+    kdf = subparsers.add_parser("kdf", help="калибровка вывода ключа")
+    kdf.add_argument("--targets", type=int, nargs="+", default=[100, 250, 500])
+    kdf.add_argument("--repeats", type=int, default=3)
+
+    cache = subparsers.add_parser("cache", help="кэш открытых записей")
+    cache.add_argument("--entries", type=int, default=10000)
+    cache.add_argument("--opens", type=int, default=50000)
+    cache.add_argument("--budgets", type=int, nargs="+", default=[0, 1048576, 8388608])
+
+    records = subparsers.add_parser("records", help="память списка записей")
+    records.add_argument("--entries", type=int, default=100000)
+
+    suite = subparsers.add_parser("suite", help="полный набор замеров с выводом в JSON")
+    suite.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000],
+                       help="размеры синтетических дневников (до 1000000)")
+    suite.add_argument("--ops", type=int, default=100, help="число повторов каждой операции")
+    suite.add_argument("--seed", type=int, default=1)
+    suite.add_argument("--output", help="файл JSON для результатов")
+    suite.add_argument("--compare", help="файл JSON прошлого прогона для сравнения")
+
+    args = parser.parse_args()
+    if args.command == "unlock":
+        bench_unlock(args.entries, args.legacy_sample)
+    elif args.command == "writes":
+        bench_writes(args.entries)
+    elif args.command == "chunks":
+        bench_chunks(args.sizes)
+    elif args.command == "startup":
+        bench_startup(args.runs, args.top)
+    elif args.command == "changes":
+        bench_changes(args.entries, args.edits, args.polls)
+    elif args.command == "sync":
+        bench_sync(args.entries, args.edits)
+    elif args.command == "batch":
+        bench_batch(args.entries, args.synchronous)
+    elif args.command == "search":
+        bench_search(args.sizes, args.queries)
+    elif args.command == "filter":
+        bench_filter(args.entries, args.query)
+    elif args.command == "decrypt":
+        bench_decrypt(args.entries, args.workers, args.processes)
+    elif args.command == "storage":
+        bench_storage(args.entries)
+    elif args.command == "compression":
+        bench_compression(args.entries)
+    elif args.command == "transfer":
+        bench_transfer(args.entries)
+    elif args.command == "kdf":
+        bench_kdf(args.targets, args.repeats)
+    elif args.command == "cache":
+        bench_cache(args.entries, args.opens, args.budgets)
+    elif args.command == "records":
+        bench_records(args.entries)
+    elif args.command == "suite":
+        bench_suite(args.sizes, args.ops, args.seed, args.output, args.compare)
+
+if __name__ == "__main__":
+    main()
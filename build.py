@@ -18,8 +18,9 @@ def check_pyinstaller():
 def install_pyinstaller():
     subprocess.check_call([sys.executable, "-m", "pip", "install", "pyinstaller"])
 
-# Компиляция портативного EXE файла
-def compile_portable_exe():
+# Компиляция портативного приложения: один EXE (распаковывается во временную
+# папку при каждом запуске) или папка с EXE (onedir, запускается без распаковки)
+def compile_portable_exe(onedir=False):
     print("")
     print("Приложение компилируется...")
     current_dir = Path(__file__).parent
@@ -31,7 +32,7 @@ def compile_portable_exe():
         return False
     cmd = [
         sys.executable, "-m", "PyInstaller",
-        "--onefile",
+        "--onedir" if onedir else "--onefile",
         "--windowed",
         "--name=Личный дневник",
         "--clean",
@@ -50,7 +51,15 @@ def compile_portable_exe():
         portable_dir = current_dir / "App"
         portable_dir.mkdir(exist_ok=True)
         dist_dir = current_dir / "dist"
-        if dist_dir.exists():
+        app_dir = dist_dir / "Личный дневник"
+        if onedir and app_dir.exists():
+            target_dir = portable_dir / app_dir.name
+            if target_dir.exists():
+                shutil.rmtree(target_dir)
+            shutil.copytree(app_dir, target_dir)
+            print("")
+            print(f"Приложение находиться в папке 'App/{app_dir.name}'")
+        elif dist_dir.exists():
             exe_files = list(dist_dir.glob("*.exe"))
             if exe_files:
                 for exe in exe_files:
@@ -76,7 +85,8 @@ def main():
     print("=" * 21)
     if not check_pyinstaller():
         install_pyinstaller()
-    success = compile_portable_exe()
+    # python build.py --onedir — сборка папкой для быстрого запуска
+    success = compile_portable_exe(onedir="--onedir" in sys.argv[1:])
     if success:
         ""
     else:
@@ -0,0 +1,6 @@
+# Запуск интерфейса командной строки: python -m src
+
+import sys
+from src.cli import main
+
+sys.exit(main())
@@ -0,0 +1,79 @@
+# Модуль кэша расшифрованных записей
+
+import threading
+from collections import OrderedDict
+from src.config import CONTENT_CACHE_BYTES
+
+class ContentCache:
+    """Кэш расшифрованного содержимого записей по ID с вытеснением LRU.
+
+    Размер ограничен бюджетом в байтах (UTF-8). Текст хранится в bytearray,
+    который затирается нулями при вытеснении и очистке; строки, уже
+    выданные из кэша, Python затереть не позволяет.
+    """
+
+    def __init__(self, budget: int = CONTENT_CACHE_BYTES):
+        self.budget = budget
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, entry_id: int):
+        """Содержимое записи или None при промахе."""
+        with self._lock:
+            buffer = self._items.get(entry_id)
+            if buffer is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(entry_id)
+            self.hits += 1
+            return buffer.decode()
+
+    def put(self, entry_id: int, content: str):
+        """Сохранение содержимого с вытеснением давно не использованных записей."""
+        # Заведомо не помещающийся текст не кодируется (UTF-8 не короче числа символов)
+        if len(content) > self.budget:
+            self.invalidate(entry_id)
+            return
+        buffer = bytearray(content.encode())
+        with self._lock:
+            self._discard(entry_id)
+            if len(buffer) > self.budget:
+                _wipe(buffer)
+                return
+            self._items[entry_id] = buffer
+            self.size += len(buffer)
+            while self.size > self.budget:
+                self._discard(next(iter(self._items)))
+                self.evictions += 1
+
+    def invalidate(self, entry_id: int):
+        """Удаление записи из кэша (запись изменена или удалена)."""
+        with self._lock:
+            self._discard(entry_id)
+
+    def clear(self):
+        """Очистка кэша с затиранием всего содержимого."""
+        with self._lock:
+            for entry_id in list(self._items):
+                self._discard(entry_id)
+
+    def stats(self) -> dict:
+        """Счётчики кэша: попадания, промахи, вытеснения, занятый объём."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'entries': len(self._items), 'bytes': self.size, 'budget': self.budget}
+
+    def _discard(self, entry_id: int):
+        """Удаление и затирание одного элемента (под блокировкой)."""
+        buffer = self._items.pop(entry_id, None)
+        if buffer is not None:
+            self.size -= len(buffer)
+            _wipe(buffer)
+
+def _wipe(buffer: bytearray):
+    """Затирание буфера нулями."""
+    buffer[:] = bytes(len(buffer))
@@ -0,0 +1,63 @@
+# Модуль хранения больших записей фрагментами
+
+import zlib
+from src.config import CONTENT_CHUNK_SIZE
+
+# Граница фрагмента ставится после строки, контрольная сумма которой делится
+# на CUT_DIVISOR, но не раньше набора size символов. Границы зависят от
+# содержимого, а не от смещения: вставка текста в начале меняет только
+# ближайшие фрагменты, остальные совпадают с прежними и не перезаписываются.
+CUT_DIVISOR = 8
+
+def split_content(text: str, size: int = CONTENT_CHUNK_SIZE) -> list:
+    """Разбиение текста на фрагменты по границам строк (от size до 2 * size символов).
+
+    Строка длиннее удвоенного размера (текст без переводов строк) режется
+    на части фиксированного размера.
+    """
+    chunks = []
+    current = []
+    length = 0
+    for line in text.splitlines(keepends=True):
+        while len(line) > 2 * size:
+            if current:
+                chunks.append(''.join(current))
+                current, length = [], 0
+            chunks.append(line[:2 * size])
+            line = line[2 * size:]
+        current.append(line)
+        length += len(line)
+        if length >= 2 * size or (length >= size
+                                  and zlib.crc32(line.encode()) % CUT_DIVISOR == 0):
+            chunks.append(''.join(current))
+            current, length = [], 0
+    if current:
+        chunks.append(''.join(current))
+    return chunks
+
+def plan_chunks(session, pieces: list, manifest: dict = None) -> tuple:
+    """Новая опись фрагментов с учётом прежней.
+
+    Фрагменты с тем же отпечатком сохраняют прежние номера и не шифруются
+    заново. Возвращает (опись, [(номер, текст) для записи], [устаревшие номера]).
+    Опись: {'chunks': [[номер, отпечаток, длина], ...], 'next': следующий номер};
+    номера не используются повторно.
+    """
+    previous = {}
+    for chunk_id, digest, length in (manifest or {}).get('chunks', []):
+        previous.setdefault(digest, []).append(chunk_id)
+    next_id = (manifest or {}).get('next', 0)
+    chunks = []
+    writes = []
+    for piece in pieces:
+        digest = session.chunk_digest(piece)
+        reused = previous.get(digest)
+        if reused:
+            chunk_id = reused.pop()
+        else:
+            chunk_id = next_id
+            next_id += 1
+            writes.append((chunk_id, piece))
+        chunks.append([chunk_id, digest, len(piece)])
+    stale = [chunk_id for ids in previous.values() for chunk_id in ids]
+    return {'chunks': chunks, 'next': next_id}, writes, stale
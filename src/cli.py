@@ -0,0 +1,217 @@
+# Модуль интерфейса командной строки (без tkinter)
+
+import os
+import sys
+from datetime import datetime
+from src.config import APP_NAME, DB_NAME, CLI_PASSWORD_ENV, CLI_ARCHIVE_PASSWORD_ENV
+
+def parse_args(argv=None):
+    """Разбор команд и параметров командной строки."""
+    import argparse
+    parser = argparse.ArgumentParser(
+        prog='python -m src', description=f"{APP_NAME}: работа без графического интерфейса",
+        epilog=f"Мастер-пароль берётся из переменной окружения {CLI_PASSWORD_ENV}, "
+               "иначе запрашивается в терминале или читается первой строкой stdin."
+    )
+    parser.add_argument('--db', default=DB_NAME, help='файл базы данных дневника')
+    parser.add_argument('--timings', action='store_true',
+                        help='вывести в stderr замеры производительности после команды')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    add = commands.add_parser('add', help='добавить запись (текст — из --text, --file или stdin)')
+    add.add_argument('title')
+    add.add_argument('--date', default=datetime.now().strftime('%Y-%m-%d'),
+                     help='дата записи (ГГГГ-ММ-ДД), по умолчанию сегодня')
+    add.add_argument('--text')
+    add.add_argument('--file', help='файл с текстом записи (UTF-8)')
+
+    listing = commands.add_parser('list', help='список записей (без пароля)')
+    listing.add_argument('--limit', type=int, help='не больше указанного числа записей')
+
+    search = commands.add_parser('search', help='поиск записей по словам и датам')
+    search.add_argument('query', nargs='?', default='')
+    search.add_argument('--from', dest='date_from', help='не раньше даты (ГГГГ-ММ-ДД)')
+    search.add_argument('--to', dest='date_to', help='не позже даты (ГГГГ-ММ-ДД)')
+
+    export = commands.add_parser('export', help='экспорт записей (JSONL, Markdown, архив .diary)')
+    export.add_argument('path', help="файл экспорта; '-' — JSONL в stdout")
+    export.add_argument('--format', choices=['jsonl', 'markdown', 'archive'],
+                        help='формат (по умолчанию — по расширению файла)')
+
+    restore = commands.add_parser('import', help='импорт записей из JSONL или архива .diary')
+    restore.add_argument('path')
+
+    replicate = commands.add_parser('sync', help='обмен изменениями с копией дневника в другом файле')
+    replicate.add_argument('path', help='файл копии (новый файл станет копией этого дневника)')
+    replicate.add_argument('--full', action='store_true',
+                           help='сравнить все записи, а не только изменённые с прошлого обмена')
+
+    commands.add_parser('stats', help='сведения о дневнике (без пароля)')
+    return parser.parse_args(argv)
+
+def read_password(prompt: str, env: str = CLI_PASSWORD_ENV) -> str:
+    """Пароль из переменной окружения, терминала или первой строки stdin."""
+    password = os.environ.get(env)
+    if password:
+        return password
+    if sys.stdin.isatty():
+        import getpass
+        return getpass.getpass(prompt)
+    return sys.stdin.readline().rstrip('\r\n')
+
+def open_session(db):
+    """Открытие сессии шифрования; None — пароль не подошёл."""
+    password = read_password('Мастер-пароль: ')
+    if not password:
+        return None
+    return db.open_session(password)
+
+def print_entries(entries, stream=None) -> int:
+    """Вывод записей построчно: ID, дата, заголовок через табуляцию."""
+    stream = stream or sys.stdout
+    count = 0
+    for entry in entries:
+        stream.write(f"{entry.id}\t{entry.date}\t{entry.title}\n")
+        count += 1
+    return count
+
+def command_add(db, session, args) -> int:
+    """Добавление одной записи; выводит ID новой записи.
+
+    Поля проверяются, как в форме добавления: пустые не допускаются.
+    """
+    if args.text is not None:
+        content = args.text
+    elif args.file:
+        with open(args.file, encoding='utf-8') as stream:
+            content = stream.read()
+    else:
+        content = sys.stdin.read()
+    from src.records import invalid_field
+    record = {'date': args.date.strip(), 'title': args.title.strip(), 'content': content.strip()}
+    field = invalid_field(record)
+    if field:
+        names = {'date': 'дату', 'title': 'заголовок', 'content': 'содержимое записи'}
+        print(f"Введите {names[field]}", file=sys.stderr)
+        return 1
+    entry = db.add_entry(record['date'], record['title'], record['content'], session)
+    if entry is None:
+        return 1
+    print(entry.id)
+    return 0
+
+def command_list(db, args) -> int:
+    """Постраничный вывод списка записей по мере чтения из базы."""
+    remaining = args.limit
+    for page in db.iter_entry_pages():
+        if remaining is not None:
+            page = page[:remaining]
+            remaining -= len(page)
+        print_entries(page)
+        sys.stdout.flush()
+        if remaining is not None and remaining <= 0:
+            break
+    return 0
+
+def command_search(db, session, args) -> int:
+    """Поиск по зашифрованному индексу."""
+    print_entries(db.search(args.query, session, args.date_from, args.date_to))
+    return 0
+
+def command_export(db, session, args) -> int:
+    """Экспорт записей в файл или потоком в stdout (страницами с пакетной расшифровкой)."""
+    from src import transfer
+    if args.path == '-':
+        count = transfer.write_jsonl(db.iter_entries(session), sys.stdout)
+    else:
+        fmt = args.format or transfer.detect_format(args.path)
+        password = None
+        if fmt == 'archive':
+            password = read_password('Пароль архива: ', CLI_ARCHIVE_PASSWORD_ENV)
+            if not password:
+                print("Не задан пароль архива", file=sys.stderr)
+                return 1
+        count = transfer.export_entries(db, session, args.path, fmt, password)
+        if count is None:
+            return 1
+    print(f"Экспортировано записей: {count}", file=sys.stderr)
+    return 0
+
+def command_import(db, session, args) -> int:
+    """Импорт записей одной транзакцией."""
+    from src import transfer
+    fmt = transfer.detect_format(args.path)
+    password = None
+    if fmt == 'archive':
+        password = read_password('Пароль архива: ', CLI_ARCHIVE_PASSWORD_ENV)
+        if not password:
+            print("Не задан пароль архива", file=sys.stderr)
+            return 1
+    count = transfer.import_entries(db, session, args.path, fmt, password)
+    if count is None:
+        return 1
+    print(f"Импортировано записей: {count}", file=sys.stderr)
+    return 0
+
+def command_sync(db, session, args) -> int:
+    """Двусторонний обмен изменёнными записями с копией дневника."""
+    from src.sync import sync_file
+    result = sync_file(db, session, args.path, args.full)
+    if result is None:
+        return 1
+    print(f"Получено записей: {result['received']}, передано: {result['sent']}, "
+          f"конфликтов: {result['conflicts']}", file=sys.stderr)
+    return 0
+
+def command_stats(db, args) -> int:
+    """Число записей и размер файлов базы."""
+    size = sum(os.path.getsize(path) for path in (args.db, args.db + '-wal')
+               if os.path.exists(path))
+    print(f"Записей:\t{db.count_entries()}")
+    print(f"Размер базы:\t{size / 1024 / 1024:.1f} МБ")
+    return 0
+
+def run(args) -> int:
+    """Выполнение команды; возвращает код завершения."""
+    # База и криптография загружаются после разбора параметров (быстрый --help)
+    from src.database import DatabaseManager
+    # Новый файл дневника создают команды, добавляющие записи
+    if args.command not in ('add', 'import') and not os.path.exists(args.db):
+        print(f"База данных не найдена: {args.db}", file=sys.stderr)
+        return 1
+    with DatabaseManager(args.db) as db:
+        if args.command == 'list':
+            return command_list(db, args)
+        if args.command == 'stats':
+            return command_stats(db, args)
+        session = open_session(db)
+        if session is None:
+            print("Неверный мастер-пароль", file=sys.stderr)
+            return 1
+        with session:
+            if args.command == 'add':
+                return command_add(db, session, args)
+            if args.command == 'search':
+                return command_search(db, session, args)
+            if args.command == 'export':
+                return command_export(db, session, args)
+            if args.command == 'sync':
+                return command_sync(db, session, args)
+            return command_import(db, session, args)
+
+def main(argv=None) -> int:
+    """Главная функция интерфейса командной строки."""
+    args = parse_args(argv)
+    try:
+        return run(args)
+    except BrokenPipeError:
+        # Вывод оборван читателем (например, `| head`) — это не ошибка;
+        # stdout перенаправляется, чтобы Python не сообщал об ошибке при выходе
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        if args.timings:
+            from src.metrics import metrics
+            print(metrics.report(), file=sys.stderr)
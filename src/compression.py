@@ -0,0 +1,69 @@
+# Модуль сжатия содержимого записей
+
+import lzma
+import zlib
+from collections import Counter
+from src.config import (COMPRESSION, COMPRESS_MIN_SIZE, COMPRESS_LZMA_MIN_SIZE,
+                        COMPRESS_LEVEL, COMPRESS_LZMA_PRESET, DICTIONARY_SIZE)
+
+# Флаги заголовка зашифрованного содержимого (байт флагов, см. src.security)
+FLAG_ZLIB = 0x01                # Сжато zlib (deflate без заголовка)
+FLAG_LZMA = 0x02                # Сжато lzma (формат xz)
+FLAG_DICTIONARY = 0x04          # При сжатии zlib использован общий словарь базы
+CODEC_MASK = FLAG_ZLIB | FLAG_LZMA | FLAG_DICTIONARY
+
+def compress(data: bytes, dictionary: bytes = None) -> tuple:
+    """Сжатие открытого текста перед шифрованием.
+
+    Короткие тексты сжимаются zlib с общим словарём (если он есть), длинные —
+    lzma. Возвращает пару (флаги, данные); если сжатие не уменьшает размер,
+    данные возвращаются как есть с флагами 0.
+    """
+    if not COMPRESSION or len(data) < COMPRESS_MIN_SIZE:
+        return 0, data
+    if len(data) >= COMPRESS_LZMA_MIN_SIZE:
+        flags, packed = FLAG_LZMA, lzma.compress(data, preset=COMPRESS_LZMA_PRESET)
+    elif dictionary:
+        compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, -15, zdict=dictionary)
+        flags, packed = FLAG_ZLIB | FLAG_DICTIONARY, compressor.compress(data) + compressor.flush()
+    else:
+        compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, -15)
+        flags, packed = FLAG_ZLIB, compressor.compress(data) + compressor.flush()
+    if len(packed) >= len(data):
+        return 0, data
+    return flags, packed
+
+def decompress(flags: int, data: bytes, dictionary: bytes = None) -> bytes:
+    """Распаковка открытого текста по флагам заголовка."""
+    codec = flags & CODEC_MASK
+    if codec == 0:
+        return data
+    if codec == FLAG_LZMA:
+        return lzma.decompress(data)
+    if codec == FLAG_ZLIB:
+        return zlib.decompressobj(-15).decompress(data)
+    if codec == FLAG_ZLIB | FLAG_DICTIONARY:
+        if not dictionary:
+            raise ValueError("Нет словаря сжатия")
+        return zlib.decompressobj(-15, zdict=dictionary).decompress(data)
+    raise ValueError(f"Неизвестный способ сжатия: {flags:#04x}")
+
+def train_dictionary(texts, size: int = DICTIONARY_SIZE) -> bytes:
+    """Обучение общего словаря zlib по образцам текстов.
+
+    Словарь составляется из самых частых слов с пробелами; самые частые
+    ставятся в конец, так как ссылки на близкие позиции кодируются короче.
+    """
+    counts = Counter()
+    for text in texts:
+        counts.update(text.split())
+    dictionary = bytearray()
+    for word, count in counts.most_common():
+        # Слово окупается, только если встречается неоднократно
+        if count < 2:
+            break
+        chunk = (word + " ").encode()
+        if len(dictionary) + len(chunk) > size:
+            break
+        dictionary[:0] = chunk
+    return bytes(dictionary)
@@ -3,4 +3,65 @@
 APP_NAME = "Личный дневник"     # Название приложения
 APP_VERSION = "1.0.0"           # Версия приложения
 DB_NAME = "diary.db"            # База данных приложения
-ICON_PATH = "icon.ico"          # Иконка приложения
\ No newline at end of file
+ICON_PATH = "icon.ico"          # Иконка приложения
+
+# Параметры подключения SQLite
+DB_SYNCHRONOUS = "NORMAL"       # Режим синхронизации (в WAL достаточно NORMAL)
+DB_CACHE_SIZE_KB = 16384        # Размер кэша страниц, КБ
+DB_MMAP_SIZE = 268435456        # Объём отображения файла в память, байт
+DB_STATEMENT_CACHE = 128        # Число кэшируемых подготовленных запросов
+DB_PAGE_SIZE = 200              # Размер страницы при постраничной загрузке записей
+DB_BUSY_TIMEOUT_MS = 5000       # Ожидание блокировки базы другой копией приложения, мс
+
+# Параметры интерфейса
+FILTER_DEBOUNCE_MS = 150        # Задержка запуска быстрого фильтра после ввода, мс
+FILTER_FRAME_BUDGET_MS = 8      # Время работы фильтра за один шаг цикла Tk, мс
+FILTER_CHUNK_SIZE = 1000        # Число записей, проверяемых фильтром за одну порцию
+TASK_POLL_MS = 30               # Период опроса результатов фоновых задач, мс
+TASK_BATCH_INTERVAL = 0.05      # Интервал отправки порций потоковой задачи, с
+CHANGE_POLL_MS = 1000           # Период проверки изменений базы другими копиями приложения, мс
+CHANGE_RELOAD_LIMIT = 500       # Число внешних изменений, начиная с которого список загружается заново
+
+# Параметры вывода ключа из мастер-пароля
+KDF_ALGORITHM = "scrypt"        # Алгоритм для новых связок ключей: scrypt или pbkdf2-sha256
+KDF_TARGET_MS = 250             # Желаемое время проверки пароля при входе, мс
+KDF_MIN_ITERATIONS = 100000     # Минимальное число итераций PBKDF2
+KDF_SCRYPT_MIN_N = 16384        # Минимальный параметр n scrypt (16 МБ памяти при r = 8)
+KDF_SCRYPT_MAX_MEMORY = 268435456  # Предельный объём памяти scrypt, байт
+
+# Параметры пакетного дешифрования
+DECRYPT_WORKERS = 1             # Число параллельных исполнителей (1 — без пула, 0 — по числу ядер)
+DECRYPT_CHUNK_SIZE = 256        # Число записей в порции одного исполнителя
+DECRYPT_PROCESSES = False       # Пул процессов вместо пула потоков
+DECRYPT_PAGE_SIZE = 2048        # Размер страницы при обходе записей с расшифровкой
+UPGRADE_BATCH_SIZE = 500        # Число записей старого формата, перешифровываемых за одну задачу
+
+# Параметры хранения больших записей фрагментами
+CONTENT_CHUNK_THRESHOLD = 262144  # Размер текста, с которого запись хранится фрагментами, символов
+CONTENT_CHUNK_SIZE = 65536      # Наименьший размер фрагмента (наибольший — вдвое больше), символов
+
+# Параметры кэша расшифрованных записей
+CONTENT_CACHE_BYTES = 8388608   # Бюджет кэша открытых записей, байт (0 — без кэша)
+
+# Параметры сжатия содержимого
+COMPRESSION = True              # Сжатие текста записей перед шифрованием
+COMPRESS_MIN_SIZE = 64          # Минимальный размер текста для сжатия, байт
+COMPRESS_LZMA_MIN_SIZE = 65536  # Размер текста, с которого вместо zlib применяется lzma, байт
+COMPRESS_LEVEL = 6              # Уровень сжатия zlib
+COMPRESS_LZMA_PRESET = 1        # Уровень сжатия lzma (высокие уровни медленны)
+DICTIONARY_SIZE = 16384         # Размер общего словаря сжатия, байт
+DICTIONARY_MIN_ENTRIES = 100    # Число записей, после которого обучается словарь
+DICTIONARY_SAMPLE = 2000        # Число записей в выборке для обучения словаря
+
+# Параметры экспорта и импорта
+TRANSFER_BATCH_SIZE = 1000      # Число записей в порции импорта и в блоке архива
+ARCHIVE_KDF_ITERATIONS = 600000 # Число итераций PBKDF2 для ключа архива
+
+# Параметры замеров производительности
+METRICS = True                  # Сбор счётчиков и длительностей операций (окно «Статистика»)
+METRICS_BUCKETS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 250, 500, 1000, 5000)  # Границы корзин гистограмм, мс
+METRICS_PROFILE_LINES = 30      # Число функций в сводке профилирования cProfile
+
+# Параметры командной строки (python -m src)
+CLI_PASSWORD_ENV = "DIARY_PASSWORD"                  # Переменная окружения с мастер-паролем
+CLI_ARCHIVE_PASSWORD_ENV = "DIARY_ARCHIVE_PASSWORD"  # Переменная окружения с паролем архива
@@ -1,8 +1,26 @@
 # Модуль работы с базой данных
 
+import hashlib
+import hmac
+import os
 import sqlite3
-from src.security import SecurityManager
-from src.config import DB_NAME
+import threading
+from itertools import islice
+from src.security import (SecurityManager, CryptoSession, is_chunked_content, chunk_associated,
+                          uses_dictionary)
+from src.chunks import split_content, plan_chunks
+from src.cache import ContentCache
+from src.compression import train_dictionary
+from src.search import index_terms, parse_query, matches_prefixes
+from src.migrations import migrate
+from src.records import Entry, entry_key, invalid_field
+from src.metrics import metrics, TimedConnection
+from src.config import (DB_NAME, DB_SYNCHRONOUS, DB_CACHE_SIZE_KB,
+                        DB_MMAP_SIZE, DB_STATEMENT_CACHE, DB_PAGE_SIZE, DB_BUSY_TIMEOUT_MS,
+                        DECRYPT_WORKERS, DECRYPT_CHUNK_SIZE, DECRYPT_PAGE_SIZE,
+                        DECRYPT_PROCESSES, UPGRADE_BATCH_SIZE,
+                        DICTIONARY_MIN_ENTRIES, DICTIONARY_SAMPLE,
+                        TRANSFER_BATCH_SIZE, CONTENT_CHUNK_THRESHOLD)
 
 class DatabaseManager:
     """Класс управления базой данных дневника."""
@@ -10,100 +28,1172 @@ class DatabaseManager:
     def __init__(self, db_path: str = DB_NAME):
         self.db_path = db_path
         self.security = SecurityManager()
+        self._lock = threading.RLock()
+        self.content_cache = ContentCache()
+        # В базе остались строки старого формата, зашифрованные ключом из пароля
+        self.legacy_content = False
+        # Зашифрованный словарь сжатия, установленный в сессию (см. load_dictionary)
+        self._dictionary_setting = None
+        self._conn = self._connect()
         self._init_database()
 
-    def _init_database(self):
-        """Создание таблицы entries, если она не существует."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS entries (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date TEXT NOT NULL,
-                title TEXT NOT NULL,
-                encrypted_content TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        conn.commit()
-        conn.close()
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _connect(self) -> TimedConnection:
+        """Открытие долгоживущего соединения с настройкой WAL и кэшей
+        (запросы замеряются, см. src.metrics).
+
+        Транзакции записи начинаются с BEGIN IMMEDIATE: блокировка записи берётся
+        сразу, и при работе нескольких копий приложения с одной базой вторая
+        ждёт до DB_BUSY_TIMEOUT_MS вместо ошибки посреди транзакции.
+        """
+        conn = sqlite3.connect(self.db_path, check_same_thread=False,
+                               cached_statements=DB_STATEMENT_CACHE,
+                               timeout=DB_BUSY_TIMEOUT_MS / 1000, isolation_level='IMMEDIATE')
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute(f'PRAGMA synchronous = {DB_SYNCHRONOUS}')
+        conn.execute(f'PRAGMA cache_size = {-DB_CACHE_SIZE_KB}')
+        conn.execute(f'PRAGMA mmap_size = {DB_MMAP_SIZE}')
+        conn.execute('PRAGMA temp_store = MEMORY')
+        return TimedConnection(conn)
+
+    def close(self):
+        """Закрытие соединения с базой данных (кэш расшифрованных записей затирается)."""
+        self.content_cache.clear()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    @metrics.timed('db.open_session')
+    def open_session(self, master_password: str):
+        """Открытие сессии шифрования по мастер-паролю (со словарём сжатия базы).
+
+        Возвращает None, если пароль не подходит. Если время входа далеко от
+        KDF_TARGET_MS, ключ данных перешифровывается с откалиброванными
+        параметрами вывода ключа. Если связки ключей нет, создаётся связка
+        со случайным ключом данных; в базе, созданной до связки ключей, строки
+        старого формата открываются прежним ключом из пароля, пока
+        upgrade_content не перешифрует их ключом данных.
+        """
+        keyring = self.get_setting('keyring')
+        legacy = self.get_setting('legacy_content') == '1'
+        if keyring:
+            session, elapsed = self.security.unlock(keyring, master_password, legacy)
+            if session is None:
+                return None
+            # Параметры вывода ключа подстраиваются под устройство перешифровкой ключа данных
+            if self.security.needs_tuning(keyring, elapsed):
+                tuned = self.security.retune(keyring, session, master_password)
+                if tuned:
+                    keyring = tuned
+                    self.set_setting('keyring', keyring)
+            # Связки, созданные до контрольного значения ключа, дополняются им
+            if self.security.keyring_check(keyring) is None:
+                self.set_setting('keyring', self.security.with_key_check(keyring, session))
+        elif self.count_entries() == 0:
+            keyring, session = self.security.create_keyring(master_password)
+            self.set_setting('keyring', keyring)
+        else:
+            keyring, session = self.security.create_keyring(master_password, legacy=True)
+            # Связка сохраняется, только если ключ подходит к записям
+            if not self._check_legacy_key(session):
+                session.close()
+                return None
+            # Признак — раньше связки: без него строки старого формата не откроются
+            self.set_setting('legacy_content', '1')
+            self.set_setting('keyring', keyring)
+            legacy = True
+        self.legacy_content = legacy
+        self._dictionary_setting = None
+        self.load_dictionary(session)
+        return session
+
+    def load_dictionary(self, session: CryptoSession):
+        """Установка в сессию словаря сжатия базы, если он сменился.
+
+        Словарь может заменить синхронизация в другом процессе (см.
+        replace_dictionary), поэтому он перечитывается перед записью
+        и при проверке изменений.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM settings WHERE key = 'compression_dictionary'"
+            ).fetchone()
+        encrypted_dictionary = row[0] if row else None
+        if encrypted_dictionary != self._dictionary_setting:
+            session.set_dictionary(session.decrypt(encrypted_dictionary).encode()
+                                   if encrypted_dictionary else None)
+            self._dictionary_setting = encrypted_dictionary
 
-    def add_entry(self, date: str, title: str, content: str, master_password: str) -> bool:
-        """Добавление новой записи в дневник."""
+    def _check_legacy_key(self, session: CryptoSession, sample: int = 20) -> bool:
+        """Проверка ключа старой базы: расшифровывается хотя бы одна запись из выборки."""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT encrypted_content FROM entries LIMIT ?', (sample,)
+            ).fetchall()
+        return any(session.decrypt(row[0]) is not None for row in rows)
+
+    def matches_key(self, session: CryptoSession, sample: int = 20) -> bool:
+        """Ключ сессии — ключ данных этой базы (проверка копии перед синхронизацией).
+
+        Строки старого формата не в счёт: у копий файла старой версии они
+        общие, а ключи данных у каждой копии свои."""
+        check = self.security.keyring_check(self.get_setting('keyring'))
+        if check is not None:
+            return hmac.compare_digest(check, session.key_check())
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT encrypted_content FROM entries WHERE typeof(encrypted_content) = 'blob' LIMIT ?",
+                (sample,)
+            ).fetchall()
+        return any(session.decrypt(row[0]) is not None for row in rows)
+
+    @metrics.timed('db.change_password')
+    def change_password(self, old_password: str, new_password: str) -> bool:
+        """Смена мастер-пароля: перешифровывается только ключ данных в связке ключей.
+
+        Недоступна, пока в базе есть строки старого формата: их открывает
+        ключ из прежнего пароля (см. upgrade_content).
+        """
         try:
-            encrypted_content = self.security.encrypt(content, master_password)
-            if not encrypted_content:
+            keyring = self.get_setting('keyring')
+            if not keyring:
+                return False
+            if self.get_setting('legacy_content') == '1':
+                print("Ошибка смены пароля: записи старого формата ещё не перешифрованы")
                 return False
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO entries (date, title, encrypted_content)
-                VALUES (?, ?, ?)
-            ''', (date, title, encrypted_content))
-            conn.commit()
-            conn.close()
+            new_keyring = self.security.rewrap(keyring, old_password, new_password)
+            if new_keyring is None:
+                return False
+            self.set_setting('keyring', new_keyring)
             return True
         except Exception as e:
-            print(f"Ошибка добавления записи: {e}")
+            print(f"Ошибка смены пароля: {e}")
             return False
 
-    def get_all_entries(self, master_password: str):
-        """Получение всех записей дневника с расшифрованным содержимым."""
+    def _init_database(self):
+        """Создание или обновление схемы базы данных (см. src.migrations)."""
+        with self._lock:
+            migrate(self._conn)
+
+    def get_setting(self, key: str, default=None):
+        """Чтение служебного параметра базы."""
+        with self._lock:
+            row = self._conn.execute('SELECT value FROM settings WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_setting(self, key: str, value):
+        """Запись служебного параметра базы."""
+        with self._lock, self._conn:
+            self._conn.execute('INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)',
+                               (key, value))
+
+    @metrics.timed('db.add_entry')
+    def add_entry(self, date: str, title: str, content: str, session: CryptoSession):
+        """Добавление новой записи в дневник.
+
+        Возвращает метаданные новой записи (id, date, title, created_at) или None.
+        """
+        return self.add_entries([{'date': date, 'title': title, 'content': content}], session)[0]
+
+    @metrics.timed('db.import_entries')
+    def import_entries(self, records, session: CryptoSession,
+                       batch_size: int = TRANSFER_BATCH_SIZE):
+        """Массовое добавление записей из итератора словарей (date, title, content[, created_at]).
+
+        Дата, заголовок и текст должны быть непустыми строками. Записи шифруются и вставляются порциями через executemany в одной
+        транзакции; ID назначаются заранее, чтобы сразу заполнить поисковый
+        индекс. Возвращает число добавленных записей или None (без изменений в базе).
+        """
+        records = iter(records)
+        try:
+            with self._lock, self._conn:
+                # Блокировка записи до выбора ID: их не займёт другая копия приложения
+                self._conn.execute('BEGIN IMMEDIATE')
+                self.load_dictionary(session)
+                next_id = self._next_entry_id()
+                count = 0
+                while True:
+                    batch = list(islice(records, batch_size))
+                    if not batch:
+                        return count
+                    # Токены частых слов повторяются из записи в запись; кэш — на порцию,
+                    # чтобы память не росла со словарём всего импорта
+                    tokens = {}
+                    items = []
+                    for record in batch:
+                        field = invalid_field(record)
+                        if field:
+                            raise ValueError(f"запись №{count + len(items) + 1}: "
+                                             f"пустое или некорректное поле {field}")
+                        item = self._prepare_entry(next_id, record, session, tokens)
+                        if item is None:
+                            raise ValueError("Не удалось зашифровать запись")
+                        items.append(item)
+                        next_id += 1
+                    self._insert_entries(items)
+                    count += len(items)
+        except Exception as e:
+            print(f"Ошибка импорта записей: {e}")
+            return None
+
+    @metrics.timed('db.add_entries')
+    def add_entries(self, records, session: CryptoSession,
+                    batch_size: int = TRANSFER_BATCH_SIZE) -> list:
+        """Добавление нескольких записей (словари date, title, content[, created_at])
+        в одной транзакции.
+
+        Возвращает список результатов по порядку записей: метаданные новой
+        записи или None, если её не удалось зашифровать или вставить
+        (остальные записи при этом сохраняются).
+        """
+        records = list(records)
+        results = [None] * len(records)
+        try:
+            with self._lock, self._conn:
+                self._conn.execute('BEGIN IMMEDIATE')
+                self.load_dictionary(session)
+                next_id = self._next_entry_id()
+                tokens = {}
+                for start in range(0, len(records), batch_size):
+                    items = []
+                    positions = []
+                    for position in range(start, min(start + batch_size, len(records))):
+                        item = self._prepare_entry(next_id, records[position], session, tokens)
+                        if item is not None:
+                            items.append(item)
+                            positions.append(position)
+                            next_id += 1
+                    done = self._execute_batch(items, self._insert_entries)
+                    for position, item, ok in zip(positions, items, done):
+                        if ok:
+                            results[position] = self._get_meta(item[0][0])
+            return results
+        except Exception as e:
+            print(f"Ошибка добавления записей: {e}")
+            return [None] * len(records)
+
+    @metrics.timed('db.get_all_entries')
+    def get_all_entries(self, session: CryptoSession, workers: int = DECRYPT_WORKERS,
+                        chunk_size: int = DECRYPT_CHUNK_SIZE, processes: bool = DECRYPT_PROCESSES):
+        """Получение всех записей дневника с расшифрованным содержимым.
+
+        Содержимое расшифровывается пакетно, параллельно по порциям.
+        """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('SELECT * FROM entries ORDER BY date DESC, created_at DESC')
-            rows = cursor.fetchall()
+            with self._lock:
+                rows = self._conn.execute(
+                    'SELECT * FROM entries ORDER BY date DESC, created_at DESC'
+                ).fetchall()
+            contents = self._decrypt_contents(rows, 0, 3, session,
+                                              workers, chunk_size, processes)
             entries = []
-            for row in rows:
-                try:
-                    decrypted_content = self.security.decrypt(row[3], master_password)
-                    if decrypted_content is not None:
-                        entries.append({
-                            'id': row[0],
-                            'date': row[1],
-                            'title': row[2],
-                            'content': decrypted_content,
-                            'created_at': row[4]
-                        })
-                except Exception as e:
-                    print(f"Ошибка расшифровки записи ID {row[0]}: {e}")
+            for row, decrypted_content in zip(rows, contents):
+                if decrypted_content is None:
+                    print(f"Ошибка расшифровки записи ID {row[0]}")
                     continue
-            conn.close()
+                entries.append(Entry(row[0], row[1], row[2], row[4], decrypted_content))
             return entries
         except Exception as e:
             print(f"Ошибка получения записей: {e}")
             return []
 
-    def update_entry(self, entry_id: int, date: str, title: str, content: str, master_password: str) -> bool:
-        """Обновление существующей записи."""
+    @metrics.timed('db.list_entries')
+    def list_entries(self, limit: int = DB_PAGE_SIZE, after: tuple = None):
+        """Страница списка записей (id, дата, заголовок) без расшифровки содержимого.
+
+        Записи упорядочены по (date, created_at, id) по убыванию; after —
+        ключ последней записи предыдущей страницы (см. entry_key).
+        """
         try:
-            encrypted_content = self.security.encrypt(content, master_password)
-            if not encrypted_content:
-                return False
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('''
-                UPDATE entries
-                SET date = ?, title = ?, encrypted_content = ?
-                WHERE id = ?
-            ''', (date, title, encrypted_content, entry_id))
-            conn.commit()
-            conn.close()
-            return cursor.rowcount > 0
-        except Exception as e:
-            print(f"Ошибка обновления записи: {e}")
-            return False
+            with self._lock:
+                if after is None:
+                    rows = self._conn.execute('''
+                        SELECT id, date, title, created_at FROM entries
+                        ORDER BY date DESC, created_at DESC, id DESC
+                        LIMIT ?
+                    ''', (limit,)).fetchall()
+                else:
+                    rows = self._conn.execute('''
+                        SELECT id, date, title, created_at FROM entries
+                        WHERE (date, created_at, id) < (?, ?, ?)
+                        ORDER BY date DESC, created_at DESC, id DESC
+                        LIMIT ?
+                    ''', (*after, limit)).fetchall()
+            return [Entry(*row) for row in rows]
+        except Exception as e:
+            print(f"Ошибка получения списка записей: {e}")
+            return []
+
+    @metrics.timed('db.count_entries')
+    def count_entries(self) -> int:
+        """Общее число записей в дневнике."""
+        try:
+            with self._lock:
+                return self._conn.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+        except Exception as e:
+            print(f"Ошибка подсчёта записей: {e}")
+            return 0
+
+    def iter_entry_pages(self, page_size: int = DB_PAGE_SIZE):
+        """Постраничный обход метаданных всех записей (без расшифровки)."""
+        after = None
+        while True:
+            page = self.list_entries(page_size, after)
+            if page:
+                yield page
+            if len(page) < page_size:
+                return
+            after = entry_key(page[-1])
+
+    def iter_entries(self, session: CryptoSession, page_size: int = DECRYPT_PAGE_SIZE):
+        """Постраничный обход всех записей с пакетной расшифровкой содержимого."""
+        after = None
+        while True:
+            with self._lock:
+                if after is None:
+                    rows = self._conn.execute('''
+                        SELECT id, date, title, created_at, encrypted_content FROM entries
+                        ORDER BY date DESC, created_at DESC, id DESC
+                        LIMIT ?
+                    ''', (page_size,)).fetchall()
+                else:
+                    rows = self._conn.execute('''
+                        SELECT id, date, title, created_at, encrypted_content FROM entries
+                        WHERE (date, created_at, id) < (?, ?, ?)
+                        ORDER BY date DESC, created_at DESC, id DESC
+                        LIMIT ?
+                    ''', (*after, page_size)).fetchall()
+            contents = self._decrypt_contents(rows, 0, 4, session)
+            for row, content in zip(rows, contents):
+                if content is not None:
+                    yield Entry(row[0], row[1], row[2], row[3], content)
+            if len(rows) < page_size:
+                return
+            after = (rows[-1][1], rows[-1][3], rows[-1][0])
+
+    @metrics.timed('db.poll_changes')
+    def poll_changes(self, version: int = None, revision: int = None,
+                     session: CryptoSession = None) -> tuple:
+        """Проверка изменений базы другими соединениями (другой копией приложения,
+        программой синхронизации).
+
+        version — прежнее значение PRAGMA data_version, revision — последняя
+        учтённая ревизия журнала изменений. Пока data_version не изменился,
+        журнал не читается. Возвращает (version, revision, изменённые записи
+        (метаданные), ID удалённых записей). Без прежних значений возвращается
+        текущее состояние без изменений. Кэш изменённых записей сбрасывается,
+        в сессию session устанавливается словарь сжатия, если его сменили.
+        При ошибке возвращается None.
+        """
+        try:
+            with self._lock:
+                current = self._conn.execute('PRAGMA data_version').fetchone()[0]
+                if version is None or revision is None:
+                    row = self._conn.execute('SELECT MAX(revision) FROM entry_changes').fetchone()
+                    return current, row[0] or 0, [], []
+                if current == version:
+                    return version, revision, [], []
+                if session is not None:
+                    self.load_dictionary(session)
+                rows = self._conn.execute('''
+                    SELECT c.revision, c.entry_id, e.date, e.title, e.created_at
+                    FROM entry_changes c LEFT JOIN entries e ON e.id = c.entry_id
+                    WHERE c.revision > ?
+                    ORDER BY c.revision
+                ''', (revision,)).fetchall()
+        except Exception as e:
+            print(f"Ошибка проверки изменений: {e}")
+            return None
+        changed = []
+        deleted = []
+        for row in rows:
+            self.content_cache.invalidate(row[1])
+            if row[2] is None:
+                deleted.append(row[1])
+            else:
+                changed.append(Entry(row[1], row[2], row[3], row[4]))
+        return current, rows[-1][0] if rows else revision, changed, deleted
 
+    @metrics.timed('db.sync_summary')
+    def sync_summary(self, since: int = 0):
+        """Сводка изменений после локальной ревизии since для синхронизации (см. src.sync).
+
+        Возвращает (текущая ревизия, {UUID: (версия, отпечаток шифртекста)});
+        удалённые записи — с пустым отпечатком. Содержимое не расшифровывается.
+        None при ошибке.
+        """
+        try:
+            with self._lock, self._conn:
+                self._conn.execute('BEGIN')
+                revision = self._conn.execute('SELECT MAX(revision) FROM entry_changes').fetchone()[0]
+                rows = self._conn.execute('''
+                    SELECT c.uuid, c.version, e.encrypted_content
+                    FROM entry_changes c LEFT JOIN entries e ON e.id = c.entry_id
+                    WHERE c.revision > ? AND c.uuid IS NOT NULL
+                ''', (since,)).fetchall()
+            return revision or 0, {uuid: (version, content_digest(content))
+                                   for uuid, version, content in rows}
+        except Exception as e:
+            print(f"Ошибка чтения изменений для синхронизации: {e}")
+            return None
+
+    @metrics.timed('db.sync_wanted')
+    def sync_wanted(self, summary: dict) -> list:
+        """UUID записей из сводки другой базы, которые новее местных.
+
+        Версии сравниваются парой (версия, отпечаток): большая версия — более
+        позднее изменение, при равных версиях (одновременные правки в двух
+        копиях) побеждает больший отпечаток. Правило одинаково в обеих базах,
+        поэтому после обмена они совпадают.
+        """
+        try:
+            with self._lock:
+                local = self._sync_stamps(list(summary))
+            return [uuid for uuid, stamp in summary.items()
+                    if uuid not in local or tuple(stamp) > local[uuid][1:]]
+        except Exception as e:
+            print(f"Ошибка сравнения изменений для синхронизации: {e}")
+            return None
+
+    @metrics.timed('db.sync_export')
+    def sync_export(self, uuids) -> list:
+        """Записи по UUID для передачи другой базе: метаданные, шифртекст,
+        фрагменты и токены поискового индекса как есть (без расшифровки).
+        None при ошибке.
+        """
+        try:
+            rows = []
+            with self._lock, self._conn:
+                self._conn.execute('BEGIN')
+                for uuid, (entry_id, version, digest) in self._sync_stamps(list(uuids)).items():
+                    row = self._conn.execute('''
+                        SELECT date, title, created_at, encrypted_content FROM entries WHERE id = ?
+                    ''', (entry_id,)).fetchone()
+                    record = {'uuid': uuid, 'version': version, 'id': entry_id, 'content': None}
+                    if row is not None:
+                        record.update(date=row[0], title=row[1], created_at=row[2], content=row[3])
+                        record['chunks'] = self._conn.execute(
+                            'SELECT chunk_id, data FROM entry_chunks WHERE entry_id = ?', (entry_id,)
+                        ).fetchall()
+                        record['tokens'] = [token for token, in self._conn.execute(
+                            'SELECT token FROM search_index WHERE entry_id = ?', (entry_id,)
+                        )]
+                    rows.append(record)
+            return rows
+        except Exception as e:
+            print(f"Ошибка чтения записей для синхронизации: {e}")
+            return None
+
+    @metrics.timed('db.sync_apply')
+    def sync_apply(self, rows, session: CryptoSession, revision: int):
+        """Применение в одной транзакции записей другой базы, новее местных (см. sync_wanted).
+
+        Возвращает (число применённых, ревизия, до которой другая база знает эту) или None."""
+        applied = []
+        legacy = False
+        try:
+            with self._lock, self._conn:
+                self._conn.execute('BEGIN IMMEDIATE')
+                current = self._conn.execute('SELECT MAX(revision) FROM entry_changes').fetchone()[0] or 0
+                local = self._sync_stamps([row['uuid'] for row in rows])
+                for row in rows:
+                    known = local.get(row['uuid'])
+                    if known and (row['version'], content_digest(row['content'])) <= known[1:]:
+                        continue
+                    entry_id = known[0] if known else self._free_entry_id(row['id'])
+                    self._apply_row(entry_id, row, session)
+                    self._log_changes([entry_id], {entry_id: (row['uuid'], row['version'])})
+                    applied.append(entry_id)
+                    legacy = legacy or isinstance(row['content'], str)
+                if legacy:
+                    # Строки старого формата открываются ключом из пароля (см. upgrade_content)
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO settings (key, value) VALUES ('legacy_content', '1')"
+                    )
+                after = self._conn.execute('SELECT MAX(revision) FROM entry_changes').fetchone()[0] or 0
+        except Exception as e:
+            print(f"Ошибка применения изменений синхронизации: {e}")
+            return None
+        for entry_id in applied:
+            self.content_cache.invalidate(entry_id)
+        self.legacy_content = self.legacy_content or legacy
+        return len(applied), after if current == revision else revision
+
+    @metrics.timed('db.get_meta')
+    def get_meta(self, entry_id: int):
+        """Метаданные одной записи без расшифровки содержимого (None, если записи нет)."""
+        with self._lock:
+            return self._get_meta(entry_id)
+
+    def _get_meta(self, entry_id: int):
+        """Метаданные одной записи (id, date, title, created_at)."""
+        row = self._conn.execute(
+            'SELECT id, date, title, created_at FROM entries WHERE id = ?', (entry_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return Entry(*row)
+
+    @metrics.timed('db.get_content')
+    def get_content(self, entry_id: int, session: CryptoSession) -> str:
+        """Расшифровка содержимого одной записи по ID (через кэш открытых записей)."""
+        try:
+            return ''.join(self.iter_content(entry_id, session))
+        except Exception as e:
+            print(f"Ошибка расшифровки записи ID {entry_id}: {e}")
+            return ""
+
+    @metrics.timed('db.get_entry')
+    def get_entry(self, entry_id: int, session: CryptoSession):
+        """Получение одной записи по ID с расшифрованным содержимым."""
+        try:
+            content = self.content_cache.get(entry_id)
+            if content is not None:
+                with self._lock:
+                    entry = self._get_meta(entry_id)
+                if entry is not None:
+                    entry.content = content
+                return entry
+            with self._lock:
+                row = self._conn.execute(
+                    'SELECT * FROM entries WHERE id = ?', (entry_id,)
+                ).fetchone()
+            if row is None:
+                return None
+            if is_chunked_content(row[3]):
+                content = ''.join(self._iter_chunks(entry_id, row[3], session))
+            else:
+                content = session.decrypt(row[3])
+            if content is None:
+                return None
+            self.content_cache.put(entry_id, content)
+            return Entry(row[0], row[1], row[2], row[4], content)
+        except Exception as e:
+            print(f"Ошибка получения записи ID {entry_id}: {e}")
+            return None
+
+    @metrics.timed('db.update_entry')
+    def update_entry(self, entry_id: int, date: str, title: str, content: str, session: CryptoSession):
+        """Обновление существующей записи.
+
+        Возвращает обновлённые метаданные записи или None. У большой записи
+        перешифровываются только изменённые фрагменты.
+        """
+        change = {'id': entry_id, 'date': date, 'title': title, 'content': content}
+        return self.update_entries([change], session)[0]
+
+    @metrics.timed('db.delete_entry')
     def delete_entry(self, entry_id: int) -> bool:
         """Удаление записи по ID."""
+        return self.delete_entries([entry_id])[0]
+
+    @metrics.timed('db.update_entries')
+    def update_entries(self, changes, session: CryptoSession,
+                       batch_size: int = TRANSFER_BATCH_SIZE) -> list:
+        """Обновление нескольких записей (словари id, date, title, content)
+        в одной транзакции.
+
+        Возвращает список результатов по порядку: обновлённые метаданные
+        или None для отсутствующих и не сохранённых записей.
+        """
+        changes = list(changes)
+        results = [None] * len(changes)
+        saved = {}
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('DELETE FROM entries WHERE id = ?', (entry_id,))
-            conn.commit()
-            conn.close()
-            return cursor.rowcount > 0
+            with self._lock, self._conn:
+                self._conn.execute('BEGIN IMMEDIATE')
+                self.load_dictionary(session)
+                existing = self._existing_ids(change['id'] for change in changes)
+                tokens = {}
+                for start in range(0, len(changes), batch_size):
+                    items = []
+                    positions = []
+                    for position in range(start, min(start + batch_size, len(changes))):
+                        change = changes[position]
+                        if change['id'] not in existing:
+                            continue
+                        item = self._prepare_entry(change['id'], change, session, tokens,
+                                                   self._load_manifest(change['id'], session))
+                        if item is not None:
+                            items.append(item)
+                            positions.append(position)
+                    done = self._execute_batch(items, self._update_entries)
+                    for position, item, ok in zip(positions, items, done):
+                        if ok:
+                            results[position] = self._get_meta(item[0][0])
+                            saved[item[0][0]] = changes[position].get('content') or ''
         except Exception as e:
-            print(f"Ошибка удаления записи: {e}")
-            return False
\ No newline at end of file
+            print(f"Ошибка обновления записей: {e}")
+            return [None] * len(changes)
+        for entry_id, content in saved.items():
+            self.content_cache.put(entry_id, content)
+        return results
+
+    @metrics.timed('db.delete_entries')
+    def delete_entries(self, entry_ids) -> list:
+        """Удаление нескольких записей в одной транзакции.
+
+        Возвращает список признаков удаления по порядку ID
+        (False для отсутствующих записей).
+        """
+        entry_ids = list(entry_ids)
+        try:
+            with self._lock, self._conn:
+                self._conn.execute('BEGIN IMMEDIATE')
+                found = self._existing_ids(entry_ids)
+                existing = [entry_id for entry_id in dict.fromkeys(entry_ids) if entry_id in found]
+                done = self._execute_batch(existing, self._delete_entries)
+                deleted = {entry_id for entry_id, ok in zip(existing, done) if ok}
+        except Exception as e:
+            print(f"Ошибка удаления записей: {e}")
+            return [False] * len(entry_ids)
+        for entry_id in deleted:
+            self.content_cache.invalidate(entry_id)
+        return [entry_id in deleted for entry_id in entry_ids]
+
+    def _next_entry_id(self) -> int:
+        """Следующий ID записи с учётом AUTOINCREMENT (внутри транзакции)."""
+        # ID удалённых записей заняты отметками удаления в журнале изменений
+        return self._conn.execute('''
+            SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'entries'), 0),
+                       COALESCE((SELECT MAX(id) FROM entries), 0),
+                       COALESCE((SELECT MAX(entry_id) FROM entry_changes), 0))
+        ''').fetchone()[0] + 1
+
+    def _existing_ids(self, entry_ids, chunk_size: int = 500) -> set:
+        """Множество существующих ID из заданных (запросы порциями)."""
+        entry_ids = list(dict.fromkeys(entry_ids))
+        existing = set()
+        for start in range(0, len(entry_ids), chunk_size):
+            chunk = entry_ids[start:start + chunk_size]
+            existing.update(row[0] for row in self._conn.execute(
+                f'SELECT id FROM entries WHERE id IN ({", ".join("?" * len(chunk))})', chunk
+            ))
+        return existing
+
+    def _prepare_entry(self, entry_id: int, record: dict, session: CryptoSession, tokens: dict,
+                       manifest: dict = None):
+        """Шифрование записи и токены её поискового индекса.
+
+        Текст длиннее CONTENT_CHUNK_THRESHOLD шифруется фрагментами; manifest —
+        прежняя опись фрагментов записи (шифруются только изменённые).
+        Возвращает (строка entries, пары индекса, новые фрагменты, устаревшие
+        фрагменты) или None, если поле записи пустое (см. invalid_field)
+        или запись не удалось зашифровать. tokens — кэш токенов пакета.
+        """
+        if invalid_field(record):
+            return None
+        content = record['content']
+        chunks = []
+        stale = [chunk[0] for chunk in manifest['chunks']] if manifest else []
+        if len(content) > CONTENT_CHUNK_THRESHOLD:
+            manifest, writes, stale = plan_chunks(session, split_content(content), manifest)
+            for chunk_id, piece in writes:
+                data = session.encrypt(piece, chunk_associated(entry_id, chunk_id))
+                if not data:
+                    return None
+                chunks.append((entry_id, chunk_id, data))
+            encrypted_content = session.encrypt_manifest(manifest)
+        else:
+            encrypted_content = session.encrypt(content)
+        if not encrypted_content:
+            return None
+        postings = []
+        for term in index_terms(record['title'], content):
+            token = tokens.get(term)
+            if token is None:
+                token = tokens[term] = session.blind_token(term)
+            postings.append((token, entry_id))
+        return ((entry_id, record['date'], record['title'], encrypted_content,
+                 record.get('created_at')), postings, chunks,
+                [(entry_id, chunk_id) for chunk_id in stale])
+
+    def _insert_entries(self, items: list):
+        """Вставка подготовленных записей, фрагментов и индекса через executemany."""
+        self._conn.executemany('''
+            INSERT INTO entries (id, date, title, encrypted_content, created_at)
+            VALUES (?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+        ''', [item[0] for item in items])
+        self._write_chunks(items)
+        self._conn.executemany(
+            'INSERT OR IGNORE INTO search_index (token, entry_id) VALUES (?, ?)',
+            [posting for item in items for posting in item[1]]
+        )
+        self._log_changes([item[0][0] for item in items])
+
+    def _update_entries(self, items: list):
+        """Замена содержимого, фрагментов и индекса подготовленных записей через executemany."""
+        self._conn.executemany('''
+            UPDATE entries SET date = ?, title = ?, encrypted_content = ? WHERE id = ?
+        ''', [(date, title, encrypted_content, entry_id)
+              for (entry_id, date, title, encrypted_content, created_at), *rest in items])
+        self._write_chunks(items)
+        # Индекс меняется на разницу: при правке большой записи почти все токены прежние
+        removed = []
+        added = []
+        for item in items:
+            entry_id = item[0][0]
+            current = {row[0] for row in self._conn.execute(
+                'SELECT token FROM search_index WHERE entry_id = ?', (entry_id,)
+            )}
+            tokens = {token for token, _ in item[1]}
+            removed.extend((token, entry_id) for token in current - tokens)
+            added.extend((token, entry_id) for token in tokens - current)
+        self._conn.executemany('DELETE FROM search_index WHERE token = ? AND entry_id = ?', removed)
+        self._conn.executemany(
+            'INSERT OR IGNORE INTO search_index (token, entry_id) VALUES (?, ?)', added
+        )
+        self._log_changes([item[0][0] for item in items])
+
+    def _write_chunks(self, items: list):
+        """Удаление устаревших и вставка новых фрагментов подготовленных записей."""
+        stale = [key for item in items for key in item[3]]
+        if stale:
+            self._conn.executemany('DELETE FROM entry_chunks WHERE entry_id = ? AND chunk_id = ?',
+                                   stale)
+        chunks = [chunk for item in items for chunk in item[2]]
+        if chunks:
+            self._conn.executemany(
+                'INSERT INTO entry_chunks (entry_id, chunk_id, data) VALUES (?, ?, ?)', chunks
+            )
+
+    def _delete_entries(self, entry_ids: list):
+        """Удаление записей, их фрагментов и индекса через executemany."""
+        parameters = [(entry_id,) for entry_id in entry_ids]
+        self._conn.executemany('DELETE FROM entries WHERE id = ?', parameters)
+        self._conn.executemany('DELETE FROM entry_chunks WHERE entry_id = ?', parameters)
+        self._conn.executemany('DELETE FROM search_index WHERE entry_id = ?', parameters)
+        self._log_changes(entry_ids)
+
+    def _log_changes(self, entry_ids: list, stamps: dict = None):
+        """Отметка изменённых записей в журнале изменений (внутри текущей транзакции,
+        см. poll_changes); stamps — {ID: (UUID, версия)} полученных синхронизацией."""
+        # По одному MAX на запрос: так SQLite берёт значение из индекса, а не обходит таблицу
+        first = (self._conn.execute('SELECT MAX(revision) FROM entry_changes').fetchone()[0] or 0) + 1
+        version = (self._conn.execute('SELECT MAX(version) FROM entry_changes').fetchone()[0] or 0) + 1
+        if stamps is None:
+            rows = [(entry_id, revision, os.urandom(16).hex(), version)
+                    for revision, entry_id in enumerate(entry_ids, first)]
+        else:
+            rows = [(entry_id, revision, *stamps[entry_id])
+                    for revision, entry_id in enumerate(entry_ids, first)]
+        self._conn.executemany('''
+            INSERT INTO entry_changes (entry_id, revision, uuid, version) VALUES (?, ?, ?, ?)
+            ON CONFLICT (entry_id) DO UPDATE SET revision = excluded.revision,
+                uuid = COALESCE(entry_changes.uuid, excluded.uuid), version = excluded.version
+        ''', rows)
+
+    def _sync_stamps(self, uuids: list, chunk_size: int = 500) -> dict:
+        """{UUID: (местный ID, версия, отпечаток шифртекста)} известных базе записей
+        и отметок удаления из заданных (запросы порциями)."""
+        stamps = {}
+        for start in range(0, len(uuids), chunk_size):
+            chunk = uuids[start:start + chunk_size]
+            for uuid, entry_id, version, content in self._conn.execute(f'''
+                SELECT c.uuid, c.entry_id, c.version, e.encrypted_content
+                FROM entry_changes c LEFT JOIN entries e ON e.id = c.entry_id
+                WHERE c.uuid IN ({", ".join("?" * len(chunk))})
+            ''', chunk):
+                stamps[uuid] = (entry_id, version, content_digest(content))
+        return stamps
+
+    def _free_entry_id(self, entry_id: int) -> int:
+        """Местный ID для записи из другой базы: её прежний ID, если он свободен
+        (фрагменты большой записи не придётся перешифровывать), иначе новый."""
+        taken = self._conn.execute('''
+            SELECT EXISTS (SELECT 1 FROM entries WHERE id = ?)
+                OR EXISTS (SELECT 1 FROM entry_changes WHERE entry_id = ?)
+        ''', (entry_id, entry_id)).fetchone()[0]
+        return self._next_entry_id() if taken else entry_id
+
+    def _apply_row(self, entry_id: int, row: dict, session: CryptoSession):
+        """Замена или удаление записи строкой другой базы (внутри текущей транзакции)."""
+        self._conn.execute('DELETE FROM entry_chunks WHERE entry_id = ?', (entry_id,))
+        self._conn.execute('DELETE FROM search_index WHERE entry_id = ?', (entry_id,))
+        if row['content'] is None:
+            self._conn.execute('DELETE FROM entries WHERE id = ?', (entry_id,))
+            return
+        self._conn.execute('''
+            INSERT INTO entries (id, date, title, encrypted_content, created_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (id) DO UPDATE SET date = excluded.date, title = excluded.title,
+                encrypted_content = excluded.encrypted_content, created_at = excluded.created_at
+        ''', (entry_id, row['date'], row['title'], row['content'], row['created_at']))
+        chunks = []
+        for chunk_id, data in row['chunks']:
+            if entry_id != row['id']:
+                text = session.decrypt(data, chunk_associated(row['id'], chunk_id))
+                data = session.encrypt(text, chunk_associated(entry_id, chunk_id)) if text is not None else b""
+                if not data:
+                    raise ValueError(f"не удалось перешифровать фрагмент записи {row['uuid']}")
+            chunks.append((entry_id, chunk_id, data))
+        self._conn.executemany(
+            'INSERT INTO entry_chunks (entry_id, chunk_id, data) VALUES (?, ?, ?)', chunks
+        )
+        self._conn.executemany(
+            'INSERT OR IGNORE INTO search_index (token, entry_id) VALUES (?, ?)',
+            [(token, entry_id) for token in row['tokens']]
+        )
+
+    def _load_manifest(self, entry_id: int, session: CryptoSession):
+        """Опись фрагментов записи или None, если запись хранится целиком."""
+        row = self._conn.execute(
+            'SELECT encrypted_content FROM entries WHERE id = ?', (entry_id,)
+        ).fetchone()
+        if row is None or not is_chunked_content(row[0]):
+            return None
+        return session.decrypt_manifest(row[0])
+
+    def iter_content(self, entry_id: int, session: CryptoSession):
+        """Потоковая расшифровка содержимого записи.
+
+        Большая запись выдаётся по одному фрагменту (окно просмотра заполняется
+        по мере расшифровки), обычная — целиком через кэш открытых записей.
+        ValueError — запись не найдена или повреждена.
+        """
+        content = self.content_cache.get(entry_id)
+        if content is not None:
+            yield content
+            return
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT encrypted_content FROM entries WHERE id = ?', (entry_id,)
+            ).fetchone()
+        if row is None:
+            raise ValueError(f"Запись ID {entry_id} не найдена")
+        if is_chunked_content(row[0]):
+            yield from self._iter_chunks(entry_id, row[0], session)
+            return
+        content = session.decrypt(row[0])
+        if content is None:
+            raise ValueError(f"Не удалось расшифровать запись ID {entry_id}")
+        self.content_cache.put(entry_id, content)
+        yield content
+
+    def _iter_chunks(self, entry_id: int, encrypted_manifest: bytes, session: CryptoSession):
+        """Расшифровка фрагментов большой записи по описи с проверкой отпечатков."""
+        manifest = session.decrypt_manifest(encrypted_manifest)
+        if manifest is None:
+            raise ValueError(f"Не удалось расшифровать опись фрагментов записи ID {entry_id}")
+        for chunk_id, digest, length in manifest['chunks']:
+            with self._lock:
+                row = self._conn.execute(
+                    'SELECT data FROM entry_chunks WHERE entry_id = ? AND chunk_id = ?',
+                    (entry_id, chunk_id)
+                ).fetchone()
+            piece = session.decrypt(row[0], chunk_associated(entry_id, chunk_id)) if row else None
+            if piece is None or session.chunk_digest(piece) != digest:
+                raise ValueError(f"Фрагмент {chunk_id} записи ID {entry_id} повреждён")
+            yield piece
+
+    def _decrypt_contents(self, rows: list, id_column: int, content_column: int,
+                          session: CryptoSession, *options) -> list:
+        """Пакетная расшифровка содержимого строк; большие записи собираются
+        из фрагментов (None для нерасшифрованных)."""
+        contents = session.decrypt_many((row[content_column] for row in rows), *options)
+        for index, row in enumerate(rows):
+            if is_chunked_content(row[content_column]):
+                try:
+                    contents[index] = ''.join(self._iter_chunks(row[id_column], row[content_column],
+                                                                session))
+                except ValueError as e:
+                    print(f"Ошибка расшифровки записи: {e}")
+        return contents
+
+    def _execute_batch(self, items: list, write) -> list:
+        """Выполнение write(items) под точкой сохранения (внутри транзакции).
+
+        Если пакет целиком не записался, он откатывается и записывается
+        по одному элементу, каждый под своей точкой сохранения: ошибочные
+        элементы пропускаются. Возвращает признаки успеха по элементам.
+        """
+        if not items:
+            return []
+        self._conn.execute('SAVEPOINT batch')
+        try:
+            write(items)
+            self._conn.execute('RELEASE batch')
+            return [True] * len(items)
+        except sqlite3.Error as e:
+            print(f"Ошибка пакетной записи, запись по одному элементу: {e}")
+            self._conn.execute('ROLLBACK TO batch')
+            self._conn.execute('RELEASE batch')
+        done = []
+        for item in items:
+            self._conn.execute('SAVEPOINT item')
+            try:
+                write([item])
+                self._conn.execute('RELEASE item')
+                done.append(True)
+            except sqlite3.Error as e:
+                print(f"Ошибка записи элемента пакета: {e}")
+                self._conn.execute('ROLLBACK TO item')
+                self._conn.execute('RELEASE item')
+                done.append(False)
+        return done
+
+    def _index_entry(self, entry_id: int, title: str, content: str, session: CryptoSession):
+        """Обновление поискового индекса записи (внутри текущей транзакции)."""
+        self._conn.execute('DELETE FROM search_index WHERE entry_id = ?', (entry_id,))
+        self._conn.executemany(
+            'INSERT OR IGNORE INTO search_index (token, entry_id) VALUES (?, ?)',
+            [(session.blind_token(term), entry_id) for term in index_terms(title, content)]
+        )
+
+    @metrics.timed('db.ensure_search_index')
+    def ensure_search_index(self, session: CryptoSession) -> bool:
+        """Построение поискового индекса для базы, созданной до его появления."""
+        if self.get_setting('search_index') == '1':
+            return True
+        try:
+            entries = self.iter_entries(session)
+            indexed = 0
+            while True:
+                batch = list(islice(entries, DECRYPT_PAGE_SIZE))
+                if not batch:
+                    break
+                with self._lock, self._conn:
+                    for entry in batch:
+                        self._index_entry(entry.id, entry.title, entry.content, session)
+                indexed += len(batch)
+            # Индекс считается готовым, только если ключ подошёл ко всем записям
+            if indexed != self.count_entries():
+                return False
+            self.set_setting('search_index', '1')
+            return True
+        except Exception as e:
+            print(f"Ошибка построения поискового индекса: {e}")
+            return False
+
+    @metrics.timed('db.ensure_dictionary')
+    def ensure_dictionary(self, session: CryptoSession, synced: bool = False) -> bool:
+        """Обучение общего словаря сжатия по выборке записей (однократно).
+
+        Словарь хранится в настройках в зашифрованном виде и больше не
+        меняется: записи, сжатые с ним, ссылаются на него флагом формата.
+        Копия, уже синхронизированная с другими, обучает словарь только при
+        синхронизации (synced=True), чтобы словарь у копий был общим.
+        """
+        if self.get_setting('compression_dictionary'):
+            return True
+        if self.get_setting('sync_peers') and not synced:
+            return False
+        try:
+            if self.count_entries() < DICTIONARY_MIN_ENTRIES:
+                return False
+            with self._lock:
+                rows = self._conn.execute(
+                    'SELECT encrypted_content FROM entries ORDER BY random() LIMIT ?',
+                    (DICTIONARY_SAMPLE,)
+                ).fetchall()
+            texts = [text for text in session.decrypt_many(row[0] for row in rows) if text]
+            # Словарь обучается, только если ключ подходит к записям
+            if len(texts) < DICTIONARY_MIN_ENTRIES:
+                return False
+            dictionary = train_dictionary(texts)
+            # Шифруется до установки словаря в сессию, поэтому сам им не сжат
+            encrypted_dictionary = session.encrypt(dictionary.decode())
+            if not dictionary or not encrypted_dictionary:
+                return False
+            # Другая копия приложения могла обучить словарь раньше — остаётся её словарь
+            self.share_dictionary(encrypted_dictionary)
+            self.load_dictionary(session)
+            return True
+        except Exception as e:
+            print(f"Ошибка обучения словаря сжатия: {e}")
+            return False
+
+    def share_dictionary(self, encrypted_dictionary):
+        """Запись словаря сжатия, если у базы его ещё нет; возвращает словарь базы."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO settings (key, value) VALUES ('compression_dictionary', ?)",
+                (encrypted_dictionary,)
+            )
+            return self._conn.execute(
+                "SELECT value FROM settings WHERE key = 'compression_dictionary'"
+            ).fetchone()[0]
+
+    @metrics.timed('db.replace_dictionary')
+    def replace_dictionary(self, session: CryptoSession, encrypted_dictionary,
+                           page_size: int = DECRYPT_PAGE_SIZE) -> bool:
+        """Замена словаря сжатия с пересжатием записей и фрагментов, сжатых прежним.
+
+        Нужна, если копии дневника обучили словари независимо (см. src.sync).
+        Выполняется одной транзакцией; False при ошибке (база не изменяется).
+        """
+        try:
+            with self._lock, self._conn:
+                self._conn.execute('BEGIN IMMEDIATE')
+                row = self._conn.execute(
+                    "SELECT value FROM settings WHERE key = 'compression_dictionary'"
+                ).fetchone()
+                old = session.with_dictionary(session.decrypt(row[0]).encode() if row else None)
+                new = session.with_dictionary(session.decrypt(encrypted_dictionary).encode())
+                with old, new:
+                    for table, key_columns, content_column in (
+                            ('entries', ('id',), 'encrypted_content'),
+                            ('entry_chunks', ('entry_id', 'chunk_id'), 'data')):
+                        self._reseal_table(table, key_columns, content_column, old, new, page_size)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO settings (key, value) VALUES ('compression_dictionary', ?)",
+                    (encrypted_dictionary,)
+                )
+            return True
+        except Exception as e:
+            print(f"Ошибка замены словаря сжатия: {e}")
+            return False
+
+    def _reseal_table(self, table: str, key_columns: tuple, content_column: str,
+                      old: CryptoSession, new: CryptoSession, page_size: int):
+        """Пересжатие строк таблицы, сжатых словарём сессии old, словарём new
+        (страницами по ключу, внутри текущей транзакции)."""
+        keys = ', '.join(key_columns)
+        after = (0,) * len(key_columns)
+        while True:
+            rows = self._conn.execute(f'''
+                SELECT {keys}, {content_column} FROM {table}
+                WHERE ({keys}) > ({', '.join('?' * len(key_columns))})
+                ORDER BY {keys} LIMIT ?
+            ''', (*after, page_size)).fetchall()
+            updates = []
+            for row in rows:
+                if not uses_dictionary(row[-1]):
+                    continue
+                # Фрагменты привязаны к записи и номеру фрагмента
+                associated = chunk_associated(*row[:-1]) if len(key_columns) == 2 else b""
+                data = old.reseal(row[-1], new, associated)
+                if not data:
+                    raise ValueError(f"не удалось пересжать строку {table} {row[:-1]}")
+                updates.append((data, *row[:-1]))
+            self._conn.executemany(
+                f'''UPDATE {table} SET {content_column} = ?
+                    WHERE {' AND '.join(f'{column} = ?' for column in key_columns)}''',
+                updates
+            )
+            if len(rows) < page_size:
+                return
+            after = rows[-1][:-1]
+
+    @metrics.timed('db.upgrade_content')
+    def upgrade_content(self, session: CryptoSession, after_id: int = 0,
+                        limit: int = UPGRADE_BATCH_SIZE):
+        """Перешифровка порции записей старого формата (TEXT) ключом данных
+        в двоичный формат.
+
+        Обрабатываются записи с ID больше after_id; возвращает ID последней
+        просмотренной записи или None, если записей старого формата не осталось.
+        Записи, не расшифрованные ключом сессии, остаются без изменений.
+        Когда строк старого формата не остаётся, ключ из пароля больше не
+        нужен: снимается признак legacy_content.
+        """
+        try:
+            with self._lock:
+                rows = self._conn.execute('''
+                    SELECT id, encrypted_content FROM entries
+                    WHERE id > ? AND typeof(encrypted_content) = 'text'
+                    ORDER BY id LIMIT ?
+                ''', (after_id, limit)).fetchall()
+            if not rows:
+                if self.legacy_content:
+                    self._finish_legacy_content()
+                return None
+            contents = session.decrypt_many(row[1] for row in rows)
+            updates = [(session.encrypt(content), row[0], row[1])
+                       for row, content in zip(rows, contents) if content is not None]
+            with self._lock, self._conn:
+                # Запись могла измениться, пока порция перешифровывалась
+                self._conn.executemany(
+                    'UPDATE entries SET encrypted_content = ? WHERE id = ? AND encrypted_content = ?',
+                    [update for update in updates if update[0]]
+                )
+            return rows[-1][0]
+        except Exception as e:
+            print(f"Ошибка обновления формата записей: {e}")
+            return None
+
+    def _finish_legacy_content(self):
+        """Снятие признака строк старого формата, если они все перешифрованы."""
+        with self._lock, self._conn:
+            remaining = self._conn.execute(
+                "SELECT 1 FROM entries WHERE typeof(encrypted_content) = 'text' LIMIT 1"
+            ).fetchone()
+            if remaining is None:
+                self._conn.execute("DELETE FROM settings WHERE key = 'legacy_content'")
+                self.legacy_content = False
+
+    @metrics.timed('db.compact')
+    def compact(self):
+        """Сжатие файла базы после массовой перезаписи (VACUUM)."""
+        try:
+            with self._lock:
+                self._conn.execute('VACUUM')
+        except Exception as e:
+            print(f"Ошибка сжатия базы данных: {e}")
+
+    @metrics.timed('db.search')
+    def search(self, query: str, session: CryptoSession,
+               date_from: str = None, date_to: str = None):
+        """Поиск записей по словам запроса (все слова должны встречаться).
+
+        Кандидаты отбираются по слепым токенам индекса без расшифровки;
+        расшифровываются только кандидаты длинных префиксных запросов.
+        Диапазон дат отбирается в SQL по индексу idx_entries_date; пустой
+        запрос с диапазоном дат возвращает все записи диапазона.
+        """
+        conditions = parse_query(query)
+        if query.strip() and not conditions:
+            return []
+        try:
+            where = []
+            params = []
+            if conditions:
+                subquery = ' INTERSECT '.join(
+                    ['SELECT entry_id FROM search_index WHERE token = ?'] * len(conditions)
+                )
+                where.append(f'id IN ({subquery})')
+                params.extend(session.blind_token(term) for term, _ in conditions)
+            if date_from:
+                where.append('date >= ?')
+                params.append(date_from)
+            if date_to:
+                where.append('date <= ?')
+                params.append(date_to)
+            where_sql = f"WHERE {' AND '.join(where)}" if where else ''
+            prefixes = [prefix for _, prefix in conditions if prefix]
+            columns = 'id, date, title, created_at' + (', encrypted_content' if prefixes else '')
+            with self._lock:
+                rows = self._conn.execute(f'''
+                    SELECT {columns} FROM entries
+                    {where_sql}
+                    ORDER BY date DESC, created_at DESC, id DESC
+                ''', params).fetchall()
+            if not prefixes:
+                return [Entry(*row) for row in rows]
+
+            # Кандидаты расшифровываются пакетами мимо кэша открытых записей
+            results = []
+            for start in range(0, len(rows), DECRYPT_PAGE_SIZE):
+                page = rows[start:start + DECRYPT_PAGE_SIZE]
+                for row, content in zip(page, self._decrypt_contents(page, 0, 4, session)):
+                    if matches_prefixes(row[2] + ' ' + (content or ''), prefixes):
+                        results.append(Entry(*row[:4]))
+            return results
+        except Exception as e:
+            print(f"Ошибка поиска: {e}")
+            return []
+
+def content_digest(encrypted_content) -> str:
+    """Отпечаток шифртекста записи для сравнения версий при синхронизации
+    ("" — запись удалена)."""
+    if encrypted_content is None:
+        return ""
+    if isinstance(encrypted_content, str):
+        encrypted_content = encrypted_content.encode()
+    return hashlib.sha256(encrypted_content).hexdigest()[:32]
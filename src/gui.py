@@ -1,25 +1,165 @@
 # Модуль графического интерфейса личного дневника
 
+import time
 import tkinter as tk
-from tkinter import ttk, messagebox
+from collections import deque
+from tkinter import ttk, messagebox, filedialog, simpledialog
 from datetime import datetime
 from src.database import DatabaseManager
-from src.config import APP_NAME
+from src.listing import EntryRows, QuickFilter
+from src.widgets import VirtualTreeview
+from src.tasks import TaskExecutor
+from src.transfer import export_entries, import_entries, detect_format
+from src.metrics import metrics
+from src.config import (APP_NAME, FILTER_DEBOUNCE_MS, FILTER_FRAME_BUDGET_MS,
+                        CHANGE_POLL_MS, CHANGE_RELOAD_LIMIT)
 
 class DiaryGUI:
     """Класс графического интерфейса личного дневника."""
 
     def __init__(self, root, master_password):
         self.root = root
-        self.master_password = master_password
-        self.db = DatabaseManager()
+        # База открывается в фоне (см. open_database)
+        self.db = None
+        self.session = None
         self.root.title(APP_NAME)
         self.root.geometry("900x650")
+        self.root.protocol('WM_DELETE_WINDOW', self.on_close)
+        self.tasks = TaskExecutor(self.root)
+        self.refresh_task = None
+        self.search_task = None
+        self.quick_filter = QuickFilter()
+        self.filter_after_id = None
+        self.filter_job = None
+        self.all_rows = EntryRows()
+        self.refresh_started = None
+        self.stats_window = None
+        # Состояние базы, до которого учтены изменения (см. poll_changes)
+        self.change_version = None
+        self.change_revision = None
+        self.change_task = None
         self.create_widgets()
+        # Скрытое окно статистики производительности
+        self.root.bind_all('<Control-S>', lambda e: self.show_stats_window())
+        self.open_database(master_password)
+
+    def open_database(self, master_password):
+        """Открытие базы с миграциями схемы в фоне; ввод заблокирован до входа."""
+        self.set_input_state(False)
+        self.set_status('Открытие дневника...')
+
+        def on_opened(db):
+            self.db = db
+            self.open_session(master_password)
+
+        def on_error(error):
+            messagebox.showerror('Ошибка', f'Не удалось открыть дневник: {error}')
+            self.on_close()
+
+        self.tasks.submit(DatabaseManager, on_done=on_opened, on_error=on_error)
+
+    def open_session(self, master_password):
+        """Проверка мастер-пароля и открытие сессии в фоне (окно появляется сразу)."""
+        self.set_status('Вход...')
+        started = time.perf_counter()
+
+        def on_opened(session):
+            # Время входа глазами пользователя: очередь задач, KDF, SQLite
+            metrics.observe('gui.unlock', time.perf_counter() - started)
+            self.on_session_opened(session)
+
+        self.tasks.submit(self.db.open_session, master_password, on_done=on_opened)
+
+    def on_session_opened(self, session):
+        """Сессия шифрования готова: загрузка списка, проверка индекса, словаря
+        и формата записей в фоне. Неверный пароль — повторный запрос."""
+        if session is None:
+            password = simpledialog.askstring('Вход', 'Неверный мастер-пароль. Повторите ввод:',
+                                              show='*', parent=self.root)
+            if password:
+                self.open_session(password)
+            else:
+                self.on_close()
+            return
+        self.session = session
+        self.set_input_state(True)
         self.refresh_entries()
+        self.root.after(CHANGE_POLL_MS, self.poll_changes)
+        self.set_status('Проверка поискового индекса...')
+        self.tasks.submit(self.db.ensure_search_index, session)
+        self.tasks.submit(self.db.ensure_dictionary, session,
+                          on_done=lambda ok: self.upgrade_content())
+
+    def upgrade_content(self, after_id: int = 0):
+        """Перешифровка записей старого формата порциями (между порциями
+        выполняются остальные фоновые задачи)."""
+        self.tasks.submit(self.db.upgrade_content, self.session, after_id,
+                          on_done=lambda last_id: self.on_content_upgraded(after_id, last_id))
+
+    def on_content_upgraded(self, after_id: int, last_id):
+        """Переход к следующей порции; по завершении — сжатие файла базы."""
+        if last_id is not None:
+            self.set_status('Обновление формата записей...')
+            self.upgrade_content(last_id)
+            return
+        if after_id:
+            self.tasks.submit(self.db.compact, on_done=lambda result: self.set_status(''))
+        else:
+            self.set_status('')
+
+    def session_ready(self) -> bool:
+        """Проверка готовности сессии шифрования (вход выполняется в фоне)."""
+        if self.session is None:
+            messagebox.showinfo('Подождите', 'Выполняется вход, повторите через секунду')
+            return False
+        return True
+
+    def on_close(self):
+        """Закрытие приложения с завершением сессии и соединения с базой."""
+        self.tasks.shutdown()
+        if self.session:
+            self.session.close()
+        if self.db:
+            self.db.close()
+        self.root.destroy()
+
+    def set_input_state(self, enabled: bool):
+        """Блокировка и разблокировка полей и кнопок на вкладках."""
+        widgets = list(self.notebook.winfo_children())
+        while widgets:
+            widget = widgets.pop()
+            widgets.extend(widget.winfo_children())
+            if isinstance(widget, tk.Text):
+                widget.config(state='normal' if enabled else 'disabled')
+            elif isinstance(widget, ttk.Widget):
+                widget.state(['!disabled' if enabled else 'disabled'])
+
+    def set_status(self, text: str):
+        """Текст строки состояния."""
+        self.status_var.set(text)
+
+    def cancel_tasks(self):
+        """Отмена загрузки списка и поиска."""
+        for task in (self.refresh_task, self.search_task):
+            if task and not task.finished:
+                task.cancel()
+        self.refresh_task = None
+        self.search_task = None
+        self.progress.config(value=0)
+        self.set_status('Отменено')
 
     def create_widgets(self):
         """Создание всех виджетов интерфейса."""
+        # Строка состояния фоновых операций
+        status_frame = ttk.Frame(self.root)
+        status_frame.pack(side='bottom', fill='x', padx=10, pady=(0, 5))
+        self.status_var = tk.StringVar()
+        ttk.Label(status_frame, textvariable=self.status_var).pack(side='left')
+        ttk.Button(status_frame, text='Отмена',
+                   command=self.cancel_tasks).pack(side='right', padx=5)
+        self.progress = ttk.Progressbar(status_frame, length=200, mode='determinate')
+        self.progress.pack(side='right', padx=5)
+
         self.notebook = ttk.Notebook(self.root)
         self.notebook.pack(fill='both', expand=True, padx=10, pady=10)
 
@@ -46,10 +186,16 @@ class DiaryGUI:
 
         ttk.Button(control_frame, text='Обновить',
                    command=self.refresh_entries).pack(side='left', padx=5)
+        ttk.Button(control_frame, text='Экспорт...',
+                   command=self.export_diary).pack(side='left', padx=5)
+        ttk.Button(control_frame, text='Импорт...',
+                   command=self.import_diary).pack(side='left', padx=5)
+        ttk.Button(control_frame, text='Сменить пароль...',
+                   command=self.change_password).pack(side='left', padx=5)
 
         ttk.Label(control_frame, text='Поиск:').pack(side='left', padx=(10, 5))
         self.search_var = tk.StringVar()
-        self.search_var.trace_add('write', lambda *args: self.filter_entries())
+        self.search_var.trace_add('write', lambda *args: self.schedule_filter())
         ttk.Entry(control_frame, textvariable=self.search_var, width=30).pack(side='left', padx=5)
 
         # Таблица записей
@@ -64,14 +210,14 @@ class DiaryGUI:
         h_scroll.pack(side='bottom', fill='x')
 
         self.tree = ttk.Treeview(tree_frame, columns=columns,
-                                 show='headings', height=20,
-                                 yscrollcommand=v_scroll.set,
+                                 show='headings', height=20, selectmode='extended',
                                  xscrollcommand=h_scroll.set)
         self.tree.pack(side='left', fill='both', expand=True)
-
-        v_scroll.config(command=self.tree.yview)
         h_scroll.config(command=self.tree.xview)
 
+        # Виртуальный список: в таблице только видимые строки
+        self.entry_list = VirtualTreeview(self.tree, v_scroll, entry_values)
+
         # Настройка колонок
         self.tree.heading('ID', text='ID')
         self.tree.heading('Дата', text='Дата')
@@ -130,9 +276,10 @@ class DiaryGUI:
         search_frame = ttk.LabelFrame(self.tab_search, text='Параметры поиска', padding=10)
         search_frame.pack(fill='x', padx=10, pady=10)
 
-        ttk.Label(search_frame, text='Ключевое слово:').grid(row=0, column=0, sticky='w', pady=5)
+        ttk.Label(search_frame, text='Ключевые слова:').grid(row=0, column=0, sticky='w', pady=5)
         self.search_keyword = ttk.Entry(search_frame, width=40)
         self.search_keyword.grid(row=0, column=1, padx=10, pady=5, sticky='w')
+        ttk.Label(search_frame, text='слово* — поиск по началу слова').grid(row=0, column=2, sticky='w', pady=5)
 
         ttk.Label(search_frame, text='Дата с:').grid(row=1, column=0, sticky='w', pady=5)
         self.search_date_from = ttk.Entry(search_frame, width=15)
@@ -152,9 +299,12 @@ class DiaryGUI:
         result_frame.pack(fill='both', expand=True, padx=10, pady=10)
 
         columns = ('ID', 'Дата', 'Заголовок')
+        search_scroll = ttk.Scrollbar(result_frame)
+        search_scroll.pack(side='right', fill='y')
         self.search_tree = ttk.Treeview(result_frame, columns=columns,
                                         show='headings', height=15)
         self.search_tree.pack(fill='both', expand=True)
+        self.search_list = VirtualTreeview(self.search_tree, search_scroll, entry_values)
 
         self.search_tree.heading('ID', text='ID')
         self.search_tree.heading('Дата', text='Дата')
@@ -166,74 +316,262 @@ class DiaryGUI:
         self.search_tree.bind('<Double-1>', lambda e: self.open_entry_from_search())
 
     def refresh_entries(self):
-        """Обновление списка записей на вкладке 'Все записи'."""
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        self.entries = self.db.get_all_entries(self.master_password)
-        for entry in self.entries:
-            self.tree.insert('', 'end', values=(
-                entry['id'],
-                entry['date'],
-                entry['title']
-            ))
+        """Обновление списка записей на вкладке 'Все записи'.
+
+        Метаданные загружаются постранично в фоне и появляются в списке по мере поступления.
+        """
+        # До проверки мастер-пароля список не показывается
+        if self.session is None:
+            return
+        if self.refresh_task:
+            self.refresh_task.cancel()
+        rows = self.all_rows = EntryRows(total=0)
+        self.quick_filter = QuickFilter()
+        self.filter_entries()
+
+        self.set_status('Загрузка записей...')
+        self.refresh_started = time.perf_counter()
+        self.progress.config(value=0, maximum=1)
+        # Точка отсчёта изменений берётся до чтения списка (задачи выполняются
+        # по очереди): правки между ней и чтением придут повторно как обновления
+        self.change_version = None
+        self.tasks.submit(self.db.poll_changes, on_done=self.on_changes_baseline)
+        self.tasks.submit(self.db.count_entries,
+                          on_done=lambda total: self.on_entries_counted(rows, total))
+        self.refresh_task = self.tasks.stream(
+            self.db.iter_entry_pages,
+            on_items=lambda pages: self.on_entry_pages(rows, pages),
+            on_done=lambda count: self.on_entries_loaded(rows)
+        )
+
+    def on_entries_counted(self, rows, total):
+        """Известно общее число записей: размер полосы прокрутки и прогресса."""
+        if rows is not self.all_rows or rows.complete:
+            return
+        rows.total = total
+        self.progress.config(maximum=max(total, 1))
+        self.entry_list.refresh()
+
+    def on_entry_pages(self, rows, pages):
+        """Очередные страницы фоновой загрузки списка."""
+        for page in pages:
+            rows.extend(page)
+        self.progress.config(value=len(rows.entries))
+        if self.entry_list.rows is rows:
+            self.entry_list.refresh()
+
+    def on_entries_loaded(self, rows):
+        """Фоновая загрузка списка завершена."""
+        rows.extend([], complete=True)
+        self.refresh_task = None
+        metrics.observe('gui.refresh', time.perf_counter() - self.refresh_started)
+        self.progress.config(value=0)
+        self.set_status('')
+        if self.search_var.get():
+            self.filter_entries()
+        else:
+            self.entry_list.refresh()
+
+    def on_changes_baseline(self, state):
+        """Запоминание состояния базы, с которого отслеживаются изменения."""
+        if state is not None:
+            self.change_version, self.change_revision = state[:2]
+
+    def poll_changes(self):
+        """Периодическая проверка изменений базы другой копией приложения.
+
+        Проверка пропускается, пока выполняются другие фоновые задачи
+        (загрузка списка, поиск, сохранение) — она дешёвая и повторится позже.
+        """
+        if self.tasks.stopped:
+            return
+        self.root.after(CHANGE_POLL_MS, self.poll_changes)
+        if self.change_version is None or self.change_task or self.tasks.busy:
+            return
+        self.change_task = self.tasks.submit(self.db.poll_changes, self.change_version,
+                                             self.change_revision, self.session,
+                                             on_done=self.on_changes)
+
+    def on_changes(self, result):
+        """Применение внешних изменений к спискам без полной перезагрузки."""
+        self.change_task = None
+        if result is None or self.change_version is None:
+            return
+        self.change_version, self.change_revision, changed, deleted = result
+        if len(changed) + len(deleted) >= CHANGE_RELOAD_LIMIT:
+            self.refresh_entries()
+            return
+        for entry in changed:
+            if entry.id in self.all_rows.by_id:
+                self.apply_entry_updated(entry)
+            else:
+                self.apply_entry_added(entry)
+        if deleted:
+            self.apply_entries_removed(deleted)
+
+    def matches_filter(self, entry) -> bool:
+        """Проверка записи по быстрому фильтру (по заголовку и дате)."""
+        return self.quick_filter.matches(self.search_var.get(), entry)
+
+    def schedule_filter(self):
+        """Отложенный запуск фильтра: срабатывает после паузы во вводе."""
+        if self.filter_after_id:
+            self.root.after_cancel(self.filter_after_id)
+        self.filter_after_id = self.root.after(FILTER_DEBOUNCE_MS, self.filter_entries)
 
     def filter_entries(self):
         """Фильтрация записей по ключевому слову (по заголовку и дате)."""
-        keyword = self.search_var.get().lower()
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        for entry in self.entries:
-            if keyword in entry['title'].lower() or keyword in entry['date']:
-                self.tree.insert('', 'end', values=(
-                    entry['id'],
-                    entry['date'],
-                    entry['title']
-                ))
+        self.filter_after_id = None
+        # Незавершённая фильтрация по прошлому запросу отменяется
+        self.filter_job = None
+        keyword = self.search_var.get()
+        if not keyword:
+            self.entry_list.set_rows(self.all_rows)
+            return
+
+        # Пока список загружается, фильтруется уже полученная часть;
+        # по окончании загрузки фильтр запускается повторно
+        self.filter_job = self.quick_filter.start(keyword, self.all_rows.entries,
+                                                  remember=self.all_rows.complete)
+        self.continue_filter(self.filter_job)
+
+    def continue_filter(self, job):
+        """Очередной шаг фильтрации в пределах бюджета времени кадра."""
+        if job is not self.filter_job:
+            return
+        if job.step(FILTER_FRAME_BUDGET_MS / 1000):
+            self.filter_job = None
+            self.entry_list.set_rows(EntryRows(job.result))
+        else:
+            self.root.after(1, lambda: self.continue_filter(job))
+
+    def forget_entry(self, entry_id):
+        """Сброс кэшей фильтра после изменения записи."""
+        self.quick_filter.forget(entry_id)
+        if self.filter_job:
+            self.filter_entries()
+
+    def apply_entry_added(self, entry):
+        """Вставка одной новой записи в список без полной перезагрузки."""
+        self.all_rows.insert(entry)
+        self.forget_entry(entry.id)
+        if self.entry_list.rows is not self.all_rows and self.matches_filter(entry):
+            self.entry_list.rows.insert(entry)
+        self.entry_list.refresh()
+
+    def apply_entries_removed(self, entry_ids):
+        """Удаление записей из списков без полной перезагрузки."""
+        self.all_rows.remove_many(entry_ids)
+        for entry_id in entry_ids:
+            self.quick_filter.forget(entry_id)
+        if self.filter_job:
+            self.filter_entries()
+        if self.entry_list.rows is not self.all_rows:
+            self.entry_list.rows.remove_many(entry_ids)
+        self.search_list.rows.remove_many(entry_ids)
+        self.entry_list.refresh()
+        self.search_list.refresh()
+
+    def apply_entry_updated(self, entry):
+        """Обновление одной записи в списках без полной перезагрузки."""
+        self.all_rows.update(entry)
+        self.forget_entry(entry.id)
+        if self.entry_list.rows is not self.all_rows:
+            self.entry_list.rows.remove(entry.id)
+            if self.matches_filter(entry):
+                self.entry_list.rows.insert(entry)
+        if entry.id in self.search_list.rows.by_id:
+            self.search_list.rows.update(entry)
+        self.entry_list.refresh()
+        self.search_list.refresh()
 
     def open_entry(self):
         """Открыть выбранную запись для просмотра."""
-        selected = self.tree.selection()
+        selected = self.entry_list.selected_ids()
         if not selected:
             messagebox.showwarning('Ошибка', 'Выберите запись для просмотра')
             return
 
-        item = self.tree.item(selected[0])
-        entry_id = item['values'][0]
-
-        # Найти запись в полном списке
-        entry = next((e for e in self.entries if e['id'] == entry_id), None)
-        if not entry:
-            messagebox.showerror('Ошибка', 'Запись не найдена')
-            return
-
-        self.show_entry_window(entry)
+        # Расшифровать только выбранную запись
+        self.load_entry(selected[0], self.show_entry_window)
 
     def open_entry_from_search(self):
         """Открыть запись из результатов поиска."""
-        selected = self.search_tree.selection()
+        selected = self.search_list.selected_ids()
         if not selected:
             return
-        item = self.search_tree.item(selected[0])
-        entry_id = item['values'][0]
-        entry = next((e for e in self.entries if e['id'] == entry_id), None)
-        if entry:
-            self.show_entry_window(entry)
+        self.load_entry(selected[0], self.show_entry_window)
+
+    def load_entry(self, entry_id, callback):
+        """Фоновая загрузка метаданных записи с передачей их в callback
+        (содержимое окно получает потоком, см. stream_content)."""
+        if not self.session_ready():
+            return
+
+        def on_loaded(entry):
+            if entry:
+                callback(entry)
+            else:
+                messagebox.showerror('Ошибка', 'Запись не найдена')
+
+        self.tasks.submit(self.db.get_meta, entry_id, on_done=on_loaded)
+
+    def stream_content(self, entry, win, text, on_complete=None):
+        """Потоковая расшифровка содержимого записи в текстовое поле окна.
+
+        Фрагменты большой записи вставляются по одному за шаг цикла Tk, поэтому
+        окно отзывчиво во время загрузки. Закрытие окна отменяет загрузку.
+        """
+        pending = deque()
+        progress = {'feeding': False, 'finished': False}
+
+        def insert_next():
+            if not text.winfo_exists():
+                return
+            state = text.cget('state')
+            text.config(state='normal')
+            text.insert('end', pending.popleft())
+            text.config(state=state)
+            if pending:
+                self.root.after(1, insert_next)
+                return
+            progress['feeding'] = False
+            if progress['finished'] and on_complete:
+                on_complete()
+
+        def on_pieces(pieces):
+            pending.extend(pieces)
+            if not progress['feeding']:
+                progress['feeding'] = True
+                self.root.after(1, insert_next)
+
+        def on_done(count):
+            progress['finished'] = True
+            if not progress['feeding'] and on_complete:
+                on_complete()
+
+        def on_error(error):
+            if win.winfo_exists():
+                win.destroy()
+            messagebox.showerror('Ошибка', f'Не удалось расшифровать запись: {error}')
+
+        task = self.tasks.stream(self.db.iter_content, entry.id, self.session,
+                                 on_items=on_pieces, on_done=on_done, on_error=on_error)
+        win.bind('<Destroy>', lambda e: task.cancel() if e.widget is win else None)
 
     def show_entry_window(self, entry):
         """Отображение окна с полным содержимым записи и возможностью редактирования."""
         win = tk.Toplevel(self.root)
-        win.title(f"Запись от {entry['date']}")
+        win.title(f"Запись от {entry.date}")
         win.geometry("600x500")
         win.resizable(True, True)
 
         main_frame = ttk.Frame(win, padding=10)
         main_frame.pack(fill='both', expand=True)
 
-        ttk.Label(main_frame, text=f"Дата: {entry['date']}",
+        ttk.Label(main_frame, text=f"Дата: {entry.date}",
                   font=('Arial', 10, 'bold')).pack(anchor='w', pady=5)
-        ttk.Label(main_frame, text=f"Заголовок: {entry['title']}",
+        ttk.Label(main_frame, text=f"Заголовок: {entry.title}",
                   font=('Arial', 10, 'bold')).pack(anchor='w', pady=5)
 
         ttk.Label(main_frame, text="Содержимое:").pack(anchor='w', pady=(10, 5))
@@ -248,8 +586,8 @@ class DiaryGUI:
         text.pack(side='left', fill='both', expand=True)
         v_scroll.config(command=text.yview)
 
-        text.insert('1.0', entry['content'])
         text.config(state='disabled')
+        self.stream_content(entry, win, text)
 
         # Кнопки
         btn_frame = ttk.Frame(main_frame)
@@ -274,17 +612,16 @@ class DiaryGUI:
         main_frame.pack(fill='both', expand=True)
 
         ttk.Label(main_frame, text='Дата:').grid(row=0, column=0, sticky='w', pady=5)
-        date_var = tk.StringVar(value=entry['date'])
+        date_var = tk.StringVar(value=entry.date)
         ttk.Entry(main_frame, textvariable=date_var, width=15).grid(row=0, column=1, sticky='w', padx=10)
 
         ttk.Label(main_frame, text='Заголовок:').grid(row=1, column=0, sticky='w', pady=5)
-        title_var = tk.StringVar(value=entry['title'])
+        title_var = tk.StringVar(value=entry.title)
         ttk.Entry(main_frame, textvariable=title_var, width=50).grid(row=1, column=1, sticky='w', padx=10)
 
         ttk.Label(main_frame, text='Содержимое:').grid(row=2, column=0, sticky='nw', pady=5)
         text_content = tk.Text(main_frame, width=60, height=20)
         text_content.grid(row=2, column=1, pady=5, padx=10, sticky='w')
-        text_content.insert('1.0', entry['content'])
 
         def save_changes():
             new_date = date_var.get().strip()
@@ -293,52 +630,71 @@ class DiaryGUI:
             if not new_date or not new_title or not new_content:
                 messagebox.showwarning('Ошибка', 'Все поля обязательны для заполнения')
                 return
-            if self.db.update_entry(entry['id'], new_date, new_title,
-                                    new_content, self.master_password):
+            if not self.session_ready():
+                return
+            self.tasks.submit(self.db.update_entry, entry.id, new_date, new_title,
+                              new_content, self.session, on_done=on_saved)
+
+        def on_saved(updated):
+            if updated:
                 messagebox.showinfo('Успех', 'Запись обновлена')
-                win.destroy()
-                self.refresh_entries()
+                if win.winfo_exists():
+                    win.destroy()
+                self.apply_entry_updated(updated)
             else:
                 messagebox.showerror('Ошибка', 'Не удалось обновить запись')
 
         btn_frame = ttk.Frame(main_frame)
         btn_frame.grid(row=3, column=1, pady=10, sticky='w')
 
-        ttk.Button(btn_frame, text='Сохранить',
-                   command=save_changes).pack(side='left', padx=5)
+        save_button = ttk.Button(btn_frame, text='Сохранить', command=save_changes)
+        save_button.pack(side='left', padx=5)
         ttk.Button(btn_frame, text='Отмена',
                    command=win.destroy).pack(side='left', padx=5)
 
+        # До окончания загрузки содержимое не редактируется и не сохраняется
+        text_content.config(state='disabled')
+        save_button.config(state='disabled')
+
+        def on_loaded():
+            text_content.config(state='normal')
+            save_button.config(state='normal')
+
+        self.stream_content(entry, win, text_content, on_complete=on_loaded)
+
     def edit_entry(self):
         """Редактирование выбранной записи (через кнопку на вкладке)."""
-        selected = self.tree.selection()
+        selected = self.entry_list.selected_ids()
         if not selected:
             messagebox.showwarning('Ошибка', 'Выберите запись для редактирования')
             return
 
-        item = self.tree.item(selected[0])
-        entry_id = item['values'][0]
-        entry = next((e for e in self.entries if e['id'] == entry_id), None)
-        if entry:
-            self.edit_entry_window(entry)
+        self.load_entry(selected[0], self.edit_entry_window)
 
     def delete_entry(self):
-        """Удаление выбранной записи."""
-        selected = self.tree.selection()
+        """Удаление выбранных записей (несколько записей — одной транзакцией)."""
+        selected = self.entry_list.selected_ids()
         if not selected:
             messagebox.showwarning('Ошибка', 'Выберите запись для удаления')
             return
 
-        item = self.tree.item(selected[0])
-        entry_id = item['values'][0]
-
-        if messagebox.askyesno('Подтверждение', 'Удалить выбранную запись?'):
-            if self.db.delete_entry(entry_id):
-                messagebox.showinfo('Успех', 'Запись удалена')
-                self.refresh_entries()
+        def on_deleted(results):
+            deleted = [entry_id for entry_id, ok in zip(selected, results) if ok]
+            if deleted:
+                self.apply_entries_removed(deleted)
+            if len(deleted) == len(selected):
+                messagebox.showinfo('Успех', 'Запись удалена' if len(deleted) == 1
+                                    else f'Удалено записей: {len(deleted)}')
+            elif deleted:
+                messagebox.showwarning('Ошибка', f'Удалено записей: {len(deleted)} из {len(selected)}')
             else:
                 messagebox.showerror('Ошибка', 'Не удалось удалить запись')
 
+        question = ('Удалить выбранную запись?' if len(selected) == 1
+                    else f'Удалить выбранные записи ({len(selected)})?')
+        if messagebox.askyesno('Подтверждение', question):
+            self.tasks.submit(self.db.delete_entries, selected, on_done=on_deleted)
+
     def save_entry(self):
         """Сохранение новой записи."""
         date = self.entry_date.get().strip()
@@ -358,10 +714,17 @@ class DiaryGUI:
             self.text_content.focus()
             return
 
-        if self.db.add_entry(date, title, content, self.master_password):
+        if not self.session_ready():
+            return
+        self.tasks.submit(self.db.add_entry, date, title, content, self.session,
+                          on_done=self.on_entry_saved)
+
+    def on_entry_saved(self, added):
+        """Результат фонового сохранения новой записи."""
+        if added:
             messagebox.showinfo('Успех', 'Запись сохранена')
             self.clear_form()
-            self.refresh_entries()
+            self.apply_entry_added(added)
             self.notebook.select(0)  # Переключиться на вкладку "Все записи"
         else:
             messagebox.showerror('Ошибка', 'Не удалось сохранить запись')
@@ -374,34 +737,195 @@ class DiaryGUI:
         self.text_content.delete('1.0', 'end')
         self.entry_title.focus()
 
+    def ask_archive_password(self, confirm: bool):
+        """Запрос пароля архива (при экспорте — с подтверждением)."""
+        password = simpledialog.askstring('Пароль архива', 'Пароль архива:',
+                                          show='*', parent=self.root)
+        if not password:
+            return None
+        if confirm and password != simpledialog.askstring('Пароль архива', 'Повторите пароль:',
+                                                          show='*', parent=self.root):
+            messagebox.showerror('Ошибка', 'Пароли не совпадают')
+            return None
+        return password
+
+    def change_password(self):
+        """Смена мастер-пароля (перешифровывается только ключ данных)."""
+        if not self.session_ready():
+            return
+        if self.db.legacy_content:
+            messagebox.showinfo('Подождите', 'Смена пароля станет доступна после '
+                                'обновления формата записей (идёт в фоне после входа)')
+            return
+        old_password = simpledialog.askstring('Смена пароля', 'Текущий мастер-пароль:',
+                                              show='*', parent=self.root)
+        if not old_password:
+            return
+        new_password = simpledialog.askstring('Смена пароля', 'Новый мастер-пароль:',
+                                              show='*', parent=self.root)
+        if not new_password:
+            return
+        if new_password != simpledialog.askstring('Смена пароля', 'Повторите новый пароль:',
+                                                  show='*', parent=self.root):
+            messagebox.showerror('Ошибка', 'Пароли не совпадают')
+            return
+
+        def on_changed(changed):
+            if changed:
+                messagebox.showinfo('Успех', 'Мастер-пароль изменён')
+            else:
+                messagebox.showerror('Ошибка', 'Неверный текущий мастер-пароль')
+
+        self.tasks.submit(self.db.change_password, old_password, new_password,
+                          on_done=on_changed)
+
+    def export_diary(self):
+        """Экспорт всех записей в файл в фоне."""
+        if not self.session_ready():
+            return
+        path = filedialog.asksaveasfilename(
+            parent=self.root, title='Экспорт записей', defaultextension='.diary',
+            filetypes=[('Зашифрованный архив', '*.diary'), ('JSON Lines', '*.jsonl'),
+                       ('Markdown', '*.md')]
+        )
+        if not path:
+            return
+        password = None
+        if detect_format(path) == 'archive':
+            password = self.ask_archive_password(confirm=True)
+            if not password:
+                return
+        self.set_status('Экспорт записей...')
+        self.tasks.submit(export_entries, self.db, self.session, path, None, password,
+                          on_done=self.on_exported)
+
+    def on_exported(self, count):
+        """Результат фонового экспорта."""
+        self.set_status('')
+        if count is None:
+            messagebox.showerror('Ошибка', 'Не удалось экспортировать записи')
+        else:
+            messagebox.showinfo('Успех', f'Экспортировано записей: {count}')
+
+    def import_diary(self):
+        """Импорт записей из файла в фоне."""
+        if not self.session_ready():
+            return
+        path = filedialog.askopenfilename(
+            parent=self.root, title='Импорт записей',
+            filetypes=[('Зашифрованный архив', '*.diary'), ('JSON Lines', '*.jsonl')]
+        )
+        if not path:
+            return
+        password = None
+        if detect_format(path) == 'archive':
+            password = self.ask_archive_password(confirm=False)
+            if not password:
+                return
+        self.set_status('Импорт записей...')
+        self.tasks.submit(import_entries, self.db, self.session, path, None, password,
+                          on_done=self.on_imported)
+
+    def on_imported(self, count):
+        """Результат фонового импорта: перезагрузка списка."""
+        self.set_status('')
+        if count is None:
+            messagebox.showerror('Ошибка', 'Не удалось импортировать записи '
+                                 '(неверный пароль архива или повреждённый файл)')
+            return
+        messagebox.showinfo('Успех', f'Импортировано записей: {count}')
+        self.refresh_entries()
+
     def perform_search(self):
         """Выполнение расширенного поиска."""
-        keyword = self.search_keyword.get().strip().lower()
+        keyword = self.search_keyword.get().strip()
         date_from = self.search_date_from.get().strip()
         date_to = self.search_date_to.get().strip()
 
-        # Очистка предыдущих результатов
-        for item in self.search_tree.get_children():
-            self.search_tree.delete(item)
-
-        # Фильтрация записей
-        for entry in self.entries:
-            # Проверка по ключевому слову (в заголовке или содержимом)
-            match_keyword = True
-            if keyword:
-                match_keyword = (keyword in entry['title'].lower() or
-                                 keyword in entry['content'].lower())
-
-            # Проверка по дате
-            match_date = True
-            if date_from and date_from != 'ГГГГ-ММ-ДД':
-                match_date = entry['date'] >= date_from
-            if date_to and date_to != 'ГГГГ-ММ-ДД':
-                match_date = match_date and entry['date'] <= date_to
-
-            if match_keyword and match_date:
-                self.search_tree.insert('', 'end', values=(
-                    entry['id'],
-                    entry['date'],
-                    entry['title']
-                ))
\ No newline at end of file
+        if self.search_task:
+            self.search_task.cancel()
+            self.search_task = None
+
+        # Незаполненные поля дат содержат подсказку формата
+        date_from = None if date_from in ('', 'ГГГГ-ММ-ДД') else date_from
+        date_to = None if date_to in ('', 'ГГГГ-ММ-ДД') else date_to
+
+        # Ключевые слова ищутся по зашифрованному индексу, даты — в SQL
+        if keyword and not self.session_ready():
+            return
+        self.set_status('Поиск...')
+        self.search_task = self.tasks.submit(
+            self.db.search, keyword, self.session, date_from, date_to,
+            on_done=self.show_search_results
+        )
+
+    def show_search_results(self, entries):
+        """Вывод результатов поиска в таблицу."""
+        self.search_task = None
+        self.set_status('')
+        self.search_list.set_rows(EntryRows(entries))
+
+    def show_stats_window(self):
+        """Окно статистики: длительности операций, счётчики, профилирование."""
+        if self.stats_window is not None and self.stats_window.winfo_exists():
+            self.stats_window.lift()
+            return
+        win = self.stats_window = tk.Toplevel(self.root)
+        win.title('Статистика')
+        win.geometry('820x500')
+
+        button_frame = ttk.Frame(win)
+        button_frame.pack(side='bottom', fill='x', padx=10, pady=10)
+        text = tk.Text(win, wrap='none', font=('Courier', 9))
+        text.pack(fill='both', expand=True, padx=10, pady=(10, 0))
+
+        def update():
+            text.config(state='normal')
+            text.delete('1.0', 'end')
+            text.insert('1.0', metrics.report(self.stats_counters()))
+            text.config(state='disabled')
+
+        def reset():
+            metrics.reset()
+            update()
+
+        def save():
+            path = filedialog.asksaveasfilename(parent=win, title='Сохранение статистики',
+                                                defaultextension='.json',
+                                                filetypes=[('JSON', '*.json')])
+            if path and not metrics.dump(path, self.stats_counters()):
+                messagebox.showerror('Ошибка', 'Не удалось сохранить статистику', parent=win)
+
+        def toggle_profile():
+            if profile_var.get():
+                metrics.start_profile()
+                return
+            path = filedialog.asksaveasfilename(parent=win, title='Сохранение профиля',
+                                                defaultextension='.prof',
+                                                filetypes=[('Профиль cProfile', '*.prof')])
+            summary = metrics.stop_profile(path or None)
+            text.config(state='normal')
+            text.delete('1.0', 'end')
+            text.insert('1.0', summary)
+            text.config(state='disabled')
+
+        profile_var = tk.BooleanVar(value=False)
+        ttk.Button(button_frame, text='Обновить', command=update).pack(side='left', padx=5)
+        ttk.Button(button_frame, text='Сбросить', command=reset).pack(side='left', padx=5)
+        ttk.Button(button_frame, text='Сохранить...', command=save).pack(side='left', padx=5)
+        ttk.Checkbutton(button_frame, text='Профилирование', variable=profile_var,
+                        command=toggle_profile).pack(side='left', padx=5)
+        ttk.Button(button_frame, text='Закрыть', command=win.destroy).pack(side='right', padx=5)
+        update()
+
+    def stats_counters(self) -> dict:
+        """Счётчики кэша и списков для отчёта статистики."""
+        cache = self.db.content_cache.stats() if self.db else {}
+        counters = {f"cache.{name}": value for name, value in cache.items()}
+        counters['gui.entries_loaded'] = len(self.all_rows.entries)
+        counters['tasks.active'] = len(self.tasks.active)
+        return counters
+
+def entry_values(entry) -> tuple:
+    """Значения строки таблицы для записи."""
+    return (entry.id, entry.date, entry.title)
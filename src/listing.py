@@ -0,0 +1,155 @@
+# Модуль списков записей
+
+import time
+from src.records import entry_key
+from src.config import FILTER_CHUNK_SIZE
+
+class EntryRows:
+    """Набор строк списка записей, упорядоченный по entry_key по убыванию.
+
+    Набор может заполняться постепенно (extend) по мере поступления
+    страниц из фоновой загрузки; total — ожидаемое общее число строк.
+    """
+
+    def __init__(self, entries=(), total: int = None):
+        self.entries = list(entries)
+        self.by_id = {entry.id: entry for entry in self.entries}
+        self.complete = total is None
+        self.total = len(self.entries) if self.complete else total
+        self.removed = set()
+
+    def __len__(self):
+        return len(self.entries) if self.complete else max(self.total, len(self.entries))
+
+    def get(self, start: int, stop: int) -> list:
+        """Загруженные строки в диапазоне [start, stop)."""
+        return self.entries[start:stop]
+
+    def extend(self, page, complete: bool = False):
+        """Добавление очередной страницы загрузки (с учётом уже внесённых изменений)."""
+        for entry in page:
+            if entry.id in self.by_id or entry.id in self.removed:
+                continue
+            if not self.entries or entry_key(entry) < entry_key(self.entries[-1]):
+                self.entries.append(entry)
+            else:
+                self.entries.insert(find_position(self.entries, entry_key(entry)), entry)
+            self.by_id[entry.id] = entry
+        if complete:
+            self.complete = True
+            self.removed = set()
+
+    def insert(self, entry):
+        """Вставка одной записи на её место в порядке сортировки."""
+        self.entries.insert(find_position(self.entries, entry_key(entry)), entry)
+        self.by_id[entry.id] = entry
+        self.removed.discard(entry.id)
+        self.total += 1
+
+    def remove(self, entry_id: int):
+        """Удаление одной записи по ID."""
+        entry = self.by_id.pop(entry_id, None)
+        if entry is not None:
+            del self.entries[find_position(self.entries, entry_key(entry))]
+        if not self.complete:
+            # Запись могла ещё не прийти с фоновой загрузкой
+            self.removed.add(entry_id)
+        if entry is not None or not self.complete:
+            self.total -= 1
+
+    def remove_many(self, entry_ids):
+        """Удаление нескольких записей по ID за один проход по списку."""
+        entry_ids = set(entry_ids)
+        found = {entry_id for entry_id in entry_ids if self.by_id.pop(entry_id, None) is not None}
+        if found:
+            self.entries[:] = [entry for entry in self.entries if entry.id not in found]
+        if self.complete:
+            self.total -= len(found)
+        else:
+            self.removed |= entry_ids
+            self.total -= len(entry_ids)
+
+    def update(self, entry):
+        """Замена записи с учётом возможного изменения порядка."""
+        self.remove(entry.id)
+        self.insert(entry)
+
+class QuickFilter:
+    """Быстрый фильтр по заголовку и дате.
+
+    Ключи записей (заголовок и дата в casefold) вычисляются один раз и
+    кэшируются по ID. Если новый запрос содержит предыдущий, фильтруется
+    только предыдущий результат, а не весь список.
+    """
+
+    def __init__(self):
+        self.keys = {}
+        self.query = None
+        self.result = None
+
+    def key(self, entry) -> str:
+        """Ключ записи для сравнения с запросом."""
+        key = self.keys.get(entry.id)
+        if key is None:
+            key = self.keys[entry.id] = entry.title.casefold() + '\n' + entry.date
+        return key
+
+    def matches(self, query: str, entry) -> bool:
+        """Проверка одной записи по запросу."""
+        return query.casefold() in self.key(entry)
+
+    def start(self, query: str, entries, remember: bool = True) -> 'FilterJob':
+        """Новая фильтрация: сужение прошлого результата или полный проход.
+
+        remember=False — результат не сохраняется для сужения (список неполон).
+        """
+        query = query.casefold()
+        if self.result is not None and self.query in query:
+            entries = self.result
+        return FilterJob(self, query, entries, remember)
+
+    def forget(self, entry_id: int):
+        """Сброс кэша после изменения записи."""
+        self.keys.pop(entry_id, None)
+        self.query = None
+        self.result = None
+
+class FilterJob:
+    """Фильтрация порциями с ограничением времени на один шаг."""
+
+    def __init__(self, quick_filter: QuickFilter, query: str, entries, remember: bool = True):
+        self.quick_filter = quick_filter
+        self.query = query
+        self.entries = entries
+        self.remember = remember
+        self.position = 0
+        self.result = []
+
+    def step(self, budget: float) -> bool:
+        """Обработка порций, пока не истечёт бюджет (с); True — фильтрация завершена."""
+        deadline = time.perf_counter() + budget
+        key = self.quick_filter.key
+        query = self.query
+        while self.position < len(self.entries):
+            chunk = self.entries[self.position:self.position + FILTER_CHUNK_SIZE]
+            self.result.extend(entry for entry in chunk if query in key(entry))
+            self.position += len(chunk)
+            if time.perf_counter() >= deadline:
+                break
+        if self.position < len(self.entries):
+            return False
+        if self.remember:
+            self.quick_filter.query = query
+            self.quick_filter.result = self.result
+        return True
+
+def find_position(entries, key) -> int:
+    """Позиция ключа в списке записей, отсортированном по убыванию (бинарный поиск)."""
+    low, high = 0, len(entries)
+    while low < high:
+        middle = (low + high) // 2
+        if entry_key(entries[middle]) > key:
+            low = middle + 1
+        else:
+            high = middle
+    return low
@@ -2,11 +2,26 @@
 
 import sys
 import os
+import threading
+from types import SimpleNamespace
 import tkinter as tk
 from tkinter import messagebox, ttk
-from src.gui import DiaryGUI
 from src.config import APP_NAME, DB_NAME
 
+def preload_application() -> threading.Thread:
+    """Фоновый импорт главного окна вместе с базой и криптографией
+    (самая долгая часть запуска), пока на экране окно ввода пароля."""
+    thread = threading.Thread(target=_import_application, name="preload", daemon=True)
+    thread.start()
+    return thread
+
+def _import_application():
+    """Импорт модулей приложения (ошибка повторится при обычном импорте)."""
+    try:
+        import src.gui
+    except Exception as e:
+        print(f"Ошибка предзагрузки: {e}")
+
 def create_password_window(title=APP_NAME, is_first_run=False):
     """Создание окна ввода/создания мастер-пароля."""
     window = tk.Tk()
@@ -74,8 +89,27 @@ def create_password_window(title=APP_NAME, is_first_run=False):
 
     return result["password"]
 
+def parse_args(argv=None):
+    """Разбор параметров командной строки (замеры производительности)."""
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        return SimpleNamespace(stats=None, profile=None)
+    # argparse (вместе с re) загружается, только если параметры заданы
+    import argparse
+    parser = argparse.ArgumentParser(prog=APP_NAME)
+    parser.add_argument('--stats', metavar='FILE',
+                        help='сохранить статистику производительности в JSON при выходе')
+    parser.add_argument('--profile', metavar='FILE',
+                        help='профилировать работу cProfile и сохранить профиль при выходе')
+    return parser.parse_args(argv)
+
 def main():
     """Главная функция приложения."""
+    args = parse_args()
+    if args.profile:
+        from src.metrics import metrics
+        metrics.start_profile()
+    preload = preload_application()
     db_exists = os.path.exists(DB_NAME)
 
     if not db_exists:
@@ -99,6 +133,11 @@ def main():
         if not master_password:
             sys.exit(0)
 
+    # Обычно модули уже загружены, пока вводился пароль
+    preload.join()
+    from src.gui import DiaryGUI
+    from src.metrics import metrics
+
     root = tk.Tk()
     root.title(APP_NAME)
     root.geometry("900x650")
@@ -111,5 +150,13 @@ def main():
 
     root.mainloop()
 
+    if args.profile:
+        print(metrics.stop_profile(args.profile))
+    if args.stats:
+        metrics.dump(args.stats, app.stats_counters())
+
 if __name__ == "__main__":
+    if getattr(sys, 'frozen', False):
+        import multiprocessing
+        multiprocessing.freeze_support()  # Пул процессов дешифрования в собранном EXE
     main()
\ No newline at end of file
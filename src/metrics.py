@@ -0,0 +1,256 @@
+# Модуль замеров производительности во время работы
+
+import io
+import json
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from src.config import METRICS, METRICS_BUCKETS_MS, METRICS_PROFILE_LINES
+
+class Histogram:
+    """Гистограмма длительностей операции по корзинам METRICS_BUCKETS_MS (мс)."""
+
+    __slots__ = ('count', 'total', 'min', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = 0.0
+        self.buckets = [0] * (len(METRICS_BUCKETS_MS) + 1)
+
+    def add(self, ms: float):
+        """Учёт одного замера."""
+        self.count += 1
+        self.total += ms
+        self.min = ms if self.min is None else min(self.min, ms)
+        self.max = max(self.max, ms)
+        self.buckets[bisect_left(METRICS_BUCKETS_MS, ms)] += 1
+
+    def percentile(self, fraction: float) -> float:
+        """Оценка процентиля сверху — граница корзины, в которую он попал."""
+        rank = fraction * self.count
+        seen = 0
+        for bound, number in zip(METRICS_BUCKETS_MS, self.buckets):
+            seen += number
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def as_dict(self) -> dict:
+        """Сводка для отчёта и выгрузки в JSON."""
+        return {'count': self.count, 'total_ms': self.total,
+                'mean_ms': self.total / self.count if self.count else 0.0,
+                'min_ms': self.min or 0.0, 'max_ms': self.max,
+                'p50_ms': self.percentile(0.5), 'p95_ms': self.percentile(0.95),
+                'buckets': dict(zip([f"<={bound}" for bound in METRICS_BUCKETS_MS] + ['>'],
+                                    self.buckets))}
+
+class Metrics:
+    """Реестр счётчиков и гистограмм длительностей (общий для всех потоков).
+
+    Замер стоит два вызова perf_counter и короткую блокировку, поэтому
+    хуки стоят прямо на горячих путях: вывод ключа, шифрование, запросы
+    SQLite, перерисовка списка. Профилирование cProfile включается
+    отдельно и охватывает главный поток и фоновые задачи.
+    """
+
+    def __init__(self, enabled: bool = METRICS):
+        self.enabled = enabled
+        self.started = time.time()
+        self.counters = {}
+        self.timings = {}
+        self._lock = threading.Lock()
+        self._profilers = {}
+        self._profiling = False
+
+    def count(self, name: str, amount: int = 1):
+        """Увеличение счётчика."""
+        if self.enabled:
+            with self._lock:
+                self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name: str, seconds: float):
+        """Учёт длительности операции."""
+        if self.enabled:
+            with self._lock:
+                histogram = self.timings.get(name)
+                if histogram is None:
+                    histogram = self.timings[name] = Histogram()
+                histogram.add(seconds * 1000)
+
+    @contextmanager
+    def timer(self, name: str):
+        """Замер длительности блока with."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def timed(self, name: str):
+        """Декоратор замера длительности вызовов функции."""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe(name, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def reset(self):
+        """Сброс всех счётчиков и гистограмм."""
+        with self._lock:
+            self.counters = {}
+            self.timings = {}
+            self.started = time.time()
+
+    def snapshot(self) -> dict:
+        """Текущие значения для выгрузки в JSON."""
+        with self._lock:
+            return {'started': self.started, 'uptime_s': time.time() - self.started,
+                    'counters': dict(self.counters),
+                    'timings': {name: histogram.as_dict()
+                                for name, histogram in self.timings.items()}}
+
+    def report(self, extra: dict = None) -> str:
+        """Текстовый отчёт: операции по убыванию суммарного времени, затем счётчики."""
+        data = self.snapshot()
+        lines = [f"{'Операция':<36}{'вызовов':>9}{'всего, мс':>12}{'сред.':>9}"
+                 f"{'p50':>9}{'p95':>9}{'макс.':>10}"]
+        for name, stats in sorted(data['timings'].items(), key=lambda item: -item[1]['total_ms']):
+            lines.append(f"{name:<36}{stats['count']:>9}{stats['total_ms']:>12.1f}"
+                         f"{stats['mean_ms']:>9.2f}{stats['p50_ms']:>9.2f}"
+                         f"{stats['p95_ms']:>9.2f}{stats['max_ms']:>10.2f}")
+        counters = dict(data['counters'], **(extra or {}))
+        if counters:
+            lines.append('')
+            lines.extend(f"{name:<36}{value:>9}" for name, value in sorted(counters.items()))
+        return '\n'.join(lines)
+
+    def dump(self, path: str, extra: dict = None) -> bool:
+        """Выгрузка замеров в JSON-файл."""
+        try:
+            data = self.snapshot()
+            data['counters'].update(extra or {})
+            with open(path, 'w', encoding='utf-8') as stream:
+                json.dump(data, stream, ensure_ascii=False, indent=2)
+            return True
+        except Exception as e:
+            print(f"Ошибка сохранения статистики: {e}")
+            return False
+
+    def start_profile(self):
+        """Включение cProfile в вызывающем потоке; фоновые задачи
+        профилируются через profiled()."""
+        with self._lock:
+            self._profiling = True
+        self._thread_profiler().enable()
+
+    @contextmanager
+    def profiled(self):
+        """Профилирование блока в текущем потоке, если профилирование включено."""
+        if not self._profiling:
+            yield
+            return
+        profiler = self._thread_profiler()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+
+    def stop_profile(self, path: str = None) -> str:
+        """Выключение профилирования; возвращает сводку по самым затратным
+        функциям и при необходимости сохраняет полные данные для pstats."""
+        with self._lock:
+            self._profiling = False
+            profilers = list(self._profilers.values())
+            self._profilers = {}
+        if not profilers:
+            return ''
+        for profiler in profilers:
+            profiler.disable()
+        import pstats
+        output = io.StringIO()
+        stats = pstats.Stats(*profilers, stream=output)
+        if path:
+            stats.dump_stats(path)
+        stats.sort_stats('cumulative').print_stats(METRICS_PROFILE_LINES)
+        return output.getvalue()
+
+    def _thread_profiler(self):
+        """Профилировщик текущего потока (cProfile не охватывает чужие потоки)."""
+        # cProfile и pstats загружаются только при профилировании (быстрый запуск)
+        import cProfile
+        ident = threading.get_ident()
+        with self._lock:
+            profiler = self._profilers.get(ident)
+            if profiler is None:
+                profiler = self._profilers[ident] = cProfile.Profile()
+        return profiler
+
+class TimedConnection:
+    """Обёртка соединения SQLite с замером каждого запроса.
+
+    Запросы группируются по виду и таблице ("sql.select entries");
+    отдельно замеряется фиксация транзакции ("sql.commit").
+    Для SELECT замеряется подготовка и первый шаг выборки;
+    полное время операции с чтением строк — в замерах "db.*".
+    """
+
+    _TABLE = re.compile(r'\b(?:FROM|INTO|UPDATE|TABLE|INDEX)\s+(?:IF\s+(?:NOT\s+)?EXISTS\s+)?(\w+)',
+                        re.IGNORECASE)
+
+    def __init__(self, conn, registry: Metrics = None):
+        self._conn = conn
+        self._metrics = registry or metrics
+        self._labels = {}
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        with self._metrics.timer('sql.commit' if exc_type is None else 'sql.rollback'):
+            return self._conn.__exit__(exc_type, exc_value, traceback)
+
+    def execute(self, sql: str, parameters=()):
+        with self._metrics.timer(self._label(sql)):
+            return self._conn.execute(sql, parameters)
+
+    def executemany(self, sql: str, parameters):
+        with self._metrics.timer(self._label(sql)):
+            return self._conn.executemany(sql, parameters)
+
+    def executescript(self, script: str):
+        with self._metrics.timer('sql.script'):
+            return self._conn.executescript(script)
+
+    def _label(self, sql: str) -> str:
+        """Имя замера для запроса (кэшируется по тексту запроса)."""
+        label = self._labels.get(sql)
+        if label is None:
+            words = sql.split(None, 1)
+            table = self._TABLE.search(sql)
+            label = f"sql.{words[0].lower() if words else 'empty'}"
+            if table:
+                label += f" {table.group(1)}"
+            # Текст запросов поиска зависит от числа слов — кэш ограничен
+            if len(self._labels) < 1024:
+                self._labels[sql] = label
+        return label
+
+# Общий реестр приложения
+metrics = Metrics()
@@ -0,0 +1,177 @@
+# Модуль миграций схемы базы данных
+
+import hashlib
+import sqlite3
+
+def _rebuild_entries_blob(conn: sqlite3.Connection):
+    """Пересоздание таблицы записей с колонкой содержимого типа BLOB.
+
+    Строки старого формата переносятся как есть (TEXT) и перешифровываются
+    позже в фоне; счётчик AUTOINCREMENT сохраняется.
+    """
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'entries'").fetchone()
+    conn.execute('''
+        CREATE TABLE entries_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT NOT NULL,
+            title TEXT NOT NULL,
+            encrypted_content BLOB NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('''
+        INSERT INTO entries_new (id, date, title, encrypted_content, created_at)
+        SELECT id, date, title, encrypted_content, created_at FROM entries
+    ''')
+    conn.execute('DROP TABLE entries')
+    conn.execute('ALTER TABLE entries_new RENAME TO entries')
+    if row:
+        conn.execute("DELETE FROM sqlite_sequence WHERE name = 'entries'")
+        conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('entries', ?)", row)
+    conn.execute('''
+        CREATE INDEX idx_entries_date
+        ON entries (date, created_at, id, title)
+    ''')
+
+def legacy_entry_uuid(entry_id: int, created_at) -> str:
+    """UUID записи, созданной до появления UUID: выводится из ID и времени создания,
+    поэтому совпадает в копиях одного файла дневника, обновлённых независимо."""
+    return hashlib.sha256(f"{entry_id}|{created_at}".encode()).hexdigest()[:32]
+
+def _add_entry_versions(conn: sqlite3.Connection):
+    """Стабильные UUID и версии записей для синхронизации копий дневника.
+
+    Каждая существующая запись получает строку журнала изменений (новые —
+    следующими ревизиями) и UUID; версия прежних записей — 0.
+    """
+    conn.execute('ALTER TABLE entry_changes ADD COLUMN uuid TEXT')
+    conn.execute('ALTER TABLE entry_changes ADD COLUMN version INTEGER NOT NULL DEFAULT 0')
+    revision = conn.execute('SELECT COALESCE(MAX(revision), 0) FROM entry_changes').fetchone()[0]
+    rows = conn.execute('''
+        SELECT e.id, e.created_at, c.revision
+        FROM entries e LEFT JOIN entry_changes c ON c.entry_id = e.id
+        ORDER BY e.id
+    ''').fetchall()
+    conn.executemany('''
+        INSERT INTO entry_changes (entry_id, revision, uuid) VALUES (?, ?, ?)
+        ON CONFLICT (entry_id) DO UPDATE SET uuid = excluded.uuid
+    ''', [(entry_id, existing or revision + number, legacy_entry_uuid(entry_id, created_at))
+          for number, (entry_id, created_at, existing) in enumerate(rows, 1)])
+
+# Миграции по порядку: версия схемы N получается применением MIGRATIONS[N - 1].
+# Шаг миграции — SQL-команда или функция, принимающая соединение.
+# Новые изменения схемы добавляются только в конец списка.
+MIGRATIONS = [
+    # 1: исходная схема (таблицы могли существовать до появления миграций)
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS entries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT NOT NULL,
+            title TEXT NOT NULL,
+            encrypted_content TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS settings (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+        ''',
+        # Поисковый индекс: слепой токен терма -> ID записи
+        '''
+        CREATE TABLE IF NOT EXISTS search_index (
+            token BLOB NOT NULL,
+            entry_id INTEGER NOT NULL,
+            PRIMARY KEY (token, entry_id)
+        ) WITHOUT ROWID
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS idx_search_index_entry
+        ON search_index (entry_id)
+        ''',
+    ],
+    # 2: покрывающий индекс для сортировки списка и отбора по дате
+    [
+        '''
+        CREATE INDEX IF NOT EXISTS idx_entries_date
+        ON entries (date, created_at, id, title)
+        ''',
+    ],
+    # 3: содержимое записей хранится в двоичном виде (BLOB с заголовком формата)
+    [
+        _rebuild_entries_blob,
+    ],
+    # 4: фрагменты больших записей (в entries — опись фрагментов)
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS entry_chunks (
+            entry_id INTEGER NOT NULL,
+            chunk_id INTEGER NOT NULL,
+            data BLOB NOT NULL,
+            PRIMARY KEY (entry_id, chunk_id)
+        ) WITHOUT ROWID
+        ''',
+    ],
+    # 5: журнал изменений записей для обнаружения правок другими копиями приложения.
+    # По каждой добавленной, изменённой или удалённой записи хранится только последняя
+    # ревизия; журнал ведёт DatabaseManager в той же транзакции, что и саму правку
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS entry_changes (
+            entry_id INTEGER PRIMARY KEY,
+            revision INTEGER NOT NULL
+        )
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS idx_entry_changes_revision
+        ON entry_changes (revision)
+        ''',
+    ],
+    # 6: UUID и версии записей для синхронизации копий дневника (см. src.sync);
+    # строки журнала удалённых записей служат отметками удаления
+    [
+        _add_entry_versions,
+        '''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_entry_changes_uuid
+        ON entry_changes (uuid)
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS idx_entry_changes_version
+        ON entry_changes (version)
+        ''',
+    ],
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Применение недостающих миграций; каждая — в отдельной транзакции.
+
+    Версия схемы перечитывается под блокировкой записи: другая копия
+    приложения могла применить ту же миграцию, пока эта ждала блокировку.
+    Возвращает итоговую версию схемы (PRAGMA user_version).
+    """
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    while version < SCHEMA_VERSION:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+            if version < SCHEMA_VERSION:
+                version += 1
+                for step in MIGRATIONS[version - 1]:
+                    if callable(step):
+                        step(conn)
+                    else:
+                        conn.execute(step)
+                conn.execute(f'PRAGMA user_version = {version}')
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(
+            f"База данных создана более новой версией приложения (схема {version})"
+        )
+    return SCHEMA_VERSION
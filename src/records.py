@@ -0,0 +1,38 @@
+# Модуль записей дневника
+
+import sys
+
+class Entry:
+    """Запись дневника: метаданные и (после расшифровки) содержимое.
+
+    Вместо словаря на каждую строку — объект со слотами; строки дат
+    интернируются, поэтому одинаковые даты разных записей хранятся один раз.
+    """
+
+    __slots__ = ('id', 'date', 'title', 'created_at', 'content')
+
+    def __init__(self, id: int, date: str, title: str, created_at: str = None,
+                 content: str = None):
+        self.id = id
+        self.date = sys.intern(date)
+        self.title = title
+        self.created_at = created_at
+        self.content = content
+
+    def __repr__(self):
+        return f"Entry(id={self.id!r}, date={self.date!r}, title={self.title!r})"
+
+def entry_key(entry: Entry) -> tuple:
+    """Ключ сортировки записи для постраничной загрузки."""
+    return (entry.date, entry.created_at, entry.id)
+
+# Обязательные поля новой записи (непустые строки, как в форме добавления)
+RECORD_FIELDS = ('date', 'title', 'content')
+
+def invalid_field(record: dict):
+    """Первое отсутствующее, пустое или нестроковое поле записи (None — запись корректна)."""
+    for field in RECORD_FIELDS:
+        value = record.get(field) if isinstance(record, dict) else None
+        if not isinstance(value, str) or not value.strip():
+            return field
+    return None
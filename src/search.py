@@ -0,0 +1,48 @@
+# Модуль поискового индекса
+
+import re
+
+PREFIX_LENGTH = 3               # Длина индексируемых префиксов слов
+
+_WORD_RE = re.compile(r"\w+")
+
+def tokenize(text: str) -> list:
+    """Разбиение текста на слова в нижнем регистре."""
+    return _WORD_RE.findall(text.casefold())
+
+def index_terms(title: str, content: str) -> set:
+    """Термы индекса записи: целые слова и их префиксы фиксированной длины."""
+    terms = set()
+    # Повторы слов отбрасываются до построения термов (большие записи)
+    for word in set(tokenize(title)) | set(tokenize(content)):
+        terms.add("w:" + word)
+        if len(word) >= PREFIX_LENGTH:
+            terms.add("p:" + word[:PREFIX_LENGTH])
+    return terms
+
+def parse_query(query: str) -> list:
+    """Разбор запроса на условия (все должны выполняться).
+
+    Слово ищется целиком, слово со звёздочкой на конце ("прив*") — как
+    префикс. Возвращает список пар (терм индекса, префикс для проверки
+    или None, если терм индекса точен).
+    """
+    conditions = []
+    for part in query.split():
+        is_prefix = part.endswith("*")
+        for word in tokenize(part):
+            if not is_prefix:
+                conditions.append(("w:" + word, None))
+            elif len(word) < PREFIX_LENGTH:
+                # Короткие префиксы не индексируются — ищем слово целиком
+                conditions.append(("w:" + word, None))
+            elif len(word) == PREFIX_LENGTH:
+                conditions.append(("p:" + word, None))
+            else:
+                conditions.append(("p:" + word[:PREFIX_LENGTH], word))
+    return conditions
+
+def matches_prefixes(text: str, prefixes: list) -> bool:
+    """Проверка, что для каждого префикса в тексте есть начинающееся с него слово."""
+    words = tokenize(text)
+    return all(any(word.startswith(prefix) for word in words) for prefix in prefixes)
@@ -1,44 +1,472 @@
 # Модуль шифрования данных
 
 import base64
+import hashlib
+import hmac
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from cryptography.exceptions import InvalidTag
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
+from src.compression import compress, decompress, FLAG_DICTIONARY
+from src.metrics import metrics
+from src.config import (DECRYPT_WORKERS, DECRYPT_CHUNK_SIZE, DECRYPT_PROCESSES,
+                        ARCHIVE_KDF_ITERATIONS, KDF_ALGORITHM, KDF_TARGET_MS,
+                        KDF_MIN_ITERATIONS, KDF_SCRYPT_MIN_N, KDF_SCRYPT_MAX_MEMORY)
+
+# Формат зашифрованного содержимого (BLOB):
+# версия формата (1 байт) | флаги (1 байт) | nonce (12 байт) | шифртекст AES-GCM с тегом.
+# Флаги описывают сжатие открытого текста (см. src.compression).
+# Заголовок входит в аутентифицируемые данные. Строки старого формата (TEXT) —
+# токен Fernet, дополнительно закодированный в base64.
+# Большие записи хранятся фрагментами (см. src.chunks): в записи — зашифрованная
+# опись фрагментов с флагом FLAG_CHUNKED, каждый фрагмент — отдельный BLOB того
+# же формата, к аутентифицируемым данным которого добавлены ID записи и фрагмента.
+CONTENT_FORMAT = 1              # Текущая версия формата
+NONCE_SIZE = 12                 # Размер nonce AES-GCM, байт
+FLAG_CHUNKED = 0x80             # Флаг описи фрагментов большой записи
+
+# Связка ключей базы (JSON в настройках): ключ данных, зашифрованный ключом из пароля
+KEYRING_VERSION = 1             # Версия формата связки ключей
+KEYRING_AAD = b"diary-keyring"  # Аутентифицируемые данные зашифрованного ключа
+
+# Параметры алгоритмов вывода ключа, хранящиеся в связке ключей
+KDF_PARAMETERS = {
+    'pbkdf2-sha256': ('kdf', 'iterations'),
+    'scrypt': ('kdf', 'n', 'r', 'p'),
+}
+# Вывод ключа старой схемы (фиксированная соль)
+LEGACY_KDF = {'kdf': 'pbkdf2-sha256', 'iterations': 100000}
+
+class CryptoSession:
+    """Сессия шифрования: ключ данных базы, открытый мастер-паролем один раз за вход."""
+
+    def __init__(self, key: bytes, legacy_key: bytes = None):
+        self._key = bytearray(key)
+        # Ключ строк старого формата (TEXT): у базы, созданной до связки ключей, —
+        # прежний ключ из пароля, пока записи не перешифрованы ключом данных
+        self._legacy_key = bytearray(legacy_key or key)
+        self._cipher = Fernet(bytes(self._legacy_key))
+        self._aead = AESGCM(_content_key(self._key))
+        # Отдельный ключ для слепых токенов поискового индекса
+        self._index_key = bytearray(hmac.new(bytes(self._key), b"search-index", hashlib.sha256).digest())
+        # Ключ отпечатков фрагментов больших записей
+        self._chunk_key = bytearray(hmac.new(bytes(self._key), b"content-chunk", hashlib.sha256).digest())
+        self._dictionary = None
+        self._pool = None
+        self._pool_config = None
+
+    def set_dictionary(self, dictionary: bytes):
+        """Установка общего словаря сжатия базы."""
+        self._dictionary = dictionary or None
+        self._shutdown_pool()
+
+    def with_dictionary(self, dictionary: bytes):
+        """Сессия с тем же ключом данных и другим словарём сжатия."""
+        session = CryptoSession(bytes(self._key), bytes(self._legacy_key))
+        session.set_dictionary(dictionary)
+        return session
+
+    def reseal(self, encrypted_data: bytes, target, associated: bytes = b"") -> bytes:
+        """Перешифровка содержимого сессией target (пересжатие её словарём).
+
+        Опись фрагментов остаётся описью; b"" при ошибке.
+        """
+        chunked = is_chunked_content(encrypted_data)
+        text = _decrypt_content(self._aead, self._cipher, encrypted_data, self._dictionary,
+                                associated, chunked)
+        if text is None:
+            return b""
+        try:
+            return target._seal(text.encode(), FLAG_CHUNKED if chunked else 0, associated)
+        except Exception as e:
+            print(f"Ошибка шифрования: {e}")
+            return b""
+
+    @metrics.timed('crypto.encrypt')
+    def encrypt(self, data: str, associated: bytes = b"") -> bytes:
+        """Шифрование строки ключом сессии (сжатие, заголовок формата, AES-GCM).
+
+        associated — дополнительные аутентифицируемые данные (для фрагментов).
+        """
+        try:
+            return self._seal(data.encode(), 0, associated)
+        except Exception as e:
+            print(f"Ошибка шифрования: {e}")
+            return b""
+
+    def encrypt_manifest(self, manifest: dict) -> bytes:
+        """Шифрование описи фрагментов большой записи."""
+        try:
+            return self._seal(json.dumps(manifest, separators=(',', ':')).encode(), FLAG_CHUNKED)
+        except Exception as e:
+            print(f"Ошибка шифрования описи фрагментов: {e}")
+            return b""
+
+    def _seal(self, data: bytes, extra_flags: int, associated: bytes = b"") -> bytes:
+        """Сжатие и шифрование AES-GCM с заголовком формата."""
+        flags, plaintext = compress(data, self._dictionary)
+        header = bytes((CONTENT_FORMAT, flags | extra_flags))
+        nonce = os.urandom(NONCE_SIZE)
+        return header + nonce + self._aead.encrypt(nonce, plaintext, header + associated)
+
+    @metrics.timed('crypto.decrypt')
+    def decrypt(self, encrypted_data, associated: bytes = b"") -> str:
+        """Дешифрование содержимого ключом сессии (BLOB или строка старого формата).
+
+        None — ошибка или опись фрагментов (содержимое собирается из фрагментов).
+        """
+        return _decrypt_content(self._aead, self._cipher, encrypted_data, self._dictionary,
+                                associated)
+
+    def decrypt_manifest(self, encrypted_data):
+        """Дешифрование описи фрагментов (None при ошибке)."""
+        text = _decrypt_content(self._aead, self._cipher, encrypted_data, self._dictionary,
+                                chunked=True)
+        return json.loads(text) if text else None
+
+    def chunk_digest(self, text: str) -> str:
+        """Отпечаток фрагмента (HMAC-SHA256, 16 байт) для поиска изменённых фрагментов."""
+        return hmac.digest(self._chunk_key, text.encode(), 'sha256')[:16].hex()
+
+    @metrics.timed('crypto.decrypt_many')
+    def decrypt_many(self, encrypted_items, workers: int = DECRYPT_WORKERS,
+                     chunk_size: int = DECRYPT_CHUNK_SIZE,
+                     processes: bool = DECRYPT_PROCESSES) -> list:
+        """Пакетное дешифрование с распараллеливанием по порциям.
+
+        Результаты возвращаются в исходном порядке (None для нерасшифрованных).
+        По умолчанию пул не используется: AES-GCM и распаковка держат GIL,
+        и пул потоков выигрыша не даёт. workers=0 — по числу ядер;
+        processes=True — пул процессов вместо пула потоков (ключ при этом
+        передаётся дочерним процессам), окупается на больших пакетах.
+        """
+        items = list(encrypted_items)
+        metrics.count('crypto.decrypt_many items', len(items))
+        workers = workers or os.cpu_count() or 1
+
+        # Замеряется пакет целиком, поэтому записи расшифровываются без обёртки decrypt
+        def decrypt(item):
+            return _decrypt_content(self._aead, self._cipher, item, self._dictionary)
+
+        if workers == 1 or len(items) <= chunk_size:
+            return [decrypt(item) for item in items]
+
+        chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+        if processes:
+            results = self._get_pool(workers, True).map(_decrypt_chunk, chunks)
+        else:
+            results = self._get_pool(workers, False).map(
+                lambda chunk: [decrypt(item) for item in chunk], chunks
+            )
+        return [text for chunk in results for text in chunk]
+
+    def _get_pool(self, workers: int, processes: bool):
+        """Пул исполнителей сессии (пересоздаётся при смене параметров)."""
+        if self._pool_config != (workers, processes):
+            self._shutdown_pool()
+            if processes:
+                self._pool = ProcessPoolExecutor(workers, initializer=_init_process_cipher,
+                                                 initargs=(bytes(self._key), self._dictionary,
+                                                           bytes(self._legacy_key)))
+            else:
+                self._pool = ThreadPoolExecutor(workers, thread_name_prefix="decrypt")
+            self._pool_config = (workers, processes)
+        return self._pool
+
+    def _shutdown_pool(self):
+        """Остановка пула исполнителей."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = None
+        self._pool_config = None
+
+    def key_check(self) -> str:
+        """Контрольное значение ключа данных (см. SecurityManager.keyring_check)."""
+        return key_check(bytes(self._key))
+
+    def blind_token(self, term: str) -> bytes:
+        """Слепой токен терма для поискового индекса (HMAC-SHA256, 16 байт)."""
+        return hmac.digest(self._index_key, term.encode(), 'sha256')[:16]
+
+    def close(self):
+        """Завершение сессии: затирание ключей и сброс шифра."""
+        self._shutdown_pool()
+        for buffer in (self._key, self._legacy_key, self._index_key, self._chunk_key):
+            for i in range(len(buffer)):
+                buffer[i] = 0
+        self._cipher = None
+        self._aead = None
+        self._dictionary = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
 class SecurityManager:
-    """Класс управления шифрованием (симметричное шифрование Fernet + PBKDF2)."""
+    """Класс управления шифрованием (симметричное шифрование AES-GCM + PBKDF2/scrypt).
+
+    Записи шифруются случайным ключом данных базы. Ключ данных хранится
+    в связке ключей (keyring), зашифрованным ключом из мастер-пароля со
+    случайной солью базы: проверка пароля — один вывод ключа, смена
+    пароля — перешифровка одного ключа данных.
+    """
 
     def __init__(self):
-        self.salt = b"securepass_salt_2025_"
+        # Фиксированная соль баз, созданных до появления связки ключей
+        self.legacy_salt = b"securepass_salt_2025_"
+
+    def create_keyring(self, password: str, legacy: bool = False) -> tuple:
+        """Новая связка ключей со случайным ключом данных; возвращает
+        (связка в JSON, сессия с ключом данных).
 
-    def encrypt(self, data: str, password: str) -> str:
-        """Шифрование строки с использованием мастер-пароля."""
+        legacy=True — база создана до связки ключей: сессия дополнительно
+        открывает строки старого формата прежним ключом из пароля. Копии файла
+        такой базы получают разные ключи данных и не синхронизируются.
+        """
+        data_key = base64.urlsafe_b64encode(os.urandom(32))
+        return self._wrap(password, data_key), self._session(data_key, password, legacy)
+
+    def unlock(self, keyring: str, password: str, legacy: bool = False) -> tuple:
+        """Открытие сессии по связке ключей; возвращает (сессия или None при
+        неверном пароле, время вывода ключа связки в секундах).
+
+        legacy=True — в базе остались строки старого формата (см. create_keyring).
+        """
+        start = time.perf_counter()
+        data_key = self._unwrap(keyring, password)
+        elapsed = time.perf_counter() - start
+        return (self._session(data_key, password, legacy) if data_key else None), elapsed
+
+    def _session(self, data_key: bytes, password: str, legacy: bool) -> CryptoSession:
+        """Сессия с ключом данных (и прежним ключом из пароля для строк старого формата)."""
+        return CryptoSession(data_key, self._legacy_key(password) if legacy else None)
+
+    def _legacy_key(self, password: str) -> bytes:
+        """Ключ старой схемы: вывод из пароля с фиксированной солью."""
+        return base64.urlsafe_b64encode(self._derive_key(password, self.legacy_salt))
+
+    def rewrap(self, keyring: str, old_password: str, new_password: str):
+        """Смена мастер-пароля: перешифровка ключа данных. None — неверный старый пароль."""
+        data_key = self._unwrap(keyring, old_password)
+        return self._wrap(new_password, data_key, self.keyring_kdf(keyring)) if data_key else None
+
+    def open_legacy_session(self, password: str) -> CryptoSession:
+        """Сессия старой базы: ключ выводится из пароля с фиксированной солью."""
+        return CryptoSession(self._legacy_key(password))
+
+    def keyring_check(self, keyring: str):
+        """Контрольное значение ключа данных из связки (None — связка его не хранит)."""
+        return json.loads(keyring).get('key_check') if keyring else None
+
+    def with_key_check(self, keyring: str, session: CryptoSession) -> str:
+        """Связка с контрольным значением ключа данных сессии."""
+        return json.dumps({**json.loads(keyring), 'key_check': session.key_check()})
+
+    def keyring_kdf(self, keyring: str) -> dict:
+        """Параметры вывода ключа, записанные в связке ключей."""
+        record = json.loads(keyring)
+        return {key: record[key] for key in KDF_PARAMETERS[record['kdf']]}
+
+    def needs_tuning(self, keyring: str, elapsed: float) -> bool:
+        """Нужна ли перенастройка вывода ключа по времени последнего входа (с).
+
+        Да, если алгоритм отличается от KDF_ALGORITHM или время входа далеко
+        от KDF_TARGET_MS: быстрее трети (калибровка scrypt по степеням двойки
+        даёт от половины до целого) или медленнее двойного (только если
+        параметры выше минимальных).
+        """
+        params = self.keyring_kdf(keyring)
+        target = KDF_TARGET_MS / 1000
+        if params['kdf'] != KDF_ALGORITHM or elapsed < target / 3:
+            return True
+        return elapsed > target * 2 and params != minimal_kdf(params['kdf'])
+
+    def retune(self, keyring: str, session: CryptoSession, password: str):
+        """Связка ключей сессии с параметрами, подобранными под это устройство.
+
+        None — калибровка дала те же параметры, перешифровка не нужна.
+        """
+        params = calibrate_kdf()
+        if params == self.keyring_kdf(keyring):
+            return None
+        return self._wrap(password, bytes(session._key), params)
+
+    def _wrap(self, password: str, data_key: bytes, params: dict = None) -> str:
+        """Шифрование ключа данных ключом из пароля с новой случайной солью.
+
+        params=None — параметры вывода ключа подбираются калибровкой.
+        """
+        params = params or calibrate_kdf()
+        salt = os.urandom(16)
+        nonce = os.urandom(NONCE_SIZE)
+        wrapping_key = derive_key(password, salt, params)
+        wrapped = AESGCM(wrapping_key).encrypt(nonce, bytes(data_key), KEYRING_AAD)
+        return json.dumps({
+            'version': KEYRING_VERSION,
+            **params,
+            'salt': base64.b64encode(salt).decode(),
+            'nonce': base64.b64encode(nonce).decode(),
+            'wrapped_key': base64.b64encode(wrapped).decode(),
+            'key_check': key_check(data_key),
+        })
+
+    def _unwrap(self, keyring: str, password: str):
+        """Ключ данных из связки; тег AES-GCM служит проверкой пароля (None — не подошёл)."""
         try:
-            key = self._derive_key(password)
-            cipher = Fernet(key)
-            encrypted = cipher.encrypt(data.encode())
-            return base64.urlsafe_b64encode(encrypted).decode()
+            record = json.loads(keyring)
+            if record['version'] != KEYRING_VERSION:
+                raise ValueError(f"Неизвестная версия связки ключей: {record['version']}")
+            wrapping_key = derive_key(password, base64.b64decode(record['salt']),
+                                      self.keyring_kdf(keyring))
+            return AESGCM(wrapping_key).decrypt(base64.b64decode(record['nonce']),
+                                                base64.b64decode(record['wrapped_key']),
+                                                KEYRING_AAD)
+        except InvalidTag:
+            return None
         except Exception as e:
-            print(f"Ошибка шифрования: {e}")
-            return ""
+            print(f"Ошибка чтения связки ключей: {e}")
+            return None
+
+    def _derive_key(self, password: str, salt: bytes) -> bytes:
+        """Генерация ключа шифрования старой схемы (PBKDF2HMAC, 100000 итераций)."""
+        return derive_key(password, salt, LEGACY_KDF)
+
+def key_check(data_key: bytes) -> str:
+    """Контрольное значение ключа данных: сравнение ключей копий без пароля."""
+    return hmac.digest(data_key, b"key-check", 'sha256')[:16].hex()
 
-    def decrypt(self, encrypted_data: str, password: str) -> str:
-        """Дешифрование строки с использованием мастер-пароля."""
+def derive_key(password: str, salt: bytes, params: dict) -> bytes:
+    """Вывод 32-байтного ключа из пароля по параметрам KDF (PBKDF2 или scrypt)."""
+    if params['kdf'] == 'pbkdf2-sha256':
+        kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=salt,
+                         iterations=params['iterations'])
+    elif params['kdf'] == 'scrypt':
+        kdf = Scrypt(salt=salt, length=32, n=params['n'], r=params['r'], p=params['p'])
+    else:
+        raise ValueError(f"Неизвестный алгоритм вывода ключа: {params['kdf']}")
+    with metrics.timer(f"crypto.kdf {params['kdf']}"):
+        return kdf.derive(password.encode())
+
+def minimal_kdf(algorithm: str) -> dict:
+    """Минимально допустимые параметры алгоритма вывода ключа."""
+    if algorithm == 'scrypt':
+        return {'kdf': 'scrypt', 'n': KDF_SCRYPT_MIN_N, 'r': 8, 'p': 1}
+    return {'kdf': 'pbkdf2-sha256', 'iterations': KDF_MIN_ITERATIONS}
+
+@metrics.timed('crypto.kdf_calibrate')
+def calibrate_kdf(algorithm: str = KDF_ALGORITHM, target_ms: int = KDF_TARGET_MS) -> dict:
+    """Подбор параметров KDF, при которых вывод ключа занимает около target_ms.
+
+    Время вывода растёт линейно с числом итераций PBKDF2 и с параметром n
+    scrypt, поэтому достаточно одного пробного замера на минимальных
+    параметрах. Результат не опускается ниже минимальных параметров.
+    """
+    params = minimal_kdf(algorithm)
+    start = time.perf_counter()
+    derive_key("calibration", os.urandom(16), params)
+    elapsed = max(time.perf_counter() - start, 1e-6)
+    scale = target_ms / 1000 / elapsed
+    if algorithm == 'scrypt':
+        # n — степень двойки, память scrypt 128 * r * n байт
+        max_n = KDF_SCRYPT_MAX_MEMORY // (128 * params['r'])
+        while params['n'] * 2 <= max_n and scale >= 2:
+            params['n'] *= 2
+            scale /= 2
+    else:
+        params['iterations'] = max(KDF_MIN_ITERATIONS,
+                                   int(params['iterations'] * scale) // 1000 * 1000)
+    return params
+
+class ArchiveCipher:
+    """Шифрование блоков архива дневника ключом из пароля архива.
+
+    Ключ выводится PBKDF2 со случайной солью архива, поэтому архив не
+    зависит от ключа базы. Номер блока и признак последнего блока входят
+    в аутентифицируемые данные: перестановка и обрезка блоков обнаруживаются.
+    """
+
+    def __init__(self, password: str, salt: bytes = None, iterations: int = ARCHIVE_KDF_ITERATIONS):
+        self.salt = salt or os.urandom(16)
+        self.iterations = iterations
+        kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=self.salt, iterations=iterations)
+        self._aead = AESGCM(kdf.derive(password.encode()))
+
+    def seal(self, header: bytes, index: int, data: bytes, last: bool) -> bytes:
+        """Шифрование блока: nonce + шифртекст с тегом."""
+        nonce = os.urandom(NONCE_SIZE)
+        return nonce + self._aead.encrypt(nonce, data, self._associated(header, index, last))
+
+    def open(self, header: bytes, index: int, block: bytes, last: bool) -> bytes:
+        """Дешифрование блока (ValueError при неверном пароле или порче архива)."""
         try:
-            key = self._derive_key(password)
-            cipher = Fernet(key)
+            return self._aead.decrypt(block[:NONCE_SIZE], block[NONCE_SIZE:],
+                                      self._associated(header, index, last))
+        except InvalidTag:
+            raise ValueError("Неверный пароль архива или архив повреждён")
+
+    def _associated(self, header: bytes, index: int, last: bool) -> bytes:
+        """Аутентифицируемые данные блока."""
+        return header + index.to_bytes(8, 'big') + bytes((last,))
+
+def is_legacy_content(encrypted_data) -> bool:
+    """Признак содержимого старого формата (строка base64 с токеном Fernet)."""
+    return isinstance(encrypted_data, str)
+
+def is_chunked_content(encrypted_data) -> bool:
+    """Признак описи фрагментов большой записи."""
+    return (isinstance(encrypted_data, bytes) and len(encrypted_data) > 1
+            and bool(encrypted_data[1] & FLAG_CHUNKED))
+
+def uses_dictionary(encrypted_data) -> bool:
+    """Признак содержимого, сжатого общим словарём базы."""
+    return (isinstance(encrypted_data, bytes) and len(encrypted_data) > 1
+            and bool(encrypted_data[1] & FLAG_DICTIONARY))
+
+def chunk_associated(entry_id: int, chunk_id: int) -> bytes:
+    """Аутентифицируемые данные фрагмента: привязка к записи и номеру фрагмента."""
+    return entry_id.to_bytes(8, 'big') + chunk_id.to_bytes(8, 'big')
+
+def _content_key(key) -> bytes:
+    """Ключ AES-GCM для содержимого записей, выводимый из ключа сессии."""
+    return hmac.new(bytes(key), b"content-aead", hashlib.sha256).digest()
+
+def _decrypt_content(aead: AESGCM, cipher: Fernet, encrypted_data, dictionary: bytes = None,
+                     associated: bytes = b"", chunked: bool = False) -> str:
+    """Дешифрование содержимого любого поддерживаемого формата (None при ошибке;
+    "" — пустой текст).
+
+    chunked — ожидается опись фрагментов, а не текст записи.
+    """
+    try:
+        if is_legacy_content(encrypted_data):
             encrypted_bytes = base64.urlsafe_b64decode(encrypted_data.encode())
-            decrypted = cipher.decrypt(encrypted_bytes)
-            return decrypted.decode()
-        except Exception:
-            return ""
-
-    def _derive_key(self, password: str) -> bytes:
-        """Генерация ключа шифрования на основе пароля (PBKDF2HMAC)."""
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=self.salt,
-            iterations=100000
-        )
-        return base64.urlsafe_b64encode(kdf.derive(password.encode()))
\ No newline at end of file
+            return None if chunked else cipher.decrypt(encrypted_bytes).decode()
+        header = encrypted_data[:2]
+        if header[0] != CONTENT_FORMAT or bool(header[1] & FLAG_CHUNKED) != chunked:
+            return None
+        nonce = encrypted_data[2:2 + NONCE_SIZE]
+        plaintext = aead.decrypt(nonce, encrypted_data[2 + NONCE_SIZE:], header + associated)
+        return decompress(header[1], plaintext, dictionary).decode()
+    except Exception:
+        return None
+
+# Шифры дочернего процесса пакетного дешифрования
+_process_ciphers = None
+
+def _init_process_cipher(key: bytes, dictionary: bytes = None, legacy_key: bytes = None):
+    """Инициализация шифров в дочернем процессе пула."""
+    global _process_ciphers
+    _process_ciphers = (AESGCM(_content_key(key)), Fernet(legacy_key or key), dictionary)
+
+def _decrypt_chunk(chunk: list) -> list:
+    """Дешифрование порции в дочернем процессе."""
+    aead, cipher, dictionary = _process_ciphers
+    return [_decrypt_content(aead, cipher, item, dictionary) for item in chunk]
@@ -0,0 +1,113 @@
+# Модуль синхронизации копий дневника
+
+import hashlib
+import json
+import os
+
+# Копии одного дневника (общий ключ данных) обмениваются шифртекстом записей,
+# изменённых после последней известной ревизии другой копии (см. src.migrations).
+
+def replica_id(db, renew: bool = False) -> str:
+    """Идентификатор копии дневника (создаётся при первой синхронизации)."""
+    replica = db.get_setting('sync_replica')
+    if replica is None or renew:
+        replica = os.urandom(16).hex()
+        db.set_setting('sync_replica', replica)
+    return replica
+
+def peer_revisions(db) -> dict:
+    """Ревизии других копий, до которых их изменения известны этой базе."""
+    return json.loads(db.get_setting('sync_peers') or '{}')
+
+def set_peer_revision(db, replica: str, revision: int):
+    """Запоминание ревизии другой копии после успешного обмена."""
+    peers = peer_revisions(db)
+    peers[replica] = revision
+    db.set_setting('sync_peers', json.dumps(peers))
+
+def prepare_replica(local, remote, session):
+    """Проверка общего ключа данных (база без записей получает связку ключей)
+    и выбор общего словаря сжатия. ValueError — базы несовместимы."""
+    if remote.count_entries() == 0:
+        remote.set_setting('keyring', local.get_setting('keyring'))
+    elif not remote.matches_key(session):
+        raise ValueError("другая база зашифрована другим ключом: это не копия этого дневника "
+                         "или копия файла дневника старой версии (такую копию нужно "
+                         "создать заново синхронизацией в пустой файл)")
+    local_dictionary = local.get_setting('compression_dictionary')
+    remote_dictionary = remote.get_setting('compression_dictionary')
+    if local_dictionary is None or remote_dictionary is None:
+        shared = local_dictionary or remote_dictionary
+        if shared is not None:
+            local.share_dictionary(shared)
+            remote.share_dictionary(shared)
+    elif local_dictionary != remote_dictionary:
+        # Копии обучили разные словари: у всех остаётся словарь с меньшим отпечатком
+        winner = min(local_dictionary, remote_dictionary,
+                     key=lambda value: hashlib.sha256(session.decrypt(value).encode()).digest())
+        loser = remote if winner == local_dictionary else local
+        if not loser.replace_dictionary(session, winner):
+            raise RuntimeError("не удалось пересжать записи общим словарём")
+    local.load_dictionary(session)
+    if local.get_setting('compression_dictionary') != remote.get_setting('compression_dictionary'):
+        raise ValueError("у копий дневника разные словари сжатия")
+
+def sync_databases(local, remote, session, full: bool = False):
+    """Двусторонний обмен изменениями двух копий дневника.
+
+    Сначала обе базы передают сводки изменений (UUID, версия, отпечаток),
+    затем каждая получает только записи, которые у неё старее. full — сравнить
+    все записи, а не только изменённые с прошлой синхронизации. Возвращает
+    {'received', 'sent', 'conflicts'} или None при ошибке; конфликты — записи,
+    изменённые в обеих копиях (при первой и полной синхронизации не считаются).
+    """
+    try:
+        prepare_replica(local, remote, session)
+        local_id = replica_id(local)
+        remote_id = replica_id(remote)
+        # Копия файла после синхронизации унаследовала идентификатор
+        if local_id == remote_id:
+            local_id = replica_id(local, renew=True)
+        local_since = 0 if full else peer_revisions(remote).get(local_id, 0)
+        remote_since = 0 if full else peer_revisions(local).get(remote_id, 0)
+        local_summary = local.sync_summary(local_since)
+        remote_summary = remote.sync_summary(remote_since)
+        if local_summary is None or remote_summary is None:
+            raise RuntimeError("не удалось прочитать изменения")
+        to_local = local.sync_wanted(remote_summary[1])
+        to_remote = remote.sync_wanted(local_summary[1])
+        if to_local is None or to_remote is None:
+            raise RuntimeError("не удалось сравнить изменения")
+
+        rows = remote.sync_export(to_local)
+        received = local.sync_apply(rows, session, local_summary[0]) if rows is not None else None
+        if received is None:
+            raise RuntimeError("не удалось применить изменения другой копии")
+        rows = local.sync_export(to_remote)
+        sent = remote.sync_apply(rows, session, remote_summary[0]) if rows is not None else None
+        if sent is None:
+            raise RuntimeError("не удалось передать изменения другой копии")
+        # Каждая база теперь знает все изменения другой до её ревизии после обмена
+        set_peer_revision(local, remote_id, sent[1])
+        set_peer_revision(remote, local_id, received[1])
+        # Копии со связью обучают словарь сжатия только здесь — один на обе
+        if local.ensure_dictionary(session, synced=True):
+            remote.share_dictionary(local.get_setting('compression_dictionary'))
+        conflicts = 0
+        if local_since and remote_since:
+            conflicts = sum(1 for uuid, stamp in local_summary[1].items()
+                            if uuid in remote_summary[1] and remote_summary[1][uuid] != stamp)
+        return {'received': received[0], 'sent': sent[0], 'conflicts': conflicts}
+    except Exception as e:
+        print(f"Ошибка синхронизации: {e}")
+        return None
+
+def sync_file(db, session, path: str, full: bool = False):
+    """Синхронизация с копией дневника в другом файле (флешка, сетевая папка)."""
+    from src.database import DatabaseManager
+    try:
+        with DatabaseManager(path) as remote:
+            return sync_databases(db, remote, session, full)
+    except Exception as e:
+        print(f"Ошибка синхронизации: {e}")
+        return None
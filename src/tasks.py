@@ -0,0 +1,149 @@
+# Модуль фоновых задач
+
+import queue
+import threading
+import time
+from src.metrics import metrics
+from src.config import TASK_POLL_MS, TASK_BATCH_INTERVAL
+
+class Task:
+    """Фоновая задача: колбэки вызываются в потоке Tk, пока задача не отменена."""
+
+    def __init__(self, on_done=None, on_items=None, on_error=None):
+        self.on_done = on_done
+        self.on_items = on_items
+        self.on_error = on_error
+        self.cancelled = False
+        self.finished = False
+
+    def cancel(self):
+        """Отмена задачи: её результаты больше не доставляются."""
+        self.cancelled = True
+
+class TaskExecutor:
+    """Исполнитель операций с базой и шифрованием в фоновом потоке.
+
+    Задачи выполняются по очереди в одном рабочем потоке; результаты
+    складываются в очередь, которую поток Tk опрашивает через root.after.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.tasks = queue.Queue()
+        self.results = queue.Queue()
+        self.active = set()
+        self.stopped = False
+        self.worker = threading.Thread(target=self._work, name="diary-worker", daemon=True)
+        self.worker.start()
+        self._poll_id = self.root.after(TASK_POLL_MS, self._poll)
+
+    def submit(self, func, *args, on_done=None, on_error=None) -> Task:
+        """Выполнение func(*args) в фоне; on_done получает результат."""
+        task = Task(on_done=on_done, on_error=on_error)
+        self.active.add(task)
+        self.tasks.put((task, func, args, False, time.perf_counter()))
+        return task
+
+    def stream(self, func, *args, on_items=None, on_done=None, on_error=None) -> Task:
+        """Фоновый обход генератора func(*args) с передачей элементов порциями.
+
+        on_items получает список очередных элементов, on_done — число
+        переданных элементов после завершения обхода.
+        """
+        task = Task(on_done=on_done, on_items=on_items, on_error=on_error)
+        self.active.add(task)
+        self.tasks.put((task, func, args, True, time.perf_counter()))
+        return task
+
+    def cancel_all(self):
+        """Отмена всех незавершённых задач."""
+        for task in list(self.active):
+            task.cancel()
+
+    @property
+    def busy(self) -> bool:
+        """Признак наличия незавершённых задач."""
+        return any(not task.cancelled for task in self.active)
+
+    def shutdown(self, timeout: float = 2.0):
+        """Остановка рабочего потока."""
+        self.stopped = True
+        self.cancel_all()
+        self.tasks.put(None)
+        self.worker.join(timeout)
+        self.root.after_cancel(self._poll_id)
+
+    def _work(self):
+        """Цикл рабочего потока."""
+        while True:
+            job = self.tasks.get()
+            if job is None:
+                return
+            task, func, args, streaming, queued_at = job
+            if task.cancelled:
+                self.results.put(('done', task, None))
+                continue
+            # Ожидание в очереди и выполнение замеряются раздельно
+            started = time.perf_counter()
+            metrics.observe('task.wait', started - queued_at)
+            try:
+                with metrics.profiled():
+                    if streaming:
+                        result = self._stream(task, func(*args))
+                    else:
+                        result = func(*args)
+                self.results.put(('done', task, result))
+            except Exception as e:
+                self.results.put(('error', task, e))
+            finally:
+                metrics.observe(f"task.{getattr(func, '__name__', 'task')}",
+                                time.perf_counter() - started)
+
+    def _stream(self, task, iterator) -> int:
+        """Обход генератора с отправкой порций не чаще TASK_BATCH_INTERVAL."""
+        batch = []
+        count = 0
+        sent_at = time.perf_counter()
+        for item in iterator:
+            if task.cancelled:
+                break
+            batch.append(item)
+            count += 1
+            if time.perf_counter() - sent_at >= TASK_BATCH_INTERVAL:
+                self.results.put(('items', task, batch))
+                batch = []
+                sent_at = time.perf_counter()
+        if batch:
+            self.results.put(('items', task, batch))
+        return count
+
+    def _poll(self):
+        """Доставка результатов фоновых задач в потоке Tk."""
+        try:
+            while True:
+                kind, task, payload = self.results.get_nowait()
+                if kind != 'items':
+                    self.active.discard(task)
+                    task.finished = True
+                if not task.cancelled:
+                    self._deliver(kind, task, payload)
+        except queue.Empty:
+            pass
+        finally:
+            if not self.stopped:
+                self._poll_id = self.root.after(TASK_POLL_MS, self._poll)
+
+    def _deliver(self, kind, task, payload):
+        """Вызов колбэка задачи с перехватом ошибок интерфейса."""
+        try:
+            if kind == 'items' and task.on_items:
+                task.on_items(payload)
+            elif kind == 'done' and task.on_done:
+                task.on_done(payload)
+            elif kind == 'error':
+                metrics.count('errors.task')
+                print(f"Ошибка фоновой задачи: {payload}")
+                if task.on_error:
+                    task.on_error(payload)
+        except Exception as e:
+            print(f"Ошибка обработки результата задачи: {e}")
@@ -0,0 +1,140 @@
+# Модуль экспорта и импорта записей
+
+import json
+import os
+import zlib
+from src.security import ArchiveCipher
+from src.config import TRANSFER_BATCH_SIZE
+
+# Архив дневника: MAGIC | соль (16 байт) | число итераций PBKDF2 (4 байта) | блоки.
+# Блок: длина (4 байта) | признак последнего блока (1 байт) | nonce + шифртекст
+# сжатой порции записей в формате JSONL.
+ARCHIVE_MAGIC = b"PDIARY\x00\x01"
+
+# Форматы по расширению файла
+FORMATS = {'.jsonl': 'jsonl', '.md': 'markdown', '.diary': 'archive'}
+
+def detect_format(path: str) -> str:
+    """Формат файла по расширению (по умолчанию JSONL)."""
+    return FORMATS.get(os.path.splitext(path)[1].lower(), 'jsonl')
+
+def entry_record(entry) -> dict:
+    """Переносимое представление записи (без ID базы)."""
+    return {'date': entry.date, 'title': entry.title,
+            'content': entry.content, 'created_at': entry.created_at}
+
+def write_jsonl(entries, stream) -> int:
+    """Запись по одной строке JSON на запись."""
+    count = 0
+    for entry in entries:
+        stream.write(json.dumps(entry_record(entry), ensure_ascii=False) + '\n')
+        count += 1
+    return count
+
+def write_markdown(entries, stream) -> int:
+    """Запись в Markdown для чтения человеком (обратно не импортируется)."""
+    stream.write('# Личный дневник\n\n')
+    count = 0
+    for entry in entries:
+        stream.write(f"## {entry.date} — {entry.title}\n\n{entry.content}\n\n")
+        count += 1
+    return count
+
+def write_archive(entries, stream, password: str, batch_size: int = TRANSFER_BATCH_SIZE) -> int:
+    """Запись зашифрованного архива порциями по batch_size записей."""
+    cipher = ArchiveCipher(password)
+    header = ARCHIVE_MAGIC + cipher.salt + cipher.iterations.to_bytes(4, 'big')
+    stream.write(header)
+    count = 0
+    index = 0
+    lines = []
+
+    def write_block(last: bool):
+        data = zlib.compress(''.join(lines).encode())
+        block = cipher.seal(header, index, data, last)
+        stream.write(len(block).to_bytes(4, 'big') + bytes((last,)) + block)
+
+    for entry in entries:
+        lines.append(json.dumps(entry_record(entry), ensure_ascii=False) + '\n')
+        count += 1
+        if len(lines) >= batch_size:
+            write_block(False)
+            index += 1
+            lines = []
+    # Последний блок (возможно, пустой) отмечает конец архива
+    write_block(True)
+    return count
+
+def read_jsonl(stream):
+    """Чтение записей из JSONL (пустые строки пропускаются)."""
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+def read_archive(stream, password: str):
+    """Чтение записей из зашифрованного архива по одному блоку."""
+    header = stream.read(len(ARCHIVE_MAGIC) + 20)
+    if len(header) != len(ARCHIVE_MAGIC) + 20 or not header.startswith(ARCHIVE_MAGIC):
+        raise ValueError("Файл не является архивом дневника")
+    salt = header[len(ARCHIVE_MAGIC):-4]
+    cipher = ArchiveCipher(password, salt, int.from_bytes(header[-4:], 'big'))
+    index = 0
+    while True:
+        prefix = stream.read(5)
+        if len(prefix) != 5:
+            raise ValueError("Архив обрезан")
+        block = stream.read(int.from_bytes(prefix[:4], 'big'))
+        last = bool(prefix[4])
+        data = zlib.decompress(cipher.open(header, index, block, last))
+        # Только '\n': splitlines() делит и по U+2028, U+0085, которые JSON оставляет как есть
+        for line in data.decode().split('\n'):
+            if line:
+                yield json.loads(line)
+        if last:
+            return
+        index += 1
+
+def export_entries(db, session, path: str, fmt: str = None, password: str = None):
+    """Экспорт всех записей в файл; возвращает число записей или None.
+
+    Записи читаются из базы страницами с пакетной расшифровкой и сразу
+    пишутся в файл — в памяти не держится больше одной страницы. Файл
+    записывается во временный и подменяется целиком после успеха.
+    """
+    fmt = fmt or detect_format(path)
+    temp_path = path + '.tmp'
+    try:
+        entries = db.iter_entries(session)
+        if fmt == 'archive':
+            with open(temp_path, 'wb') as stream:
+                count = write_archive(entries, stream, password)
+        else:
+            writer = write_markdown if fmt == 'markdown' else write_jsonl
+            with open(temp_path, 'w', encoding='utf-8', newline='\n') as stream:
+                count = writer(entries, stream)
+        os.replace(temp_path, path)
+        return count
+    except Exception as e:
+        print(f"Ошибка экспорта: {e}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return None
+
+def import_entries(db, session, path: str, fmt: str = None, password: str = None):
+    """Импорт записей из JSONL или архива; возвращает число записей или None.
+
+    Записи читаются потоком и вставляются порциями в одной транзакции:
+    при любой ошибке база остаётся без изменений.
+    """
+    fmt = fmt or detect_format(path)
+    try:
+        if fmt == 'archive':
+            with open(path, 'rb') as stream:
+                return db.import_entries(read_archive(stream, password), session)
+        if fmt == 'jsonl':
+            with open(path, encoding='utf-8') as stream:
+                return db.import_entries(read_jsonl(stream), session)
+        raise ValueError(f"Импорт из формата {fmt} не поддерживается")
+    except Exception as e:
+        print(f"Ошибка импорта: {e}")
+        return None
@@ -0,0 +1,127 @@
+# Модуль виджетов интерфейса
+
+from tkinter import ttk
+from src.listing import EntryRows
+from src.metrics import metrics
+
+class VirtualTreeview:
+    """Виртуальный список поверх ttk.Treeview.
+
+    В виджете существуют только строки видимого окна: при прокрутке
+    элементы Treeview переиспользуются, меняются лишь их значения.
+    Источник строк — EntryRows (постраничная выборка из базы или
+    результаты в памяти), положение задаётся полосой прокрутки.
+    """
+
+    def __init__(self, tree: ttk.Treeview, scrollbar: ttk.Scrollbar, row_values,
+                 row_height: int = None):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.row_values = row_values
+        self.rows = EntryRows()
+        self.offset = 0
+        self.items = []
+        self.item_ids = {}
+        self.selected = set()
+        # Высота строки из стиля; явное значение — для работы без дисплея (замеры)
+        self.row_height = row_height or int(ttk.Style(tree).lookup('Treeview', 'rowheight') or 20)
+
+        self.tree.config(yscrollcommand='')
+        self.scrollbar.config(command=self.yview)
+        self.tree.bind('<Configure>', lambda e: self.render())
+        self.tree.bind('<<TreeviewSelect>>', lambda e: self.on_select())
+        self.tree.bind('<MouseWheel>', lambda e: self.scroll(-3 if e.delta > 0 else 3))
+        self.tree.bind('<Button-4>', lambda e: self.scroll(-3))
+        self.tree.bind('<Button-5>', lambda e: self.scroll(3))
+        self.tree.bind('<Prior>', lambda e: self.scroll(-self.visible_count()) or 'break')
+        self.tree.bind('<Next>', lambda e: self.scroll(self.visible_count()) or 'break')
+        self.tree.bind('<Up>', lambda e: self.move_selection(-1) or 'break')
+        self.tree.bind('<Down>', lambda e: self.move_selection(1) or 'break')
+
+    def set_rows(self, rows: EntryRows):
+        """Замена источника строк с возвратом к началу списка."""
+        self.rows = rows
+        self.offset = 0
+        self.selected = set()
+        self.render()
+
+    def refresh(self):
+        """Перерисовка видимого окна после изменения источника строк."""
+        self.selected = {entry_id for entry_id in self.selected if entry_id in self.rows.by_id}
+        self.render()
+
+    def visible_count(self) -> int:
+        """Число строк, помещающихся в видимой области."""
+        height = self.tree.winfo_height()
+        if height <= 1:
+            return int(self.tree.cget('height'))
+        return max(1, height // self.row_height - 1)
+
+    @metrics.timed('gui.render')
+    def render(self):
+        """Отрисовка видимого окна строк."""
+        count = self.visible_count()
+        total = len(self.rows)
+        self.offset = max(0, min(self.offset, total - count))
+        window = self.rows.get(self.offset, self.offset + count)
+
+        while len(self.items) < len(window):
+            self.items.append(self.tree.insert('', 'end', values=()))
+        while len(self.items) > len(window):
+            self.tree.delete(self.items.pop())
+
+        self.item_ids = {}
+        selection = []
+        for item, entry in zip(self.items, window):
+            self.tree.item(item, values=self.row_values(entry))
+            self.item_ids[item] = entry.id
+            if entry.id in self.selected:
+                selection.append(item)
+        self.tree.selection_set(selection)
+
+        if total:
+            self.scrollbar.set(self.offset / total, (self.offset + len(window)) / total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def yview(self, *args):
+        """Обработка команд полосы прокрутки (moveto/scroll)."""
+        if args[0] == 'moveto':
+            self.offset = int(float(args[1]) * len(self.rows))
+        elif args[0] == 'scroll':
+            step = int(args[1])
+            if args[2] == 'pages':
+                step *= self.visible_count()
+            self.offset += step
+        self.render()
+
+    def scroll(self, step: int):
+        """Прокрутка на заданное число строк."""
+        self.offset += step
+        self.render()
+
+    def on_select(self):
+        """Запоминание выбранных записей по ID (выбор переживает прокрутку)."""
+        visible = set(self.item_ids.values())
+        chosen = {self.item_ids[item] for item in self.tree.selection() if item in self.item_ids}
+        self.selected = (self.selected - visible) | chosen
+
+    def move_selection(self, step: int):
+        """Перемещение выбора клавишами со скроллингом у края окна."""
+        selection = self.tree.selection()
+        if not selection or selection[0] not in self.item_ids:
+            return
+        index = self.offset + self.items.index(selection[0]) + step
+        if not 0 <= index < len(self.rows):
+            return
+        if index < self.offset:
+            self.offset = index
+        elif index >= self.offset + len(self.items):
+            self.offset = index - len(self.items) + 1
+        self.selected = {self.rows.get(index, index + 1)[0].id}
+        self.render()
+
+    def selected_ids(self) -> list:
+        """ID выбранных записей (сначала видимые, в порядке списка)."""
+        visible = [self.item_ids[item] for item in self.items if self.item_ids[item] in self.selected]
+        return visible + [entry_id for entry_id in self.selected if entry_id not in visible]
@@ -0,0 +1,52 @@
+# Вспомогательные функции тестов
+
+import base64
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from src import security
+
+PASSWORD = "пароль"
+
+def make_baseline_db(path: str, entries, password: str = PASSWORD):
+    """База в формате первой версии приложения: TEXT-содержимое Fernet
+    с ключом PBKDF2 от пароля и фиксированной соли, без схемы миграций."""
+    kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32,
+                     salt=b"securepass_salt_2025_", iterations=100000)
+    cipher = Fernet(base64.urlsafe_b64encode(kdf.derive(password.encode())))
+    conn = sqlite3.connect(path)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS entries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT NOT NULL,
+            title TEXT NOT NULL,
+            encrypted_content TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    with conn:
+        conn.executemany(
+            'INSERT INTO entries (date, title, encrypted_content) VALUES (?, ?, ?)',
+            [(date, title, base64.urlsafe_b64encode(cipher.encrypt(content.encode())).decode())
+             for date, title, content in entries]
+        )
+    conn.close()
+
+class DiaryTestCase(unittest.TestCase):
+    """Тест во временном каталоге с быстрым выводом ключа."""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        # Минимальные параметры KDF вместо калибровки под 250 мс
+        calibrate = security.calibrate_kdf
+        security.calibrate_kdf = lambda *args, **kwargs: security.minimal_kdf(security.KDF_ALGORITHM)
+        self.addCleanup(setattr, security, 'calibrate_kdf', calibrate)
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.tmp, name)
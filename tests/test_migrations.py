@@ -0,0 +1,51 @@
+# Тесты миграций схемы базы данных
+
+import sqlite3
+import unittest
+from src.database import DatabaseManager
+from src.migrations import SCHEMA_VERSION, legacy_entry_uuid, migrate
+from tests.support import DiaryTestCase, PASSWORD, make_baseline_db
+
+ENTRIES = [("2024-01-0%d" % day, f"Запись {day}", f"Текст записи {day}") for day in range(1, 6)]
+
+class BaselineMigrationTest(DiaryTestCase):
+    def setUp(self):
+        super().setUp()
+        make_baseline_db(self.path('diary.db'), ENTRIES)
+
+    def test_schema_upgraded(self):
+        with DatabaseManager(self.path('diary.db')) as db:
+            version = db._conn.execute('PRAGMA user_version').fetchone()[0]
+            rows = db._conn.execute(
+                'SELECT e.id, e.created_at, c.uuid FROM entries e JOIN entry_changes c ON c.entry_id = e.id'
+            ).fetchall()
+        self.assertEqual(version, SCHEMA_VERSION)
+        self.assertEqual(len(rows), len(ENTRIES))
+        for entry_id, created_at, uuid in rows:
+            self.assertEqual(uuid, legacy_entry_uuid(entry_id, created_at))
+
+    def test_entries_readable_and_upgraded(self):
+        with DatabaseManager(self.path('diary.db')) as db:
+            self.assertIsNone(db.open_session("неверный"))
+            with db.open_session(PASSWORD) as session:
+                last_id = 0
+                while last_id is not None:
+                    last_id = db.upgrade_content(session, last_id)
+                texts = sorted(entry.content for entry in db.get_all_entries(session))
+            legacy = db._conn.execute(
+                "SELECT COUNT(*) FROM entries WHERE typeof(encrypted_content) = 'text'"
+            ).fetchone()[0]
+        self.assertEqual(texts, sorted(content for _, _, content in ENTRIES))
+        self.assertEqual(legacy, 0)
+
+    def test_migrate_is_idempotent(self):
+        DatabaseManager(self.path('diary.db')).close()
+        conn = sqlite3.connect(self.path('diary.db'), isolation_level=None)
+        try:
+            self.assertEqual(migrate(conn), SCHEMA_VERSION)
+            self.assertEqual(conn.execute('PRAGMA user_version').fetchone()[0], SCHEMA_VERSION)
+        finally:
+            conn.close()
+
+if __name__ == '__main__':
+    unittest.main()
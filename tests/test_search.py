@@ -0,0 +1,42 @@
+# Тесты поиска по записям
+
+import unittest
+from unittest import mock
+from src.database import DatabaseManager
+from tests.support import DiaryTestCase, PASSWORD, make_baseline_db
+
+ENTRIES = [
+    ("2025-01-01", "Поход", "Поднялись на перевал к вечеру"),
+    ("2025-01-02", "Работа", "Переписал отчёт о продажах"),
+    ("2025-01-03", "Дом", "Перевалило за полночь, читал книгу"),
+    ("2025-01-04", "Прогулка", "Парк и набережная"),
+    ("2025-01-05", "Чтение", "Дочитал книгу про перевалы"),
+]
+
+class SearchTest(DiaryTestCase):
+    def setUp(self):
+        super().setUp()
+        # База до поискового индекса: индекс строится при первом поиске
+        make_baseline_db(self.path('diary.db'), ENTRIES)
+        self.db = DatabaseManager(self.path('diary.db'))
+        self.addCleanup(self.db.close)
+        self.session = self.db.open_session(PASSWORD)
+        self.addCleanup(self.session.close)
+
+    def titles(self, query):
+        return sorted(entry.title for entry in self.db.search(query, self.session))
+
+    def test_index_built_in_batches(self):
+        with mock.patch('src.database.DECRYPT_PAGE_SIZE', 2):
+            self.assertTrue(self.db.ensure_search_index(self.session))
+        self.assertEqual(self.db.get_setting('search_index'), '1')
+        self.assertEqual(self.titles("книгу"), ["Дом", "Чтение"])
+
+    def test_prefix_search_bypasses_cache(self):
+        self.assertTrue(self.db.ensure_search_index(self.session))
+        self.assertEqual(self.titles("перевал*"), ["Дом", "Поход", "Чтение"])
+        self.assertEqual(self.titles("перевал* книг*"), ["Дом", "Чтение"])
+        self.assertEqual(self.db.content_cache.size, 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+# Тесты связки ключей и вывода ключа
+
+import time
+import unittest
+from src.security import SecurityManager
+from tests.support import DiaryTestCase, PASSWORD
+
+class KeyringTest(DiaryTestCase):
+    def test_unlock_and_rewrap(self):
+        security = SecurityManager()
+        keyring, session = security.create_keyring(PASSWORD)
+        with session:
+            token = session.encrypt("текст")
+        self.assertIsNone(security.unlock(keyring, "неверный")[0])
+        rewrapped = security.rewrap(keyring, PASSWORD, "новый")
+        self.assertIsNone(security.unlock(rewrapped, PASSWORD)[0])
+        with security.unlock(rewrapped, "новый")[0] as session:
+            self.assertEqual(session.decrypt(token), "текст")
+
+    def test_unlock_time_excludes_legacy_key(self):
+        security = SecurityManager()
+        keyring, session = security.create_keyring(PASSWORD)
+        session.close()
+        derive = security._derive_key
+
+        def slow_derive(password, salt):
+            time.sleep(0.2)
+            return derive(password, salt)
+
+        security._derive_key = slow_derive
+        session, elapsed = security.unlock(keyring, PASSWORD, legacy=True)
+        session.close()
+        # Настройка KDF связки не должна учитывать вывод ключа старой схемы
+        self.assertLess(elapsed, 0.1)
+
+if __name__ == '__main__':
+    unittest.main()
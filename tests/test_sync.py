@@ -0,0 +1,62 @@
+# Тесты синхронизации копий дневника
+
+import shutil
+import unittest
+from src.database import DatabaseManager
+from src.sync import sync_databases, sync_file
+from tests.support import DiaryTestCase, PASSWORD, make_baseline_db
+
+ENTRIES = [
+    ("2025-01-01", "Первая", "Текст первой записи"),
+    ("2025-01-02", "Вторая", "Текст второй записи"),
+]
+
+class SyncTest(DiaryTestCase):
+    def open(self, name):
+        db = DatabaseManager(self.path(name))
+        self.addCleanup(db.close)
+        session = db.open_session(PASSWORD)
+        self.assertIsNotNone(session)
+        self.addCleanup(session.close)
+        return db, session
+
+    def contents(self, db, session):
+        return sorted((entry.date, entry.title, entry.content) for entry in db.iter_entries(session))
+
+    def test_replica_created_by_sync(self):
+        local, session = self.open('local.db')
+        local.add_entry("2025-01-01", "Первая", "Текст", session)
+        self.assertEqual(sync_file(local, session, self.path('replica.db'))['sent'], 1)
+        remote, remote_session = self.open('replica.db')
+        remote.add_entry("2025-01-02", "Вторая", "Текст копии", remote_session)
+        self.assertEqual(sync_databases(local, remote, session)['received'], 1)
+        self.assertEqual(self.contents(local, session), self.contents(remote, remote_session))
+        self.assertEqual(len(self.contents(local, session)), 2)
+
+    def test_legacy_file_copies_refused(self):
+        # Копия файла старой версии: у каждой копии при открытии свой ключ данных
+        make_baseline_db(self.path('local.db'), ENTRIES)
+        shutil.copy(self.path('local.db'), self.path('copy.db'))
+        local, session = self.open('local.db')
+        remote, remote_session = self.open('copy.db')
+        # В копии только общие строки старого формата — они не доказывают общий ключ
+        local.add_entry("2025-01-03", "Третья", "Текст новой записи", session)
+        self.assertIsNone(sync_databases(local, remote, session))
+        self.assertIsNone(sync_databases(remote, local, remote_session))
+        # Обе копии по-прежнему читаются своими сессиями
+        for db, db_session, count in ((local, session, 3), (remote, remote_session, 2)):
+            contents = self.contents(db, db_session)
+            self.assertEqual(len(contents), count)
+            self.assertTrue(all(content for _, _, content in contents))
+
+    def test_legacy_copy_without_new_rows_refused(self):
+        # Связка другой копии без контрольного значения и только строки старого формата
+        make_baseline_db(self.path('local.db'), ENTRIES)
+        shutil.copy(self.path('local.db'), self.path('copy.db'))
+        local, session = self.open('local.db')
+        with DatabaseManager(self.path('copy.db')) as remote:
+            self.assertFalse(remote.matches_key(session))
+            self.assertIsNone(sync_databases(local, remote, session))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+# Тесты экспорта и импорта записей
+
+import json
+import unittest
+from src.database import DatabaseManager
+from src.transfer import export_entries, import_entries
+from tests.support import DiaryTestCase, PASSWORD
+
+RECORDS = [
+    {'date': "2025-01-01", 'title': "Обычная", 'content': "Текст записи"},
+    # Разделители строк Unicode, которые JSON не экранирует
+    {'date': "2025-01-02", 'title': "Строка за\u0085разделителем",
+     'content': "Абзац абзац строка\u0085конец\r\n"},
+]
+
+class TransferTest(DiaryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.db = DatabaseManager(self.path('diary.db'))
+        self.addCleanup(self.db.close)
+        self.session = self.db.open_session(PASSWORD)
+        self.addCleanup(self.session.close)
+
+    def contents(self, db, session):
+        return sorted((entry.date, entry.title, entry.content) for entry in db.iter_entries(session))
+
+    def write_jsonl(self, name, records):
+        path = self.path(name)
+        with open(path, 'w', encoding='utf-8') as stream:
+            for record in records:
+                stream.write(json.dumps(record, ensure_ascii=False) + '\n')
+        return path
+
+    def test_round_trip(self):
+        self.assertEqual(self.db.import_entries(RECORDS, self.session), len(RECORDS))
+        expected = self.contents(self.db, self.session)
+        for name in ('export.jsonl', 'export.diary'):
+            self.assertEqual(export_entries(self.db, self.session, self.path(name), password=PASSWORD),
+                             len(RECORDS))
+            with DatabaseManager(self.path(name + '.db')) as target, \
+                    target.open_session(PASSWORD) as session:
+                self.assertEqual(import_entries(target, session, self.path(name), password=PASSWORD),
+                                 len(RECORDS))
+                self.assertEqual(self.contents(target, session), expected)
+
+    def test_invalid_records_rejected(self):
+        for record in ({'content': ""}, {'date': "2025-01-01", 'title': "Без текста", 'content': "  "},
+                       {'date': "2025-01-01", 'title': 5, 'content': "текст"}, "не запись"):
+            path = self.write_jsonl('import.jsonl', [RECORDS[0], record])
+            self.assertIsNone(import_entries(self.db, self.session, path))
+            self.assertEqual(self.db.count_entries(), 0)
+
+    def test_empty_content_exported(self):
+        # Пустая запись из прежних версий не путается с ошибкой расшифровки
+        with self.db._conn:
+            self.db._conn.execute(
+                'INSERT INTO entries (date, title, encrypted_content) VALUES (?, ?, ?)',
+                ("2025-01-03", "Пустая", self.session.encrypt(""))
+            )
+        self.assertEqual(self.db.get_content(1, self.session), "")
+        self.assertEqual(export_entries(self.db, self.session, self.path('export.jsonl')), 1)
+
+if __name__ == '__main__':
+    unittest.main()